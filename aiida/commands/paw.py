@@ -24,6 +24,7 @@ class _Paw(VerdiCommandWithSubcommands, Importable):
         '''Upload a new PAW pseudopotential family.'''
         from aiida import load_dbenv
         import os.path
+        import time
         import argparse as arp
 
         parser = arp.ArgumentParser(
@@ -34,6 +35,9 @@ class _Paw(VerdiCommandWithSubcommands, Importable):
                             help='do not create the family or upload any '
                                  ' files, if existing files with matching '
                                  ' md5 sum are found.')
+        parser.add_argument('-p', '--processes', type=int, default=1,
+                            help='number of processes used to read the '
+                                 'POTCAR files (default: 1)')
         parser.add_argument('folder')
         parser.add_argument('group_name')
         parser.add_argument('group_description')
@@ -52,12 +56,19 @@ class _Paw(VerdiCommandWithSubcommands, Importable):
         load_dbenv()
         from aiida.orm import DataFactory
         Paw = DataFactory('vasp.paw')
+        timings = {}
+        start = time.time()
         files_found, files_uploaded = Paw.import_family(folder,
                                                         familyname=group_name,
                                                         family_desc=group_description,
-                                                        stop_if_existing=stop_if_existing)
+                                                        stop_if_existing=stop_if_existing,
+                                                        processes=params.processes,
+                                                        timings=timings)
 
         print "POTCAR files found in subfolders: {}. New files uploaded from: {}".format(files_found, files_uploaded)
+        print "Imported {} PAWs in {:.2f}s (reading: {:.2f}s, lookup: {:.2f}s, storing: {:.2f}s)".format(
+            len(files_found), time.time() - start, timings.get('scan', 0),
+            timings.get('lookup', 0), timings.get('store', 0))
 
     def listfamilies(self, *args):
         from aiida import load_dbenv
@@ -6,3 +6,16 @@ from vasp5 import Vasp5CalcTest
 from maker import VaspMakerTest
 from amn import AmnCalcTest
 from wannier import WannierCalcTest
+from vasprun import VasprunParserTest
+from eigenval import EigParserTest
+from doscar import DosParserTest
+from dedup import DedupTest
+from chunked import ChunkedArrayTest
+from chgcar import ChgcarParserTest
+from wavecar import WavecarParserTest
+from atoms import AseCacheTest
+from potcar import PotcarParserTest
+from benchmark import PrepareBenchmarkTest, ParserBenchmarkTest
+from wannier_bands import WannierBandsTest
+from tbmodel import HrParserTest
+from hamiltonian import TbHamiltonianTest, TbHamiltonianPoolTest
@@ -0,0 +1,40 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.orm import load_node
+from aiida.tools.codespecific.vasp import atoms
+from aiida.tools.codespecific.vasp.atoms import get_ase, clear_ase
+from common import Common
+
+
+class AseCacheTest(AiidaTestCase):
+    def test_cache(self):
+        structure = Common.structure()
+        cached = get_ase(structure)
+        self.assertIs(get_ase(structure), cached)
+        structure.append_atom(position=[.5, .5, .5], symbols='In')
+        self.assertEquals(len(get_ase(structure)), 3)
+        cell = structure.cell
+        cell[0][0] += 1
+        structure.cell = cell
+        self.assertEquals(get_ase(structure).get_cell()[0][0], cell[0][0])
+        structure.store()
+        cached = get_ase(structure)
+        self.assertIs(get_ase(structure), cached)
+        self.assertIs(get_ase(load_node(structure.pk)), cached)
+        clear_ase(structure)
+        self.assertIsNot(get_ase(structure), cached)
+
+    def test_bounded(self):
+        clear_ase()
+        nodes = [Common.structure().store() for i in range(3)]
+        max_cached = atoms.max_cached
+        atoms.max_cached = 2
+        try:
+            first = get_ase(nodes[0])
+            get_ase(nodes[1])
+            self.assertIs(get_ase(nodes[0]), first)
+            get_ase(nodes[2])
+            self.assertEquals(len(atoms._ase_cache), 2)
+            self.assertNotIn(nodes[1].uuid, atoms._ase_cache)
+            self.assertIs(get_ase(nodes[0]), first)
+        finally:
+            atoms.max_cached = max_cached
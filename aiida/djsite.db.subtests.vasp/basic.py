@@ -119,6 +119,28 @@ class BasicCalcTest(AiidaTestCase):
         self.assertIn('As', pcs)
         self.assertEquals(pcs.count('End of Dataset'), 2)
 
+    def test_write_potcar_cached(self):
+        import shutil
+        calc = self._get_calc('c', 'm')
+        inp = calc.get_inputs_dict()
+        calc.write_potcar(inp, self.tmpf)
+        with open(self.tmpf) as pcf:
+            expected = pcf.read()
+        cachedir = tempfile.mkdtemp()
+        try:
+            calc.potcar_cache = cachedir
+            dsts = [os.path.join(cachedir, 'POTCAR%d' % i) for i in (1, 2)]
+            for dst in dsts:
+                calc.write_potcar(inp, dst)
+                with open(dst) as pcf:
+                    self.assertEquals(pcf.read(), expected)
+            cached = [f for f in os.listdir(cachedir)
+                      if not f.startswith('POTCAR')]
+            self.assertEquals(len(cached), 1)
+            self.assertTrue(os.path.samefile(dsts[0], dsts[1]))
+        finally:
+            shutil.rmtree(cachedir)
+
     def test_elements(self):
         calc = self._get_calc('c', 'm')
         self.assertRaises(AttributeError, calc.get_attr, 'elements')
@@ -0,0 +1,85 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.tools.codespecific.vasp.benchmark import benchmark_calc, \
+    profile_preparations, prepare_plugins, format_report, profile_parsers, \
+    format_parser_report, write_vasprun, write_eigenval, write_doscar
+from aiida.tools.codespecific.vasp.io.vasprun import VasprunParser
+from aiida.tools.codespecific.vasp.io.eigenval import EigParser
+from aiida.tools.codespecific.vasp.io.doscar import DosParser
+import tempfile
+import shutil
+import os
+
+
+class PrepareBenchmarkTest(AiidaTestCase):
+    '''
+    smoke test of the submission preparation benchmarks on small
+    synthetic inputs, the benchmarks themselves are run with
+    ``python -m aiida.tools.codespecific.vasp.benchmark --prepare``
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_calc(self):
+        calc = benchmark_calc('vasp.vasp5', self.computer, self.tmpdir,
+                              atoms=5, kpoints=3, paws=2, lines=10)
+        self.assertEqual(len(calc.inp.structure.sites), 5)
+        self.assertEqual(calc.inp.kpoints.get_kpoints().shape, (3, 3))
+        self.assertEqual(calc.inp.settings.get_dict()['icharg'], 11)
+        self.assertIsNotNone(calc.inp.charge_density)
+
+    def test_profile(self):
+        results = dict(profile_preparations(
+            self.computer, self.tmpdir, atoms=2, kpoints=2, paws=2,
+            lines=10))
+        self.assertEqual(sorted(results), sorted(prepare_plugins))
+        basic = results['vasp.base.BasicCalculation']
+        for step in ['incar', 'poscar', 'potcar', 'kpoints']:
+            self.assertIn('write_' + step, basic)
+        self.assertIn('write_win', results['vasp.amn'])
+        self.assertIn('write_win', results['vasp.vasp2w90'])
+        self.assertIn('write_wdat', results['vasp.wannier'])
+        self.assertIn('write_incar', format_report(basic))
+
+
+class ParserBenchmarkTest(AiidaTestCase):
+    '''
+    smoke test of the output parser benchmarks on small synthetic files,
+    the benchmarks themselves are run with
+    ``python -m aiida.tools.codespecific.vasp.benchmark``
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_synthetic_files(self):
+        size = {'atoms': 5, 'kpoints': 7, 'bands': 11, 'spins': 2,
+                'nedos': 50}
+        path = os.path.join(self.tmpdir, 'vasprun.xml')
+        write_vasprun(path, **size)
+        vrp = VasprunParser(path)
+        self.assertEqual(vrp.bands.shape, (2, 7, 11))
+        self.assertEqual(vrp.tdos.shape, (2, 50))
+        self.assertEqual(vrp.pdos.shape, (5, 2, 50))
+        path = os.path.join(self.tmpdir, 'EIGENVAL')
+        write_eigenval(path, atoms=5, kpoints=7, bands=11, spins=2)
+        self.assertIsNotNone(EigParser.parse_eigenval_mmap(path))
+        self.assertEqual(EigParser(path).bands.shape, (2, 7, 11))
+        path = os.path.join(self.tmpdir, 'DOSCAR')
+        write_doscar(path, atoms=5, spins=2, nedos=50)
+        dos = DosParser(path)
+        self.assertEqual(dos.pdos.shape, (5, 50, 19))
+        self.assertEqual(dos.header['pdos_layout']['components'], 2)
+
+    def test_parsers(self):
+        results = profile_parsers(self.tmpdir, repeat=1, isolate=False,
+                                  atoms=2, kpoints=3, bands=4, spins=1,
+                                  nedos=10, lines=10)
+        self.assertEqual(len(results), 8)
+        for name, res in results:
+            self.assertGreater(res['size'], 0, msg=name)
+        self.assertIn('wannier90 bands', format_parser_report(results))
@@ -0,0 +1,69 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.tools.codespecific.vasp.io.chgcar import ChgcarParser
+import numpy as np
+import tempfile
+import shutil
+import os
+
+
+class ChgcarParserTest(AiidaTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.chgcar = os.path.join(self.tmpdir, 'CHGCAR')
+        self.grid = (4, 3, 5)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write_chgcar(self, nblocks):
+        '''write a synthetic CHGCAR file, returns the data blocks'''
+        blocks = np.random.random((nblocks,) + self.grid) * 100
+        lines = ['InAs', '   6.058', ' 0.0 0.5 0.5', ' 0.5 0.0 0.5',
+                 ' 0.5 0.5 0.0', '   In   As', '     1     1', 'Direct',
+                 ' 0.0 0.0 0.0', ' 0.25 0.25 0.25']
+        grid_line = '   %d   %d   %d' % self.grid
+        for n, block in enumerate(blocks):
+            if n:
+                lines.append(' 0.0 0.0')
+            lines += ['', grid_line]
+            values = ['%18.11E' % v for v in block.flatten(order='F')]
+            lines += [' '.join(values[i:i+5])
+                      for i in range(0, len(values), 5)]
+            lines += ['augmentation occupancies   1  2',
+                      '  0.1 0.2',
+                      'augmentation occupancies   2  2',
+                      '  0.3 0.4']
+        with open(self.chgcar, 'w') as chg:
+            chg.write('\n'.join(lines) + '\n')
+        return blocks
+
+    def test_header(self):
+        self._write_chgcar(2)
+        chg = ChgcarParser(self.chgcar)
+        self.assertEquals(chg.grid, self.grid)
+        self.assertEquals(chg.header['species'], ['In', 'As'])
+        self.assertEquals(chg.header['counts'], [1, 1])
+        self.assertEquals(chg.n_blocks, 2)
+        self.assertEquals(len(chg.header['augmentation']), 4)
+        self.assertAlmostEquals(chg.volume, 6.058**3 / 4)
+
+    def test_blocks(self):
+        blocks = self._write_chgcar(2)
+        chg = ChgcarParser(self.chgcar)
+        self.assertTrue(np.allclose(chg.density, blocks[0]))
+        self.assertTrue(np.allclose(chg.magnetization, blocks[1]))
+        blocks = self._write_chgcar(4)
+        chg = ChgcarParser(self.chgcar)
+        self.assertEquals(chg.magnetization.shape, (3,) + self.grid)
+        self.assertTrue(np.allclose(chg.magnetization, blocks[1:]))
+
+    def test_cache(self):
+        blocks = self._write_chgcar(1)
+        cache = os.path.join(self.tmpdir, 'cache', 'CHGCAR.npy')
+        chg = ChgcarParser(self.chgcar, cache=cache)
+        self.assertIsNone(chg.magnetization)
+        self.assertTrue(np.allclose(chg.density, blocks[0]))
+        self.assertTrue(os.path.isfile(cache))
+        cached = ChgcarParser(self.chgcar, cache=cache)
+        self.assertIsInstance(cached.density, np.memmap)
+        self.assertTrue((cached.density == chg.density).all())
@@ -0,0 +1,38 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.orm import DataFactory
+import numpy as np
+
+
+class ChunkedArrayTest(AiidaTestCase):
+    def setUp(self):
+        self.bands = np.random.random((2, 40, 12))
+        self.pdos = np.zeros((8, 1, 301),
+                             dtype=[('energy', float), ('s', float)])
+        self.pdos['s'] = np.random.random((8, 1, 301))
+
+    def test_dos(self):
+        dos = DataFactory('vasp.dos')()
+        dos.chunk_bytes = self.pdos[0].nbytes * 3
+        dos.set_array('pdos', self.pdos)
+        dos.store()
+        self.assertEquals(dos.get_attr('chunked|pdos')['bounds'],
+                          [0, 3, 6, 8])
+        self.assertEquals(dos.get_shape('pdos'), (8, 1, 301))
+        self.assertIn('pdos', dos.get_arraynames())
+        self.assertTrue((dos.get_array('pdos') == self.pdos).all())
+        self.assertTrue((dos.get_array_slice('pdos', 4) ==
+                         self.pdos[4]).all())
+        self.assertTrue((dos.get_array_slice('pdos', slice(2, 7)) ==
+                         self.pdos[2:7]).all())
+
+    def test_bands(self):
+        bands = DataFactory('vasp.bands')()
+        bands.chunk_bytes = self.bands[:, 0].nbytes * 16
+        bands.set_kpoints(np.random.random((40, 3)))
+        bands.set_bands(self.bands)
+        bands.store()
+        self.assertEquals(bands.get_attr('chunked|bands')['axis'], 1)
+        self.assertTrue((bands.get_bands() == self.bands).all())
+        self.assertTrue(
+            (bands.get_array_slice('bands', slice(None, None, -5)) ==
+             self.bands[:, ::-5]).all())
@@ -0,0 +1,67 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.orm import DataFactory
+from aiida.orm.data.vasp.dedup import md5_files
+from common import Common, subpath
+import tempfile
+import shutil
+import os
+
+
+class DedupTest(AiidaTestCase):
+    def test_md5_files(self):
+        chgcar = subpath('data', 'CHGCAR')
+        wavecar = subpath('data', 'WAVECAR')
+        self.assertEquals(md5_files([(chgcar, 'a'), (wavecar, 'b')]),
+                          md5_files([(wavecar, 'b'), (chgcar, 'a')]))
+        self.assertNotEquals(md5_files([(chgcar, 'a')]),
+                             md5_files([(chgcar, 'b')]))
+        self.assertEquals(md5_files([(chgcar, 'a')], block_size=7),
+                          md5_files([(chgcar, 'a')]))
+
+    def test_md5_files_split(self):
+        '''name 'ab' with content 'c' differs from name 'a' with 'bc' '''
+        tmpdir = tempfile.mkdtemp()
+        try:
+            first = os.path.join(tmpdir, 'first')
+            second = os.path.join(tmpdir, 'second')
+            with open(first, 'w') as out:
+                out.write('c')
+            with open(second, 'w') as out:
+                out.write('bc')
+            self.assertNotEquals(md5_files([(first, 'ab')]),
+                                 md5_files([(second, 'a')]))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_singlefile(self):
+        from aiida.orm import load_node
+        first = Common.charge_density()
+        first.store()
+        self.assertIsNone(first.payload_uuid)
+        self.assertIsNotNone(first.md5)
+        second = Common.charge_density()
+        self.assertIsNone(second.payload_uuid)
+        second.store()
+        self.assertTrue(second._is_stored)
+        self.assertEquals(second.md5, first.md5)
+        self.assertEquals(second.payload_uuid, first.uuid)
+        self.assertEquals(second.get_folder_list(), [])
+        loaded = load_node(second.pk)
+        self.assertEquals(loaded.get_file_abs_path(),
+                          first.get_file_abs_path())
+        with open(loaded.get_file_abs_path()) as chgcar:
+            self.assertTrue(chgcar.read())
+        # other node types do not share payloads
+        wavefun = DataFactory('vasp.wavefun')(file=subpath('data', 'CHGCAR'))
+        wavefun.store()
+        self.assertIsNone(wavefun.payload_uuid)
+
+    def test_archive(self):
+        first = DataFactory('vasp.archive')()
+        first.add_file(subpath('data', 'CHGCAR'))
+        first.store()
+        second = DataFactory('vasp.archive')()
+        second.add_file(subpath('data', 'CHGCAR'))
+        second.store()
+        self.assertEquals(second.payload_uuid, first.uuid)
+        self.assertEquals(second.archive.getnames(), ['CHGCAR'])
@@ -0,0 +1,41 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.tools.codespecific.vasp.io.doscar import DosParser
+from aiida.tools.codespecific.vasp.io.vasprun import VasprunParser
+from common import subpath
+import numpy as np
+
+
+class DosParserTest(AiidaTestCase):
+    def setUp(self):
+        path = subpath('data', 'retrieved_nscf', 'path')
+        self.doscar = subpath(path, 'DOSCAR')
+        self.vasprun = subpath(path, 'vasprun.xml')
+
+    def test_parse(self):
+        header, tdos, pdos = DosParser.parse_doscar(self.doscar)
+        rhead, rtdos, rpdos = DosParser.parse_doscar_lines(self.doscar)
+        self.assertEquals(header, rhead)
+        self.assertEquals(tdos.shape, (301, 3))
+        self.assertTrue((tdos == rtdos).all())
+        self.assertEquals(pdos.shape, (8, 301, 10))
+        self.assertTrue((pdos == rpdos).all())
+        self.assertEquals(header['pdos_layout'],
+                          {'components': 1, 'lm': True, 'f': False})
+
+    def test_ion_blocks(self):
+        '''every ion block must match the (less precise) vasprun pdos'''
+        pdos = DosParser(self.doscar).pdos
+        vpdos = VasprunParser(self.vasprun).pdos
+        for ion in range(pdos.shape[0]):
+            ref = np.array([vpdos[name][ion, 0]
+                            for name in vpdos.dtype.names[1:]]).T
+            self.assertTrue(np.allclose(pdos[ion, :, 1:], ref, atol=5e-3))
+
+    def test_layout(self):
+        self.assertEquals(DosParser.pdos_layout(19, 5),
+                          {'components': 2, 'lm': True, 'f': False})
+        self.assertEquals(DosParser.pdos_layout(37, 3),
+                          {'components': 4, 'lm': True, 'f': False})
+        self.assertEquals(DosParser.pdos_layout(9, 5),
+                          {'components': 2, 'lm': False, 'f': True})
+        self.assertIsNone(DosParser.pdos_layout(8, 3))
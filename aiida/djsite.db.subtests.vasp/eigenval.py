@@ -0,0 +1,78 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.tools.codespecific.vasp.io.eigenval import EigParser
+from common import subpath
+import numpy as np
+import tempfile
+import os
+
+
+class EigParserTest(AiidaTestCase):
+    def setUp(self):
+        self.eigenval = subpath('data', 'retrieved_nscf', 'path', 'EIGENVAL')
+        self.tmpd, self.tmpf = tempfile.mkstemp()
+
+    def tearDown(self):
+        os.remove(self.tmpf)
+
+    def _write_eigenval(self, nkp, nb, ns, occ=False):
+        '''write a synthetic EIGENVAL file, returns kpoints and bands'''
+        kp = np.random.random((nkp, 4))
+        bs = np.random.random((ns, nkp, nb)) * 20 - 10
+        lines = ['    2    2    1    %d' % ns,
+                 '  0.1E+02  0.6E-09  0.6E-09  0.6E-09  0.5E-15',
+                 '  1.0E-004', '  CAR ', ' synthetic',
+                 '     16     %d     %d' % (nkp, nb)]
+        for k in range(nkp):
+            lines.append('')
+            lines.append('  %.7E  %.7E  %.7E  %.7E' % tuple(kp[k]))
+            for b in range(nb):
+                vals = ['%5d' % (b + 1)] + ['%15.6f' % bs[s, k, b]
+                                             for s in range(ns)]
+                if occ:
+                    vals += ['%10.4f' % 1.] * ns
+                lines.append(' '.join(vals))
+        with open(self.tmpf, 'w') as eig:
+            eig.write('\n'.join(lines) + '\n')
+        return np.array(['%.7E' % x for x in kp.flat], dtype=float).reshape(
+            kp.shape), np.round(bs, 6)
+
+    def _compare(self, fast, ref):
+        self.assertEquals(fast[0], ref[0])
+        self.assertTrue((fast[1] == ref[1]).all())
+        self.assertEquals(fast[2].shape, ref[2].shape)
+        self.assertTrue((fast[2] == ref[2]).all())
+
+    def test_mmap(self):
+        fast = EigParser.parse_eigenval_mmap(self.eigenval)
+        self._compare(fast, EigParser.parse_eigenval_blocks(self.eigenval))
+
+    def test_mmap_spin_occ(self):
+        kp, bs = self._write_eigenval(5, 7, 2, occ=True)
+        fast = EigParser.parse_eigenval_mmap(self.tmpf)
+        self._compare(fast, EigParser.parse_eigenval_blocks(self.tmpf))
+        self.assertTrue(np.allclose(fast[1], kp))
+        self.assertTrue(np.allclose(fast[2], bs))
+
+    def test_fallback(self):
+        kp, bs = self._write_eigenval(3, 4, 1)
+        with open(self.tmpf) as eig:
+            lines = eig.read().splitlines()
+        lines[8], lines[9] = lines[9], lines[8]     # swap bands 1 and 2
+        with open(self.tmpf, 'w') as eig:
+            eig.write('\n'.join(lines))
+        self.assertIsNone(EigParser.parse_eigenval_mmap(self.tmpf))
+        res = EigParser.parse_eigenval(self.tmpf)
+        self.assertTrue(np.allclose(res[2], bs))
+
+    def test_windows(self):
+        self._write_eigenval(200, 30, 2, occ=True)
+
+        class SmallWindows(EigParser):
+            window_bytes = 1000
+        self._compare(SmallWindows.parse_eigenval_mmap(self.tmpf),
+                      EigParser.parse_eigenval_blocks(self.tmpf))
+
+    def test_large(self):
+        self._write_eigenval(2000, 100, 1)
+        self._compare(EigParser.parse_eigenval_mmap(self.tmpf),
+                      EigParser.parse_eigenval_blocks(self.tmpf))
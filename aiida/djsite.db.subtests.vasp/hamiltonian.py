@@ -0,0 +1,93 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.tools.codespecific.vasp.hamiltonian import TbHamiltonian
+import numpy as np
+import unittest
+
+
+class TbModelMixin(object):
+    num_wann = 6
+    nrpts = 25
+
+    def setUp(self):
+        '''a random model with H(-R) = H(R)^+, so H(k) is hermitian'''
+        nw = self.num_wann
+        rvectors = np.random.randint(-3, 4, (self.nrpts, 3))
+        rvectors[0] = 0
+        degeneracies = np.random.randint(1, 5, self.nrpts)
+        hoppings = (np.random.random((self.nrpts, nw, nw)) +
+                    1j * np.random.random((self.nrpts, nw, nw)))
+        hoppings[0] += hoppings[0].conj().T
+        self.rvectors = np.concatenate([rvectors, -rvectors[1:]])
+        self.degeneracies = np.concatenate([degeneracies, degeneracies[1:]])
+        self.hoppings = np.concatenate(
+            [hoppings, hoppings[1:].conj().transpose(0, 2, 1)])
+        self.kpoints = np.random.random((200, 3))
+
+    def _model(self):
+        return TbHamiltonian(self.rvectors, self.degeneracies,
+                             hoppings=self.hoppings)
+
+    def _reference(self, kpoints, hoppings=None):
+        if hoppings is None:
+            hoppings = self.hoppings
+        return np.array([
+            sum(np.exp(2j * np.pi * np.dot(k, r)) / d * h for r, d, h in
+                zip(self.rvectors, self.degeneracies, hoppings))
+            for k in kpoints])
+
+
+class TbHamiltonianTest(TbModelMixin, AiidaTestCase):
+    def test_hamiltonian(self):
+        model = TbHamiltonian(self.rvectors, self.degeneracies,
+                              hoppings=self.hoppings)
+        hk = model.hamiltonian(self.kpoints[:20])
+        self.assertEqual(hk.shape, (20, 6, 6))
+        self.assertTrue(np.allclose(hk, self._reference(self.kpoints[:20])))
+        self.assertTrue(np.allclose(hk, hk.conj().transpose(0, 2, 1)))
+
+    def test_sparse(self):
+        keep = np.abs(self.hoppings) > .5
+        model = TbHamiltonian(self.rvectors, self.degeneracies,
+                              indices=np.argwhere(keep),
+                              values=self.hoppings[keep],
+                              num_wann=self.num_wann)
+        dense = np.where(keep, self.hoppings, 0)
+        self.assertTrue(np.allclose(
+            model.hamiltonian(self.kpoints[:20]),
+            self._reference(self.kpoints[:20], dense)))
+
+    def test_eigenvalues(self):
+        model = TbHamiltonian(self.rvectors, self.degeneracies,
+                              hoppings=self.hoppings)
+        ref = np.linalg.eigvalsh(self._reference(self.kpoints))
+        evals = model.eigenvalues(self.kpoints)
+        self.assertEqual(evals.shape, (200, 6))
+        self.assertTrue(np.allclose(evals, ref))
+        self.assertTrue(np.allclose(
+            model.eigenvalues(self.kpoints, chunk_size=7), ref))
+        evals, evecs = model.eigenvalues(self.kpoints[:5], vectors=True,
+                                         chunk_size=2)
+        hk = model.hamiltonian(self.kpoints[:5])
+        self.assertTrue(np.allclose(np.einsum('kij,kjn->kin', hk, evecs),
+                                    evecs * evals[:, np.newaxis, :]))
+
+    def test_chunk_size(self):
+        model = TbHamiltonian(self.rvectors, self.degeneracies,
+                              hoppings=self.hoppings)
+        model.chunk_bytes = 16 * 2**10
+        size = model.default_chunk_size()
+        self.assertGreater(size, 1)
+        self.assertEqual(len(list(model.iter_chunks(self.kpoints))),
+                         -(-200 // size))
+
+
+class TbHamiltonianPoolTest(TbModelMixin, unittest.TestCase):
+    '''
+    evaluation in a process pool, a plain TestCase since the forked
+    workers must not share the test database connection
+    '''
+    def test_processes(self):
+        model = self._model()
+        ref = model.eigenvalues(self.kpoints)
+        self.assertTrue(np.allclose(
+            model.eigenvalues(self.kpoints, chunk_size=30, processes=2), ref))
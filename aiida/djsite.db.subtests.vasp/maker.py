@@ -1,5 +1,8 @@
 from aiida.djsite.db.testbase import AiidaTestCase
 from aiida.orm.calculation.job.vasp.maker import VaspMaker
+from aiida.orm import DataFactory
+from common import Common
+import numpy as np
 
 
 class VaspMakerTest(AiidaTestCase):
@@ -9,3 +12,41 @@ class VaspMakerTest(AiidaTestCase):
     '''
     def setUp(self):
         self.tm = VaspMaker()
+
+    def test_new_many(self):
+        Common.import_paw()
+        structure = Common.structure()
+        maker = VaspMaker(structure=structure, paw_family='TEST',
+                          paw_map={'In': 'In_d', 'As': 'As'})
+        maker.set_kpoints_mesh([4, 4, 4])
+        maker.add_settings(system='InAs')
+        calcs = maker.new_many([
+            {},
+            {'settings': {'encut': 300}, 'label': 'a'},
+            {'settings': {'encut': 300}, 'label': 'b'},
+            {'settings': {'encut': 400}, 'structure': Common.cif()}])
+        self.assertEquals([c.label for c in calcs],
+                          ['unlabeled', 'a', 'b', 'unlabeled'])
+        self.assertIs(calcs[0].inp.structure, structure)
+        self.assertIs(calcs[1].inp.settings, calcs[2].inp.settings)
+        self.assertEquals(calcs[1].inp.settings.get_dict(),
+                          {'system': 'InAs', 'encut': 300})
+        self.assertIs(calcs[0].inp.kpoints, calcs[2].inp.kpoints)
+        self.assertIsNot(calcs[0].inp.kpoints, calcs[3].inp.kpoints)
+        self.assertTrue(np.allclose(calcs[0].inp.kpoints.cell,
+                                    structure.cell))
+        self.assertIs(calcs[0].inp.paw_In, calcs[3].inp.paw_In)
+        self.assertRaises(TypeError, maker.new_many, [{'foo': 1}])
+        self.assertRaises(TypeError, maker.new_many, [{'paw_family': 'LDA'}])
+
+    def test_new_many_reuse(self):
+        Common.import_paw()
+        maker = VaspMaker(structure=Common.structure(), paw_family='TEST',
+                          paw_map={'In': 'In_d', 'As': 'As'})
+        maker.add_settings(system='InAs')
+        stored = DataFactory('parameter')(
+            dict={'system': 'InAs', 'encut': 300}).store()
+        calcs = maker.new_many([{'settings': {'encut': 300}},
+                                {'settings': {'encut': 350}}])
+        self.assertEquals(calcs[0].inp.settings.pk, stored.pk)
+        self.assertIsNone(calcs[1].inp.settings.pk)
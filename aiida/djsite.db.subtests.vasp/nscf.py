@@ -1,7 +1,7 @@
 from aiida.djsite.db.testbase import AiidaTestCase
-from aiida.orm import CalculationFactory, Code
+from aiida.orm import CalculationFactory, DataFactory, Code
 from aiida.common.folders import SandboxFolder
-from common import Common
+from common import Common, subpath
 import tempfile
 import os
 
@@ -44,6 +44,14 @@ class NscfCalcTest(AiidaTestCase):
         inp = calc.get_inputs_dict()
         calc.verify_inputs(inp)
 
+    def test_check_wavefunctions(self):
+        calc, inp = self._get_calc()
+        calc.inp.settings.update_dict({'encut': '400', 'istart': '1'})
+        calc.check_wavefunctions(inp)
+        wfn = inp['wavefunctions']
+        wfn.remove_path(wfn.filename)
+        calc.check_wavefunctions(inp)
+
     def test_prepare(self):
         calc, inp = self._get_calc()
         with SandboxFolder() as sf:
@@ -65,6 +73,31 @@ class NscfCalcTest(AiidaTestCase):
                             {'INCAR', 'KPOINTS', 'POSCAR',
                             'POTCAR', 'WAVECAR'})
 
+    def test_prepare_remote(self):
+        calc = self.calc_cls()
+        calc.use_code(self.code)
+        calc.set_computer(self.computer)
+        calc.use_settings(Common.settings())
+        calc.inp.settings.update_dict(
+            {'icharg': 11, 'istart': 1, 'lwave': False})
+        calc.use_structure(Common.cif())
+        calc.use_kpoints(Common.kpoints_mesh())
+        calc.use_paw(Common.paw_in(), kind='In')
+        calc.use_paw(Common.paw_as(), kind='As')
+        parent = DataFactory('remote')(computer=self.computer,
+                                       remote_path='/scratch/parent')
+        calc.use_parent_folder(parent)
+        inp = calc.get_inputs_dict()
+        calc.verify_inputs(inp)
+        with SandboxFolder() as sf:
+            ci = calc._prepare_for_submission(sf, inp)
+            il = sf.get_content_list()
+        self.assertEquals(set(il), {'INCAR', 'KPOINTS', 'POSCAR', 'POTCAR'})
+        self.assertEquals(ci.remote_copy_list, [
+            (self.computer.uuid, '/scratch/parent/CHGCAR', 'CHGCAR')])
+        self.assertEquals(ci.remote_symlink_list, [
+            (self.computer.uuid, '/scratch/parent/WAVECAR', 'WAVECAR')])
+
     def test_write_chgcar(self):
         calc, inp = self._get_calc()
         calc.write_chgcar(inp, self.tmpf)
@@ -91,3 +124,26 @@ class NscfCalcTest(AiidaTestCase):
         self.assertIn('wannier_settings', outs)
         self.assertIn('wannier_data', outs)
         self.assertIn('results', outs)
+
+    def test_parse_profile(self):
+        calc, inpt = self._get_calc()
+        parser_cls = calc.get_parserclass()
+        pars = parser_cls(calc)
+        self.assertIsNone(pars.profile_report)
+        self.assertNotIn('read_files', vars(pars))
+        profiled = type('Profiled', (parser_cls,), {'profile': 'output'})
+        pars = profiled(calc)
+        ok, outs = pars.parse_with_retrieved({
+            'retrieved': Common.retrieved_nscf()
+        })
+        outs = dict(outs)
+        report = outs['parser_profile'].get_dict()
+        steps = [step['name'] for step in report['steps']]
+        self.assertIn('read_run', steps)
+        self.assertIn('get_dos_node', steps)
+        eigenval = subpath('data', 'retrieved_nscf', 'path', 'EIGENVAL')
+        self.assertIn(['EIGENVAL', os.path.getsize(eigenval)],
+                      report['files'])
+        self.assertIn('bands', [a[0] for a in report['arrays']])
+        self.assertEqual(calc.get_attr('parser_profile')['steps'],
+                         report['steps'])
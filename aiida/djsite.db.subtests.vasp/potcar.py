@@ -0,0 +1,73 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.tools.codespecific.vasp.io.potcar import PawParser, PotcarParser
+from common import subpath
+import tempfile
+import hashlib
+import shutil
+import os
+
+
+class PotcarParserTest(AiidaTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.as_potcar = subpath('LDA', 'As', 'POTCAR')
+        self.in_potcar = subpath('LDA', 'In_d', 'POTCAR')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write_potcar(self, *sources):
+        '''concatenate sources into a POTCAR file'''
+        path = os.path.join(self.tmpdir, 'POTCAR')
+        with open(path, 'w') as potcar:
+            for src in sources:
+                with open(src) as part:
+                    potcar.write(part.read())
+        return path
+
+    def _write_large(self, nlines):
+        '''a POTCAR with nlines of numbers after the header'''
+        path = os.path.join(self.tmpdir, 'POTCAR_large')
+        with open(self.as_potcar) as src:
+            header = src.read().split('... DATA ...')[0]
+        with open(path, 'w') as potcar:
+            potcar.write(header)
+            potcar.write(' Atomic configuration\n')
+            for i in range(nlines):
+                potcar.write('  0.12345678E+01' * 5 + '\n')
+            potcar.write(' End of Dataset\n')
+        return path
+
+    def test_parse_potcar(self):
+        attrs = PawParser.parse_potcar(self.as_potcar)
+        self.assertEqual(attrs['symbol'], 'As')
+        self.assertEqual(attrs['element'], 'As')
+        self.assertEqual(attrs['valence'], 5.0)
+        self.assertEqual(attrs['enmax'], 208.87)
+
+    def test_concatenated(self):
+        potcar = self._write_potcar(self.as_potcar, self.in_potcar)
+        with self.assertRaises(ValueError):
+            PawParser.parse_potcar(potcar)
+        headers = PawParser.parse_headers(potcar)
+        self.assertEqual([h['symbol'] for h in headers], ['As', 'In_d'])
+        self.assertEqual(headers[0], PawParser.parse_potcar(self.as_potcar))
+        self.assertEqual(headers[1], PawParser.parse_potcar(self.in_potcar))
+
+    def test_header_only(self):
+        potcar = self._write_large(50000)
+        self.assertEqual(PawParser.parse_potcar(potcar),
+                         PawParser.parse_potcar(self.as_potcar))
+
+    def test_attr_dict(self):
+        kv_list = PotcarParser.header_kv_list(self.as_potcar)
+        attrs = PotcarParser.parse_potcar(self.as_potcar)
+        self.assertEqual(attrs, PotcarParser.kv_dict(kv_list))
+        self.assertIn('TITEL', attrs)
+
+    def test_read_potcar(self):
+        potcar = self._write_large(1000)
+        md5, attrs = PawParser.read_potcar(potcar)
+        with open(potcar) as src:
+            self.assertEqual(md5, hashlib.md5(src.read()).hexdigest())
+        self.assertEqual(attrs, PawParser.parse_potcar(potcar))
@@ -0,0 +1,106 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.tools.codespecific.vasp.io.hr import HrParser
+import numpy as np
+import tempfile
+import shutil
+import os
+
+
+class HrParserTest(AiidaTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'wannier90_hr.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write_hr(self, num_wann, nrpts):
+        '''
+        write a hr.dat in wannier90's format with hoppings decaying with
+        |R|, returns (rvectors, degeneracies, hoppings)
+        '''
+        rvectors = np.random.randint(-4, 5, (nrpts, 3))
+        degeneracies = np.random.randint(1, 9, nrpts)
+        decay = np.exp(-np.abs(rvectors).sum(axis=1))
+        hoppings = (np.random.random((nrpts, num_wann, num_wann)) +
+                    1j * np.random.random((nrpts, num_wann, num_wann)))
+        hoppings = np.round(hoppings * decay[:, None, None], 6)
+        with open(self.path, 'w') as hr:
+            hr.write(' written on 18Oct2016 at 12:00:00\n')
+            hr.write('{:12d}\n{:12d}\n'.format(num_wann, nrpts))
+            for start in range(0, nrpts, 15):
+                hr.write(''.join('{:5d}'.format(d) for d in
+                                 degeneracies[start:start + 15]) + '\n')
+            for r, rvec in enumerate(rvectors):
+                for n in range(num_wann):
+                    for m in range(num_wann):
+                        h = hoppings[r, m, n]
+                        hr.write('{:5d}{:5d}{:5d}{:5d}{:5d}{:12.6f}{:12.6f}\n'
+                                 .format(rvec[0], rvec[1], rvec[2], m + 1,
+                                         n + 1, h.real, h.imag))
+        return rvectors, degeneracies, hoppings
+
+    def test_dense(self):
+        rvectors, degeneracies, hoppings = self._write_hr(5, 37)
+        class BlockParser(HrParser):
+            block_rpts = 8
+        hr = BlockParser(self.path)
+        self.assertEqual(hr.num_wann, 5)
+        self.assertEqual(hr.nrpts, 37)
+        self.assertTrue((hr.rvectors == rvectors).all())
+        self.assertTrue((hr.degeneracies == degeneracies).all())
+        self.assertEqual(hr.hoppings.shape, (37, 5, 5))
+        self.assertTrue(np.allclose(hr.hoppings, hoppings))
+        self.assertIsNone(hr.values)
+
+    def test_sparse(self):
+        rvectors, degeneracies, hoppings = self._write_hr(4, 20)
+        hr = HrParser(self.path, cutoff=1e-2)
+        self.assertIsNone(hr.hoppings)
+        keep = np.abs(hoppings) > 1e-2
+        self.assertEqual(len(hr.values), keep.sum())
+        self.assertTrue(len(hr.values) < hoppings.size)
+        dense = np.zeros_like(hoppings)
+        r, m, n = hr.indices.T
+        dense[r, m, n] = hr.values
+        self.assertTrue(np.allclose(dense, np.where(keep, hoppings, 0)))
+
+    def test_truncated(self):
+        self._write_hr(3, 10)
+        with open(self.path) as hr:
+            lines = hr.readlines()
+        with open(self.path, 'w') as hr:
+            hr.writelines(lines[:-5])
+        with self.assertRaises(ValueError):
+            HrParser(self.path)
+
+    def test_tbmodel(self):
+        from aiida.orm import DataFactory
+        rvectors, degeneracies, hoppings = self._write_hr(6, 30)
+        model = DataFactory('vasp.tbmodel')()
+        model.chunk_bytes = hoppings[0].nbytes * 4
+        model.set_from_hr(self.path)
+        model.store()
+        self.assertFalse(model.is_sparse)
+        self.assertEqual(model.num_wann, 6)
+        self.assertEqual(model.nrpts, 30)
+        self.assertTrue((model.get_rvectors() == rvectors).all())
+        self.assertTrue((model.get_degeneracies() == degeneracies).all())
+        self.assertTrue(np.allclose(model.get_hoppings(), hoppings))
+        self.assertTrue(np.allclose(model.get_hoppings(slice(5, 9)),
+                                    hoppings[5:9]))
+        chunks = list(model.iter_hoppings())
+        self.assertEqual(len(chunks), 8)
+        self.assertTrue(np.allclose(
+            np.concatenate([c[2] for c in chunks]), hoppings))
+
+        model = DataFactory('vasp.tbmodel')()
+        model.set_from_hr(self.path, cutoff=1e-2)
+        model.store()
+        self.assertTrue(model.is_sparse)
+        self.assertEqual(model.cutoff, 1e-2)
+        keep = np.abs(hoppings) > 1e-2
+        self.assertTrue(np.allclose(model.get_hoppings(),
+                                    np.where(keep, hoppings, 0)))
+        self.assertEqual(sum(len(v) for i, v in model.iter_hoppings()),
+                         keep.sum())
@@ -3,7 +3,7 @@ from aiida.djsite.db.testbase import AiidaTestCase
 import numpy as np
 import tempfile
 from os.path import dirname, realpath, join
-from common import Common
+from common import Common, subpath
 
 
 class Vasp5CalcTest(AiidaTestCase):
@@ -152,6 +152,69 @@ class Vasp5CalcTest(AiidaTestCase):
             self.assertTrue(self.calc._need_wfn(),
                             msg='_need_wfn not True for istart=%s' % i)
 
+    def test_retrieve_list(self):
+        self.calc.use_settings(self.calc.new_settings())
+        self.assertEqual(self.calc._retrieve_list({}),
+                         self.calc.max_retrieve_list())
+        psettings = self.calc.new_settings(dict={'outputs': ['structure']})
+        self.assertEqual(
+            self.calc._retrieve_list({'parser_settings': psettings}),
+            ['CONTCAR', 'OUTCAR', 'vasprun.xml'])
+        psettings = self.calc.new_settings(dict={'outputs': ['bands']})
+        self.assertEqual(
+            self.calc._parser_outputs({'parser_settings': psettings}),
+            ['results', 'bands'])
+        psettings = self.calc.new_settings(dict={'profile': True})
+        self.assertEqual(
+            self.calc._retrieve_list({'parser_settings': psettings}),
+            self.calc.max_retrieve_list())
+        self.assertIn('charge_density', self.calc._parser_outputs(
+            {'parser_settings': psettings}))
+
+    def test_retrieve_list_incar(self):
+        self.calc.use_settings(self.calc.new_settings(
+            dict={'lwave': '.FALSE.', 'lorbit': 11, 'nsw': 10, 'ibrion': 2}))
+        psettings = self.calc.new_settings(dict={
+            'retrieve': ['PROCAR', 'PROOUT', 'XDATCAR', 'WAVECAR']})
+        retrieve_list = self.calc._retrieve_list(
+            {'parser_settings': psettings})
+        self.assertIn('PROCAR', retrieve_list)
+        self.assertIn('XDATCAR', retrieve_list)
+        self.assertNotIn('PROOUT', retrieve_list)
+        self.assertNotIn('WAVECAR', retrieve_list)
+        for fname in self.calc.volumetric_files:
+            self.assertNotIn(fname, retrieve_list)
+        psettings = self.calc.new_settings(dict={
+            'outputs': ['charge_density'], 'retrieve': ['LOCPOT']})
+        retrieve_list = self.calc._retrieve_list(
+            {'parser_settings': psettings})
+        self.assertIn('CHGCAR', retrieve_list)
+        self.assertNotIn('LOCPOT', retrieve_list)
+
+    def test_is_written_ionic(self):
+        self.calc.use_settings(self.calc.new_settings(dict={'nsw': 1}))
+        self.assertTrue(self.calc.is_ionic)
+        self.assertTrue(self.calc._is_written('XDATCAR'))
+        self.calc.use_settings(self.calc.new_settings(dict={'nsw': '-1'}))
+        self.assertFalse(self.calc.is_ionic)
+        self.assertFalse(self.calc._is_written('XDATCAR'))
+        self.calc.use_settings(self.calc.new_settings(
+            dict={'nsw': 5, 'ibrion': -1}))
+        self.assertFalse(self.calc.is_ionic)
+
+    def test_retrieve_list_ionic(self):
+        psettings = self.calc.new_settings(dict={
+            'outputs': ['structure'], 'retrieve': ['TMPCAR', 'XDATCAR']})
+        inputdict = {'parser_settings': psettings}
+        self.calc.use_settings(self.calc.new_settings(
+            dict={'nsw': 10, 'ibrion': 1}))
+        self.assertEqual(self.calc._retrieve_list(inputdict),
+                         ['CONTCAR', 'OUTCAR', 'TMPCAR', 'XDATCAR',
+                          'vasprun.xml'])
+        self.calc.use_settings(self.calc.new_settings(dict={'nsw': 0}))
+        self.assertEqual(self.calc._retrieve_list(inputdict),
+                         ['CONTCAR', 'OUTCAR', 'vasprun.xml'])
+
     def test_get_paw_linkname(self):
         self.assertEqual(self.calc._get_paw_linkname('In'), 'paw_In')
 
@@ -163,6 +226,33 @@ class Vasp5CalcTest(AiidaTestCase):
         paw_B = self.calc.Paw.load_paw(family='TEST', symbol='As')[0]
         self.assertEqual(paw_A.pk, paw_B.pk)
 
+    def test_load_paw_indexed(self):
+        Paw = self.calc.Paw
+        Paw.clear_paw_cache()
+        paw = Paw.load_paw(family='TEST', symbol='As')[0]
+        self.assertIn(('TEST', 'As'), Paw._paw_cache)
+        self.assertEqual(Paw.load_paw(family='TEST', symbol='As')[0].pk,
+                         paw.pk)
+        self.assertEqual(
+            Paw.load_paw(family='TEST', element='In')[0].symbol, 'In_d')
+        self.assertEqual(Paw.load_paw(family='TEST', element='In',
+                                      symbol='As', silent=True), [])
+
+    def test_import_family_parallel(self):
+        Paw = self.calc.Paw
+        timings = {}
+        found, uploaded = Paw.import_family(
+            subpath('LDA'), familyname='TEST_PARALLEL', family_desc='',
+            processes=2, timings=timings)
+        self.assertEqual(sorted(found), ['As', 'In_d'])
+        # the same files were already imported into the TEST family
+        self.assertEqual(uploaded, [])
+        self.assertEqual(set(timings), set(['scan', 'lookup', 'store']))
+        group = Paw.get_famgroup('TEST_PARALLEL')
+        self.assertEqual(
+            sorted(p.symbol for p in Paw._query_group(group)),
+            ['As', 'In_d'])
+
     def test_new_setting(self):
         self.assertIsInstance(self.calc.new_settings(),
                               DataFactory('parameter'))
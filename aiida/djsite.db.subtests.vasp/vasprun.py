@@ -0,0 +1,90 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.tools.codespecific.vasp.io.vasprun import (
+    VasprunParser, VasprunStreamParser, _decode_rows, _decode_varray)
+from common import subpath
+import numpy as np
+
+
+class VasprunParserTest(AiidaTestCase):
+    def setUp(self):
+        self.vasprun = subpath('data', 'retrieved_nscf', 'path',
+                               'vasprun.xml')
+        self.vrp = VasprunParser(self.vasprun)
+
+    def test_stream(self):
+        stream = VasprunStreamParser(self.vasprun)
+        for prop in ['bands', 'occupations', 'tdos', 'pdos', 'cell',
+                     'pos', 'projected_bands']:
+            ref = getattr(self.vrp, prop)
+            res = getattr(stream, prop)
+            self.assertEquals(res.dtype, ref.dtype)
+            self.assertEquals(res.shape, ref.shape)
+            self.assertTrue((res == ref).all(), msg=prop)
+        for prop in ['efermi', 'total_energy', 'version', 'datetime',
+                     'is_sc', 'is_md', 'is_relaxation']:
+            self.assertEquals(getattr(stream, prop),
+                              getattr(self.vrp, prop))
+        for key in ['IBRION', 'ISPIN', 'NELECT', 'NBANDS']:
+            self.assertEquals(stream.param(key), self.vrp.param(key))
+
+    def test_total_energy(self):
+        self.assertEquals(self.vrp.total_energy, -36.09677152)
+
+    def test_stream_tag(self):
+        stream = VasprunStreamParser(self.vasprun)
+        fppath = self.vrp._fppath()
+        lookups = [('i', 'ICHARG', '//'), ('i', 'IBRION', '/parameters//'),
+                   ('v', 'MAGMOM', '/parameters//'), ('i', 'program', '//'),
+                   ('varray', 'basis', fppath)]
+        for tag, key, path in lookups:
+            ref = self.vrp.tag(tag, key, path)
+            res = stream.tag(tag, key, path)
+            self.assertEquals(res.attrib, ref.attrib)
+            self.assertEquals((res.text or '').strip(),
+                              (ref.text or '').strip())
+            self.assertEquals([v.text for v in res.findall('v')],
+                              [v.text for v in ref.findall('v')])
+        self.assertIsNone(stream.tag('i', 'NOT_A_KEY', '/parameters//'))
+        self.assertIsNotNone(stream.root.find('parameters'))
+
+    def test_stream_arrays(self):
+        stream = VasprunStreamParser(self.vasprun,
+                                     arrays=['calculation/eigenvalues'])
+        self.assertEquals(stream.bands.shape, self.vrp.bands.shape)
+        self.assertEquals(len(stream.pdos), 0)
+        self.assertRaises(KeyError, getattr, stream, 'tdos')
+
+    def test_index(self):
+        fppath = self.vrp._fppath()
+        lookups = [('i', 'ICHARG', '//'), ('i', 'IBRION', '/parameters//'),
+                   ('v', 'MAGMOM', '/parameters//'), ('i', 'efermi', '//'),
+                   ('varray', 'basis', fppath), ('i', 'program', '//'),
+                   ('i', 'NOT_A_KEY', '/parameters//')]
+        for tag, key, path in lookups:
+            xpath = '{p}{t}[@name="{n}"]'.format(p=path, t=tag, n=key)
+            self.assertIs(self.vrp.tag(tag, key, path),
+                          self.vrp.tree.find(xpath))
+        self.assertEquals(self.vrp.param('ISPIN'), 1)
+        self.assertIn(('i', 'ISPIN', '/parameters//'), self.vrp._values)
+
+    def _reference_rows(self, rows, dtyp):
+        return np.array([tuple(r.split()) for r in rows], dtype=dtyp)
+
+    def test_decode_rows(self):
+        dtyp = np.dtype([('eigene', float), ('occ', float)])
+        rows = ['  %9.4f   %6.4f ' % (-10 + .01 * (i % 500), i % 2)
+                for i in range(200000)]
+        res = _decode_rows(rows, dtyp)
+        ref = self._reference_rows(rows, dtyp)
+        self.assertEquals(res.dtype, ref.dtype)
+        self.assertTrue((res == ref).all())
+
+    def test_decode_rows_mixed(self):
+        rows = ['1 2.5', '3 4.5']
+        dtyp = np.dtype([('a', 'int'), ('b', float)])
+        res = _decode_rows(rows, dtyp)
+        self.assertTrue((res == self._reference_rows(rows, dtyp)).all())
+        dtyp = np.dtype([('a', 'S128'), ('b', float)])
+        res = _decode_rows(rows, dtyp)
+        self.assertTrue((res == self._reference_rows(rows, dtyp)).all())
+        self.assertEquals(_decode_varray(['1 2 3', '4 5 6']).shape, (2, 3))
@@ -0,0 +1,81 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.tools.codespecific.vasp.io.wannier_bands import (
+    WannierBandsParser, find_labels)
+import numpy as np
+import tempfile
+import shutil
+import os
+
+
+class WannierBandsTest(AiidaTestCase):
+    # G-X-M-G
+    path = [['G', 0, 0, 0, 'X', .5, 0, 0],
+            ['X', .5, 0, 0, 'M', .5, .5, 0],
+            ['M', .5, .5, 0, 'G', 0, 0, 0]]
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.dat = os.path.join(self.tmpdir, 'wannier90_band.dat')
+        self.kpt = os.path.join(self.tmpdir, 'wannier90_band.kpt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _kpoints(self, per_segment):
+        '''kpoints along the path, written with wannier90's precision'''
+        segments = []
+        for seg in self.path:
+            start, end = np.array(seg[1:4]), np.array(seg[5:8])
+            frac = np.linspace(0, 1, per_segment, endpoint=False)
+            segments.append(start + frac[:, np.newaxis] * (end - start))
+        segments.append([self.path[-1][5:8]])
+        return np.round(np.concatenate(segments), 6)
+
+    def _write(self, kpoints, nbands):
+        '''write band.kpt and band.dat, returns the energies'''
+        nkp = len(kpoints)
+        energies = np.random.random((nbands, nkp)) * 20 - 10
+        dist = np.linspace(0, 3, nkp)
+        with open(self.kpt, 'w') as kpt:
+            kpt.write('{:12d}\n'.format(nkp))
+            kpt.write(''.join('{:12.6f}{:12.6f}{:12.6f}   1.0\n'.format(*k)
+                              for k in kpoints))
+        with open(self.dat, 'w') as dat:
+            for band in energies:
+                dat.write(''.join('{:16.8E}{:16.8E}\n'.format(d, e)
+                                  for d, e in zip(dist, band)))
+                dat.write(' \n')
+        return energies
+
+    def _labels(self):
+        labels = [[seg[0], seg[1:4]] for seg in self.path]
+        labels.append([self.path[-1][4], self.path[-1][5:8]])
+        return labels
+
+    def test_parse(self):
+        kpoints = self._kpoints(10)
+        energies = self._write(kpoints, 5)
+        parser = WannierBandsParser(self.dat, self.kpt)
+        self.assertEqual(parser.kpoints.shape, (31, 4))
+        self.assertTrue(np.allclose(parser.kpoints[:, :3], kpoints))
+        self.assertEqual(parser.bands.shape, (5, 31, 2))
+        self.assertTrue(np.allclose(parser.bands[:, :, 1], energies,
+                                    atol=1e-7))
+
+    def test_find_labels(self):
+        kpoints = self._kpoints(10)
+        self.assertEqual(find_labels(kpoints, self._labels()),
+                         [(0, 'G'), (10, 'X'), (20, 'M'), (30, 'G')])
+        # within tolerance
+        labels = self._labels()
+        labels[1] = ['X', [.5 + 1e-6, 0, 0]]
+        self.assertEqual(find_labels(kpoints, labels)[1], (10, 'X'))
+        labels.append(['R', [.5, .5, .5]])
+        self.assertRaises(ValueError, find_labels, kpoints, labels)
+
+    def test_dense_path(self):
+        kpoints = self._kpoints(33333)
+        self._write(kpoints, 2)
+        parser = WannierBandsParser(self.dat, self.kpt)
+        labels = find_labels(parser.kpoints, self._labels())
+        self.assertEqual([i for i, l in labels], [0, 33333, 66666, 99999])
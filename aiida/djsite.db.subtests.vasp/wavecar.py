@@ -0,0 +1,68 @@
+from aiida.djsite.db.testbase import AiidaTestCase
+from aiida.tools.codespecific.vasp.io.wavecar import WavecarParser
+import numpy as np
+import tempfile
+import os
+
+
+class WavecarParserTest(AiidaTestCase):
+    def setUp(self):
+        self.tmpd, self.tmpf = tempfile.mkstemp()
+
+    def tearDown(self):
+        os.remove(self.tmpf)
+
+    def _write_wavecar(self, nspin, nkpts, nbands, nplw):
+        '''write a synthetic single precision WAVECAR, returns its data'''
+        recl = 8 * max(4 + 3 * nbands, nplw, 13)
+        eig = np.random.random((nspin, nkpts, nbands))
+        occ = np.random.random((nspin, nkpts, nbands))
+        coeff = (np.random.random((nspin, nkpts, nbands, nplw)) +
+                 1j * np.random.random((nspin, nkpts, nbands, nplw)))
+        coeff = coeff.astype(np.complex64)
+
+        def record(values):
+            rec = np.zeros(recl, dtype=np.uint8)
+            data = np.asarray(values).view(np.uint8)
+            rec[:len(data)] = data
+            return rec.tostring()
+
+        with open(self.tmpf, 'wb') as wav:
+            wav.write(record(np.array([recl, nspin, 45200.])))
+            wav.write(record(np.array(
+                [nkpts, nbands, 400.] + range(9) + [1.5], dtype=float)))
+            for s in range(nspin):
+                for k in range(nkpts):
+                    head = [nplw, k * .1, 0., 0.]
+                    for b in range(nbands):
+                        head += [eig[s, k, b], 0., occ[s, k, b]]
+                    wav.write(record(np.array(head)))
+                    for b in range(nbands):
+                        wav.write(record(coeff[s, k, b]))
+        return eig, occ, coeff
+
+    def test_header(self):
+        self._write_wavecar(2, 3, 4, 10)
+        wav = WavecarParser(self.tmpf)
+        self.assertEquals(wav.nspin, 2)
+        self.assertEquals(wav.nkpts, 3)
+        self.assertEquals(wav.nbands, 4)
+        self.assertEquals(wav.encut, 400.)
+        self.assertEquals(wav.header['efermi'], 1.5)
+        self.assertEquals(wav.dtype, np.complex64)
+        self.assertEquals(wav.record(1, 2, 3), 2 + 5 * 5 + 4)
+
+    def test_random_access(self):
+        eig, occ, coeff = self._write_wavecar(2, 3, 4, 10)
+        wav = WavecarParser(self.tmpf)
+        self.assertTrue((wav.eigenvalues == eig).all())
+        self.assertTrue((wav.occupations == occ).all())
+        self.assertTrue(np.allclose(wav.kpoints[:, 0], [0, .1, .2]))
+        self.assertTrue((wav.get_coefficients(1, 2, 3) ==
+                         coeff[1, 2, 3]).all())
+        self.assertTrue((wav.get_coefficients(0, 1) == coeff[0, 1]).all())
+
+    def test_invalid(self):
+        with open(self.tmpf, 'w') as wav:
+            wav.write('TEST\n')
+        self.assertRaises(ValueError, WavecarParser, self.tmpf)
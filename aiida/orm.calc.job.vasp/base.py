@@ -1,6 +1,8 @@
 from aiida.orm import JobCalculation, DataFactory
 from aiida.common.utils import classproperty
 from aiida.common.datastructures import CalcInfo, CodeInfo
+from aiida.tools.codespecific.vasp.atoms import get_ase
+import os
 
 
 def ordered_unique_list(in_list):
@@ -318,6 +320,9 @@ class BasicCalculation(VaspCalcBase):
     paw = Input(types='vasp.paw', param='kind')
     kpoints = Input(types='array.kpoints')
     default_parser = 'vasp.basic'
+    # keep POTCARs concatenated from the same PAWs in a directory (a path,
+    # or True for the aiida config folder) and hard link them from there
+    potcar_cache = None
 
     def _prepare_for_submission(self, tempfolder, inputdict):
         '''retrieve only OUTCAR and vasprun.xml, extend in
@@ -350,28 +355,54 @@ class BasicCalculation(VaspCalcBase):
         '''
         from ase.io.vasp import write_vasp
         with open(dst, 'w') as poscar:
-            write_vasp(poscar, self.inp.structure.get_ase(), vasp5=True)
+            write_vasp(poscar, get_ase(self.inp.structure), vasp5=True)
 
     def write_potcar(self, inputdict, dst):
         '''
         concatenatest multiple paw files into a POTCAR
 
+        If :py:attr:`potcar_cache` is set, the POTCAR is written to the
+        cache once per ordered combination of PAW nodes and hard linked
+        (or copied, if that fails) to dst.
+
         :param inputdict: required by baseclass
         :param dst: absolute path of the file to write to
         '''
-        import subprocess32 as sp
-        catcom = ['cat']
+        from aiida.tools.codespecific.vasp.io.potcar import concatenate
         # ~ structure = inputdict['structure']
         # ~ structure = self.inp.structure
         # order the symbols according to order given in structure
         if 'elements' not in self.attrs():
             self._prestore()
-        for kind in self.elements:
-            paw = inputdict[self._get_paw_linkname(kind)]
-            catcom.append(paw.get_abs_path('POTCAR'))
-        # cat the pawdata nodes into the file
-        with open(dst, 'w') as pc:
-            sp.check_call(catcom, stdout=pc)
+        paws = [inputdict[self._get_paw_linkname(kind)]
+                for kind in self.elements]
+        sources = [paw.get_abs_path('POTCAR') for paw in paws]
+        cachedir = self._potcar_cache_dir()
+        if not cachedir:
+            concatenate(sources, dst)
+            return
+        import hashlib
+        import shutil
+        key = hashlib.md5('|'.join(paw.uuid for paw in paws)).hexdigest()
+        cached = os.path.join(cachedir, key)
+        if not os.path.isfile(cached):
+            if not os.path.isdir(cachedir):
+                os.makedirs(cachedir)
+            tmp = '{}.{}.tmp'.format(cached, os.getpid())
+            concatenate(sources, tmp)
+            os.rename(tmp, cached)
+        try:
+            os.link(cached, dst)
+        except OSError:
+            shutil.copyfile(cached, dst)
+
+    def _potcar_cache_dir(self):
+        '''the directory of cached POTCARs or None if not used'''
+        if self.potcar_cache is True:
+            from aiida.common.setup import AIIDA_CONFIG_FOLDER
+            return os.path.join(
+                os.path.expanduser(AIIDA_CONFIG_FOLDER), 'vasp', 'potcar')
+        return self.potcar_cache or None
 
     def _write_kpoints_mesh(self, dst):
         kp = self.inp.kpoints
@@ -446,7 +477,7 @@ class BasicCalculation(VaspCalcBase):
         '''
         super(BasicCalculation, self)._prestore()
         self._set_attr('elements', list(ordered_unique_list(
-            self.inp.structure.get_ase().get_chemical_symbols())))
+            get_ase(self.inp.structure).get_chemical_symbols())))
 
     @property
     def _settings(self):
@@ -39,3 +39,10 @@ def dict_to_incar(incar_dict):
 def par_to_incar(incar_pardat):
     incar_dict = incar_pardat.get_dict()
     return dict_to_incar(incar_dict)
+
+
+def incar_bool(value):
+    '''read a logical INCAR value given as bool or in fortran notation'''
+    if isinstance(value, (str, unicode)):
+        return value.strip().strip('.').upper().startswith('T')
+    return bool(value)
@@ -1,5 +1,6 @@
 from aiida.orm import CalculationFactory, DataFactory
 from aiida.tools.codespecific.vasp.default_paws import lda, gw
+from aiida.tools.codespecific.vasp.atoms import get_ase
 from base import ordered_unique_list
 import os
 
@@ -34,6 +35,12 @@ class VaspMaker(object):
         start with those as inputs.
     :type continue_from: vasp calculation node
 
+    :keyword bool link_remote: if True, calculations continued from
+        continue_from take CHGCAR and WAVECAR directly from its remote
+        folder (symlinked or copied on the cluster) instead of using its
+        charge_density and wavefunctions outputs. This is also done if
+        continue_from has no such outputs.
+
     :keyword copy_from: A vasp calculation. It's inputs will be used as
         defaults for the created calculations.
     :type copy_from: vasp calculation node
@@ -44,6 +51,12 @@ class VaspMaker(object):
     :keyword wavefunctions: wavefunctions node from a previously run
         calculation
     :type wavefunctions: WavefunData
+    :keyword parent_folder: remote folder of a previously run calculation
+        to take CHGCAR and WAVECAR from
+    :type parent_folder: RemoteData
+    :keyword parser_settings: parameter node selecting the outputs to be
+        parsed and retrieved
+    :type parser_settings: ParameterData
     :keyword array.KpointsData kpoints: kpoints node to use for input
     :keyword str paw_family: The name of a PAW family stored in the db
     :keyword str paw_map: A dictionary mapping element symbols -> PAW
@@ -62,6 +75,11 @@ class VaspMaker(object):
         :returns: an instance of :py:attr:`calc_cls`, initialized with the data
         held by the VaspMaker
 
+    .. py:method:: new_many(variations[, store=False])
+
+        :returns: a list of :py:attr:`calc_cls` instances, one per dict of
+        overrides in variations, sharing identical input nodes
+
     .. py:method:: add_settings(**kwargs)
 
         Adds keys to the settings (INCAR keywords), if settings is already
@@ -101,6 +119,10 @@ class VaspMaker(object):
 
     .. py:attribute:: charge_density
 
+    .. py:attribute:: parent_folder
+
+    .. py:attribute:: parser_settings
+
     .. py:attribute:: elements
 
         Chemical symbols of the elements contained in py:attr:structure
@@ -109,7 +131,8 @@ class VaspMaker(object):
         self._init_defaults(*args, **kwargs)
         self._calcname = kwargs.get('calc_cls')
         if 'continue_from' in kwargs:
-            self._init_from(kwargs['continue_from'])
+            self._init_from(kwargs['continue_from'],
+                            link_remote=kwargs.get('link_remote', False))
         if 'copy_from' in kwargs:
             self._copy_from(kwargs['copy_from'])
 
@@ -132,6 +155,8 @@ class VaspMaker(object):
         self.kpoints = self._kpoints
         self._charge_density = kwargs.get('charge_density', None)
         self._wavefunctions = kwargs.get('wavefunctions', None)
+        self._parent_folder = kwargs.get('parent_folder', None)
+        self._parser_settings = kwargs.get('parser_settings', None)
         self._wannier_settings = kwargs.get('wannier_settings', None)
         self._wannier_data = kwargs.get('wannier_data', None)
         self._recipe = None
@@ -153,64 +178,222 @@ class VaspMaker(object):
         self._kpoints = ins.get('kpoints')
         self._charge_density = ins.get('charge_density')
         self._wavefunctions = ins.get('wavefunctions')
+        self._parent_folder = ins.get('parent_folder')
+        # copies and continuations are usually run in the same screening,
+        # they keep parsing and retrieving only the outputs asked for
+        self._parser_settings = ins.get('parser_settings')
         self._wannier_settings = ins.get('wannier_settings')
         self._wannier_data = ins.get('wannier_data')
         self._queue = calc.get_queue_name()
         self._resources = calc.get_resources()
 
     def _set_default_structure(self, structure):
+        self._structure = self._make_structure(structure)
+
+    def _make_structure(self, structure):
         if not structure:
-            self._structure = self.calc_cls.new_structure()
+            return self.calc_cls.new_structure()
         elif isinstance(structure, (str, unicode)):
             structure = os.path.abspath(structure)
             if os.path.splitext(structure)[1] == '.cif':
-                self._structure = DataFactory(
-                    'cif').get_or_create(structure)[0]
+                return DataFactory('cif').get_or_create(structure)[0]
             elif os.path.basename(structure) == 'POSCAR':
                 from ase.io.vasp import read_vasp
                 pwd = os.path.abspath(os.curdir)
                 os.chdir(os.path.dirname(structure))
                 atoms = read_vasp('POSCAR')
                 os.chdir(pwd)
-                self._structure = self.calc_cls.new_structure()
-                self._structure.set_ase(atoms)
+                result = self.calc_cls.new_structure()
+                result.set_ase(atoms)
+                return result
         else:
-            self._structure = structure
+            return structure
 
-    def _init_from(self, prev):
+    def _init_from(self, prev, link_remote=False):
         out = prev.get_outputs_dict()
         self._copy_from(prev)
         if 'structure' in out:
             self.structure = prev.out.structure
         self.rewrite_settings(istart=1, icharg=11)
-        self.wavefunctions = prev.out.wavefunctions
-        self.charge_density = prev.out.charge_density
+        if link_remote or 'charge_density' not in out:
+            self.parent_folder = prev.out.remote_folder
+            self._wavefunctions = None
+            self._charge_density = None
+        else:
+            # prev's own parent folder belongs to the run before it
+            self._parent_folder = None
+            self.wavefunctions = prev.out.wavefunctions
+            self.charge_density = prev.out.charge_density
         self._wannier_settings = out.get('wannier_settings',
                                          self._wannier_settings)
         self._wannier_data = out.get('wannier_data', self.wannier_data)
 
     def new(self):
+        return self._build(self._structure, self.elements, self._settings,
+                           self._kpoints)
+
+    _build_keys = ['code', 'computer', 'queue', 'resources', 'label',
+                   'charge_density', 'wavefunctions', 'parent_folder',
+                   'parser_settings', 'wannier_settings', 'wannier_data']
+
+    def _build(self, structure, elements, settings, kpoints, **kwargs):
+        unknown = set(kwargs) - set(self._build_keys)
+        if unknown:
+            raise TypeError('unknown keys: %s' % ', '.join(sorted(unknown)))
+
+        def get(key):
+            return kwargs.get(key, getattr(self, '_' + key))
         calc = self.calc_cls()
-        calc.use_code(self._code)
-        calc.use_structure(self._structure)
-        for k in self.elements:
+        calc.use_code(get('code'))
+        calc.use_structure(structure)
+        for k in elements:
             calc.use_paw(self._paws[k], kind=k)
-        calc.use_settings(self._settings)
-        calc.use_kpoints(self._kpoints)
-        calc.set_computer(self._computer)
-        calc.set_queue_name(self._queue)
-        if self._charge_density:
-            calc.use_charge_density(self._charge_density)
-        if self._wavefunctions:
-            calc.use_wavefunctions(self._wavefunctions)
-        if self._wannier_settings:
-            calc.use_wannier_settings(self._wannier_settings)
-        if self._wannier_data:
-            calc.use_wannier_data(self._wannier_data)
-        calc.label = self.label
-        calc.set_resources(self._resources)
+        calc.use_settings(settings)
+        calc.use_kpoints(kpoints)
+        calc.set_computer(get('computer'))
+        calc.set_queue_name(get('queue'))
+        if get('charge_density'):
+            calc.use_charge_density(get('charge_density'))
+        if get('wavefunctions'):
+            calc.use_wavefunctions(get('wavefunctions'))
+        if get('parent_folder'):
+            calc.use_parent_folder(get('parent_folder'))
+        if get('parser_settings'):
+            calc.use_parser_settings(get('parser_settings'))
+        if get('wannier_settings'):
+            calc.use_wannier_settings(get('wannier_settings'))
+        if get('wannier_data'):
+            calc.use_wannier_data(get('wannier_data'))
+        calc.label = kwargs.get('label', self.label)
+        calc.set_resources(get('resources'))
         return calc
 
+    def new_many(self, variations, store=False):
+        '''
+        create a batch of calculations, each differing from what
+        :py:meth:`new` would return by one dict in variations.
+
+        Recognized keys are 'settings' (a dict of INCAR keywords that
+        are added to or overwrite the maker's settings), 'structure'
+        (anything accepted by the structure property), 'kpoints' and
+        'code', 'computer', 'queue', 'resources', 'label',
+        'charge_density', 'wavefunctions', 'parent_folder',
+        'parser_settings', 'wannier_settings' and 'wannier_data', which
+        replace the corresponding node or value. Other keys (e.g.
+        paw_family or paw_map) raise a TypeError, PAWs are always taken
+        from the maker.
+
+        Structures, their elements and cells, PAWs, settings and kpoints
+        nodes are resolved once for the whole batch and identical nodes
+        are shared between the calculations. New settings are looked up
+        in the database first and an identical stored node is reused.
+        Kpoints are copied for structures with a different cell.
+
+        :param bool store: store all calculations with their inputs in a
+            single transaction, see :py:meth:`_store_batch`
+        :return: list of calculations, in the order of variations
+        '''
+        structures = {}
+        settings_nodes = {}
+        kpoints_nodes = {}
+        calcs = []
+        for variation in variations:
+            variation = dict(variation)
+            structure = variation.pop('structure', self._structure)
+            if id(structure) not in structures:
+                node = self._make_structure(structure)
+                atoms = get_ase(node)
+                elements = ordered_unique_list(atoms.get_chemical_symbols())
+                missing = [k for k in elements if k not in self._paws]
+                if missing:
+                    self._set_default_paws(elements=missing)
+                structures[id(structure)] = (node, elements, atoms.get_cell())
+            structure, elements, cell = structures[id(structure)]
+
+            settings = self.settings
+            settings.update(variation.pop('settings', {}))
+            skey = repr(sorted(settings.items()))
+            if settings == self.settings:
+                settings_nodes[skey] = self._settings
+            elif skey not in settings_nodes:
+                settings_nodes[skey] = (
+                    self._find_settings(settings) or
+                    self.calc_cls.new_settings(dict=settings))
+
+            kpoints = variation.pop('kpoints', self._kpoints)
+            kkey = (id(kpoints), id(structure))
+            if kkey not in kpoints_nodes:
+                kpoints_nodes[kkey] = self._kpoints_for_cell(kpoints, cell)
+
+            calcs.append(self._build(structure, elements,
+                                     settings_nodes[skey],
+                                     kpoints_nodes[kkey], **variation))
+        if store:
+            self._store_batch(calcs)
+        return calcs
+
+    @classmethod
+    def _store_batch(cls, calcs):
+        '''
+        store calcs with their inputs in a single transaction. The
+        database is rolled back on errors but the file repository is not,
+        so the folders of the nodes stored before the error are removed
+        and the error is raised again. The in-memory nodes still consider
+        themselves stored after such a failure and can not be used
+        anymore, the batch has to be built again.
+        '''
+        from django.db import transaction
+        new_nodes = {}
+        for calc in calcs:
+            for node in [calc] + calc.get_inputs():
+                if not node._is_stored:
+                    new_nodes[id(node)] = node
+        try:
+            with transaction.atomic():
+                for calc in calcs:
+                    calc.store_all()
+        except Exception:
+            for node in new_nodes.itervalues():
+                if node._is_stored:
+                    node._repository_folder.erase()
+            raise
+
+    def _find_settings(self, settings):
+        '''
+        a stored settings node holding exactly the given dict, or None.
+        Only dicts of scalar values are looked up.
+        '''
+        fields = {bool: 'bval', int: 'ival', float: 'fval', str: 'tval',
+                  unicode: 'tval'}
+        if not settings:
+            return None
+        query = DataFactory('parameter').query()
+        for key, value in settings.iteritems():
+            field = fields.get(type(value))
+            if not field:
+                return None
+            query = query.filter(dbattributes__key=key, **{
+                'dbattributes__' + field: value})
+        for node in query.distinct():
+            if node.get_dict() == settings:
+                return node
+        return None
+
+    def _kpoints_for_cell(self, kpoints, cell):
+        '''
+        kpoints with the given cell, copied if the cell differs, so nodes
+        already used by other calculations are never changed
+        '''
+        import numpy as np
+        try:
+            if np.allclose(kpoints.cell, cell):
+                return kpoints
+        except AttributeError:
+            pass
+        kpoints = kpoints.copy()
+        kpoints.set_cell(cell)
+        return kpoints
+
     # ~ def new_or_stored(self):
     # ~     # start building the query
     # ~     query_set = self.calc_cls.query()
@@ -238,7 +421,7 @@ class VaspMaker(object):
         self._set_default_paws()
         if self._kpoints.pk:
             self._kpoints = self._kpoints.copy()
-        self._kpoints.set_cell(self._structure.get_ase().get_cell())
+        self._kpoints.set_cell(get_ase(self._structure).get_cell())
 
     @property
     def settings(self):
@@ -251,7 +434,7 @@ class VaspMaker(object):
     @kpoints.setter
     def kpoints(self, kp):
         self._kpoints = kp
-        self._kpoints.set_cell(self._structure.get_ase().get_cell())
+        self._kpoints.set_cell(get_ase(self._structure).get_cell())
 
     def set_kpoints_path(self, value=None, weights=None, **kwargs):
         '''
@@ -306,6 +489,23 @@ class VaspMaker(object):
         self._charge_density = val
         self.add_settings(icharg=11)
 
+    @property
+    def parent_folder(self):
+        return self._parent_folder
+
+    @parent_folder.setter
+    def parent_folder(self, val):
+        self._parent_folder = val
+        self.add_settings(istart=1, icharg=11)
+
+    @property
+    def parser_settings(self):
+        return self._parser_settings
+
+    @parser_settings.setter
+    def parser_settings(self, val):
+        self._parser_settings = val
+
     @property
     def wannier_settings(self):
         return self._wannier_settings
@@ -380,7 +580,8 @@ class VaspMaker(object):
             conflict |= (self.settings.get(k) != v)
         return conflict
 
-    def _set_default_paws(self, overwrite=False, silent=False):
+    def _set_default_paws(self, overwrite=False, silent=False,
+                          elements=None):
         if self._paw_fam.lower() == 'LDA':
             defaults = self._paw_def or lda
         elif self._paw_fam.lower() in ['PBE', 'GW']:
@@ -394,7 +595,7 @@ class VaspMaker(object):
                 return None
             else:
                 defaults = self._paw_def
-        for k in self.elements:
+        for k in elements or self.elements:
             if k not in self._paws or overwrite:
                 paw = self.calc_cls.Paw.load_paw(
                     family=self._paw_fam, symbol=defaults[k])[0]
@@ -403,7 +604,7 @@ class VaspMaker(object):
     @property
     def elements(self):
         return ordered_unique_list(
-            self._structure.get_ase().get_chemical_symbols())
+            get_ase(self._structure).get_chemical_symbols())
 
     def pkcmp(self, nodeA, nodeB):
         if nodeA.pk < nodeB.pk:
@@ -440,7 +641,8 @@ class VaspMaker(object):
 
     def check_magmom(self):
         magmom = self.settings.get('magmom', [])
-        st_magmom = self._structure.get_ase().get_initial_magnetic_moments()
+        st_magmom = get_ase(
+            self._structure).get_initial_magnetic_moments()
         lsf = self.noncol and 3 or 1
         nio = self.n_ions
         s_mm = nio * lsf
@@ -462,12 +664,12 @@ class VaspMaker(object):
 
     @property
     def n_ions(self):
-        return self.structure.get_ase().get_number_of_atoms()
+        return get_ase(self.structure).get_number_of_atoms()
 
     @property
     def n_elec(self):
         res = 0
-        for k in self._structure.get_ase().get_chemical_symbols():
+        for k in get_ase(self._structure).get_chemical_symbols():
             res += self._paws[k].valence
         return res
 
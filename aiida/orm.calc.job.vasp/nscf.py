@@ -1,11 +1,18 @@
 from base import BasicCalculation, Input
 from aiida.orm import DataFactory
+import os
 
 
 class NscfCalculation(BasicCalculation):
     '''
     Runs VASP with precalculated (from scf run) wave functions and charge densities.
     Used to obtain bandstructures, DOS and wannier90 input files.
+
+    Instead of charge_density and wavefunctions nodes, the remote folder
+    of the previous run can be given as parent_folder input. CHGCAR and
+    WAVECAR are then taken from there on the cluster, symlinked if VASP
+    will not overwrite them and copied otherwise, so they never have to
+    be retrieved or uploaded.
     '''
     charge_density = Input(types='vasp.chargedensity',
                            doc='chargedensity node: should be obtained \n' +
@@ -14,18 +21,66 @@ class NscfCalculation(BasicCalculation):
     wavefunctions = Input(types='vasp.wavefun',
                           doc='wavefunction node: to speed up convergence ' +
                           'for continuation jobs')
+    parent_folder = Input(types='remote',
+                          doc='remote folder of a previous run: ' +
+                          'CHGCAR and WAVECAR are linked or copied ' +
+                          'from there, if not given as nodes')
     default_parser = 'vasp.nscf'
 
     def verify_inputs(self, inputdict):
         super(NscfCalculation, self).verify_inputs(inputdict)
-        self.check_input(inputdict, 'charge_density', self._need_chgd)
-        self.check_input(inputdict, 'wavefunctions', self._need_wfn)
+        remote = 'parent_folder' in inputdict
+        self.check_input(inputdict, 'charge_density',
+                         lambda: self._need_chgd() and not remote)
+        self.check_input(inputdict, 'wavefunctions',
+                         lambda: self._need_wfn() and not remote)
         if not self._need_chgd() and inputdict.get('charge_density'):
             msg = 'charge_density node given but '
             msg += '"icharg" key in settings not set '
             msg += 'to either 1 o 11. charge_density node not used --> .'
             msg += 'CHGCAR not written'
             self.logger.warning(msg)
+        if self._need_wfn() and inputdict.get('wavefunctions'):
+            self.check_wavefunctions(inputdict)
+
+    def check_wavefunctions(self, inputdict):
+        '''
+        compare the WAVECAR header of the wavefunctions input to the
+        settings. With istart=2 (constant basis set) a different ENCUT or
+        number of kpoints is an error, otherwise differences are logged.
+        '''
+        try:
+            wavecar = inputdict['wavefunctions'].get_wavecar()
+        except (ValueError, IOError, OSError) as err:
+            self.logger.warning('wavefunctions input: %s' % err)
+            return
+        istart = int(self._settings.get('istart', 1))
+        encut = self._settings.get('encut')
+        tpl = 'wavefunctions input has {} {}, inputs ask for {}'
+        if encut is not None and abs(float(encut) - wavecar.encut) > 1e-3:
+            msg = tpl.format('encut', wavecar.encut, encut)
+            if istart == 2:
+                raise ValueError(msg)
+            self.logger.warning(msg)
+        nkpts = self._get_nkpts(inputdict)
+        if nkpts is not None and nkpts != wavecar.nkpts:
+            msg = tpl.format('nkpts', wavecar.nkpts, nkpts)
+            if istart == 2:
+                raise ValueError(msg)
+            self.logger.warning(msg)
+        nbands = self._settings.get('nbands')
+        if nbands is not None and int(nbands) != wavecar.nbands:
+            self.logger.warning(tpl.format('nbands', wavecar.nbands, nbands))
+        ispin = int(self._settings.get('ispin', 1))
+        if ispin != wavecar.nspin:
+            self.logger.warning(tpl.format('ispin', wavecar.nspin, ispin))
+
+    def _get_nkpts(self, inputdict):
+        '''number of kpoints in an explicit kpoints list input or None'''
+        kpoints = inputdict.get('kpoints')
+        if kpoints and kpoints.get_attrs().get('array|kpoints'):
+            return len(kpoints.get_kpoints())
+        return None
 
     def _prepare_for_submission(self, tempfolder, inputdict):
         '''add EIGENVAL, DOSCAR, and all files starting with wannier90 to
@@ -34,16 +89,50 @@ class NscfCalculation(BasicCalculation):
             tempfolder, inputdict)
         calcinfo.retrieve_list.extend(['EIGENVAL', 'DOSCAR'])
         calcinfo.retrieve_list.append(['wannier90*', '.', 0])
+        calcinfo.remote_copy_list = []
+        calcinfo.remote_symlink_list = []
+        remote_files = self._remote_files(inputdict)
+        if remote_files:
+            parent = inputdict['parent_folder']
+            computer = parent.get_computer().uuid
+            for fname, link in remote_files:
+                item = (computer,
+                        os.path.join(parent.get_remote_path(), fname),
+                        fname)
+                if link:
+                    calcinfo.remote_symlink_list.append(item)
+                else:
+                    calcinfo.remote_copy_list.append(item)
         return calcinfo
 
+    def _remote_files(self, inputdict):
+        '''
+        CHGCAR and WAVECAR files to be taken from the parent_folder,
+        because they are needed but not given as nodes.
+
+        :return: list of (filename, symlink) tuples, symlink is True
+            if VASP will not write to the file
+        '''
+        from incar import incar_bool
+        if 'parent_folder' not in inputdict:
+            return []
+        files = []
+        if self._need_chgd() and 'charge_density' not in inputdict:
+            lcharg = incar_bool(self._settings.get('lcharg', True))
+            files.append(('CHGCAR', not lcharg))
+        if self._need_wfn() and 'wavefunctions' not in inputdict:
+            lwave = incar_bool(self._settings.get('lwave', True))
+            files.append(('WAVECAR', not lwave))
+        return files
+
     def write_additional(self, tempfolder, inputdict):
         '''write CHGAR and WAVECAR files if needed'''
         super(NscfCalculation, self).write_additional(
             tempfolder, inputdict)
-        if self._need_chgd():
+        if self._need_chgd() and 'charge_density' in inputdict:
             chgcar = tempfolder.get_abs_path('CHGCAR')
             self.write_chgcar(inputdict, chgcar)
-        if self._need_wfn():
+        if self._need_wfn() and 'wavefunctions' in inputdict:
             wavecar = tempfolder.get_abs_path('WAVECAR')
             self.write_wavecar(inputdict, wavecar)
 
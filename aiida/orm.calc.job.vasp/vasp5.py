@@ -1,4 +1,4 @@
-from base import VaspCalcBase
+from base import VaspCalcBase, Input
 from nscf import NscfCalculation
 from wannier import WannierBase
 from aiida.orm import DataFactory
@@ -11,16 +11,141 @@ class Vasp5Calculation(NscfCalculation, WannierBase):
     so if storage space is a concern, consider deriving from it
     and overriding the retrieve_list in the subclass so only
     the necessary files are retrieved from the server.
+
+    Alternatively, a parser_settings input of the form
+    ``{'outputs': ['structure', ...], 'retrieve': ['PROCAR', ...]}``
+    selects the output nodes to be parsed. Only the files needed for those
+    (see :py:attr:`output_files`) and the ones listed under 'retrieve' are
+    retrieved, as far as VASP writes them according to the INCAR settings
+    (LCHARG, LWAVE, LVTOT, LELF, LORBIT, IBRION / NSW), and the parser
+    skips everything else. The 'results' output is always created.
+
+    The volumetric files (:py:attr:`volumetric_files`) have to be asked for
+    explicitly, either by listing them under 'retrieve' or by listing
+    the 'charge_density' or 'wavefunctions' outputs, which are not
+    parsed by default if parser_settings is given.
+
+    ``{'profile': True}`` makes the parser record where the parsing time
+    goes, ``{'profile': 'output'}`` also adds the report as an output
+    node (see :py:class:`~aiida.parsers.plugins.vasp.base.BaseParser`).
+    The 'profile' key does not select anything, parser_settings holding
+    only that key retrieve and parse everything.
     '''
     default_parser = 'vasp.vasp5'
+    parser_settings = Input(types='parameter',
+                            doc='parameter node: selects the output ' +
+                            'nodes to be parsed and the files to retrieve')
+    output_files = {
+        'results': ['OUTCAR', 'vasprun.xml'],
+        'structure': ['CONTCAR'],
+        'bands': ['EIGENVAL'],
+        'kpoints': ['EIGENVAL', 'IBZKPT'],
+        'dos': ['DOSCAR'],
+        'charge_density': ['CHGCAR'],
+        'wavefunctions': ['WAVECAR'],
+        'wannier_settings': [['wannier90*', '.', 0]],
+        'wannier_data': [['wannier90*', '.', 0]]
+    }
+    volumetric_files = ['CHG', 'CHGCAR', 'ELFCAR', 'LOCPOT', 'WAVECAR']
+    # parser_settings keys which do not select outputs or files
+    parser_only_keys = ['profile']
 
     def _prepare_for_submission(self, tempfolder, inputdict):
-        '''retrieve all output files potentially created by VASP'''
+        '''
+        retrieve all output files potentially created by VASP,
+        or only those needed for the outputs requested in parser_settings
+        '''
         calcinfo = super(Vasp5Calculation, self)._prepare_for_submission(
             tempfolder, inputdict)
-        calcinfo.retrieve_list = VaspCalcBase.max_retrieve_list()
+        calcinfo.retrieve_list = self._retrieve_list(inputdict)
         return calcinfo
 
+    def _selects_outputs(self, psettings):
+        '''
+        wether the parser_settings node psettings restricts the outputs
+        and retrieved files, ie has keys besides :py:attr:`parser_only_keys`
+        '''
+        if not psettings:
+            return False
+        return bool(set(psettings.get_dict()) - set(self.parser_only_keys))
+
+    def _retrieve_list(self, inputdict):
+        retrieve_list = VaspCalcBase.max_retrieve_list()
+        if not self._selects_outputs(inputdict.get('parser_settings')):
+            return retrieve_list
+        needed = list(inputdict['parser_settings'].get_dict().get(
+            'retrieve', []))
+        for output in self._parser_outputs(inputdict):
+            needed.extend(self.output_files[output])
+        return [f for f in retrieve_list
+                if f in needed and self._is_written(f)]
+
+    @property
+    def is_ionic(self):
+        '''
+        wether the INCAR settings ask for ionic steps (MD or relaxation),
+        ie NSW > 0 and IBRION != -1
+        '''
+        nsw, ibrion = self._ionic_settings()
+        return nsw > 0 and ibrion != -1
+
+    def _ionic_settings(self):
+        '''
+        (NSW, IBRION) from the INCAR settings, with VASP's defaults
+        (NSW = 0, IBRION = -1 for NSW in (0, -1), else 0)
+        '''
+        settings = self._settings
+        nsw = int(settings.get('nsw', 0))
+        ibrion = int(settings.get('ibrion', -1 if nsw in (0, -1) else 0))
+        return nsw, ibrion
+
+    def _is_written(self, fname):
+        '''
+        wether VASP writes the output file fname, according to the
+        INCAR settings. Lists of retrieve patterns are always kept.
+        '''
+        from incar import incar_bool
+        if not isinstance(fname, basestring):
+            return True
+        settings = self._settings
+        nsw, ibrion = self._ionic_settings()
+        ionic = nsw > 0 and ibrion != -1
+        lorbit = settings.get('lorbit')
+        written = {
+            'CHG': incar_bool(settings.get('lcharg', True)),
+            'CHGCAR': incar_bool(settings.get('lcharg', True)),
+            'WAVECAR': incar_bool(settings.get('lwave', True)),
+            'LOCPOT': (incar_bool(settings.get('lvtot', False)) or
+                       incar_bool(settings.get('lvhar', False))),
+            'ELFCAR': incar_bool(settings.get('lelf', False)),
+            'PROCAR': lorbit is not None,
+            'PROOUT': lorbit in [1, 2, 5, 12],
+            'XDATCAR': ionic,
+            'PCDAT': ionic,
+            'TMPCAR': ibrion in [0, 1, 2],
+            'STOPCAR': False
+        }
+        return written.get(fname, True)
+
+    def _parser_outputs(self, inputdict):
+        '''
+        list of outputs to be parsed, as given in the parser_settings
+        input (all outputs if not given, all but the volumetric ones if
+        parser_settings is given without 'outputs')
+        '''
+        outputs = self.output_files.keys()
+        psettings = inputdict.get('parser_settings')
+        if self._selects_outputs(psettings):
+            outputs = psettings.get_dict().get('outputs', [
+                o for o in outputs
+                if not any(f in self.volumetric_files
+                           for f in self.output_files[o])])
+        return ['results'] + [o for o in outputs if o != 'results']
+
+    @property
+    def parser_outputs(self):
+        return self._parser_outputs(self.get_inputs_dict())
+
     def verify_inputs(self, inputdict, *args, **kwargs):
         # ~ notset_msg = 'input not set: %s'
         super(Vasp5Calculation, self).verify_inputs(inputdict, *args, **kwargs)
@@ -31,8 +156,16 @@ class Vasp5Calculation(NscfCalculation, WannierBase):
         for kind in self.elements:
             self.check_input(inputdict, self._get_paw_linkname(kind))
         self.check_input(inputdict, 'kpoints', self._need_kp)
-        self.check_input(inputdict, 'charge_density', self._need_chgd)
-        self.check_input(inputdict, 'wavefunctions', self._need_wfn)
+        remote = 'parent_folder' in inputdict
+        self.check_input(inputdict, 'charge_density',
+                         lambda: self._need_chgd() and not remote)
+        self.check_input(inputdict, 'wavefunctions',
+                         lambda: self._need_wfn() and not remote)
+        unknown = set(self._parser_outputs(inputdict)) - set(
+            self.output_files)
+        if unknown:
+            raise ValueError('parser_settings: unknown outputs: %s' %
+                             ', '.join(sorted(unknown)))
 
     @classmethod
     def _get_paw_linkname(cls, kind):
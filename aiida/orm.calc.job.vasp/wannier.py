@@ -82,11 +82,20 @@ class WannierBase(object):
 
 
 class WannierCalculation(JobCalculation, WannierBase):
+    '''
+    runs wannier.x on the settings and data of a vasp2wannier run.
+
+    An optional parser_settings input ``{'hr_cutoff': 1e-4}`` makes the
+    parser keep only hoppings with a larger magnitude in the tb_model
+    output (see :py:class:`~aiida.orm.data.vasp.tbmodel.TbmodelData`).
+    '''
     __metaclass__ = CalcMeta
     imput_file_name = 'wannier90.win'
     output_file_name = 'wannier90.wout'
     settings = Input(types='parameter')
     data = Input(types='vasp.archive')
+    parser_settings = Input(types='parameter',
+                            doc='parameter node: options for the parser')
     default_parser = 'vasp.wannier'
 
     def _prepare_for_submission(self, tempfolder, inputdict):
@@ -1,17 +1,24 @@
 # ~ import tempfile
 import tarfile
 from aiida.orm.data import Data
+from aiida.orm.data.vasp.dedup import DedupMixin, md5_files
 import os
 import StringIO
 
 
-class ArchiveData(Data):
+class ArchiveData(DedupMixin, Data):
+    '''
+    tar.gz archive of a set of files. If a stored ArchiveData with the
+    same file names and contents exists, the archive is not created
+    again but shared with it (see
+    :py:class:`~aiida.orm.data.vasp.dedup.DedupMixin`).
+    '''
     def __init__(self, *args, **kwargs):
         super(ArchiveData, self).__init__(*args, **kwargs)
         self._filelist = []
 
     def get_archive_abs_path(self):
-        return self.get_abs_path('archive.tar.gz')
+        return self.payload_path('archive.tar.gz')
 
     def get_archive(self):
         return tarfile.open(self.get_archive_abs_path(), mode='r')
@@ -34,7 +41,8 @@ class ArchiveData(Data):
         ar.close()
 
     def store(self, *args, **kwargs):
-        self._make_archive()
+        if not self._set_payload(md5_files(self._filelist)):
+            self._make_archive()
         del(self._filelist)
         super(ArchiveData, self).store(*args, **kwargs)
 
@@ -0,0 +1,10 @@
+from aiida.orm.data.array import bands
+from aiida.orm.data.vasp.chunked import ChunkedArrayMixin
+
+
+class BandsData(ChunkedArrayMixin, bands.BandsData):
+    '''
+    BandsData with bands and occupations stored in compressed chunks
+    of kpoints, see :py:class:`~aiida.orm.data.vasp.chunked.ChunkedArrayMixin`.
+    '''
+    chunk_axes = {'bands': -2, 'occupations': -2}
@@ -1,5 +1,27 @@
 from aiida.orm.data.singlefile import SinglefileData
+from aiida.orm.data.vasp.dedup import DedupSinglefileMixin
+import os
 
 
-class ChargedensityData(SinglefileData):
-    pass
+class ChargedensityData(DedupSinglefileMixin, SinglefileData):
+    '''
+    file node that is only stored once per file content,
+    see :py:class:`~aiida.orm.data.vasp.dedup.DedupMixin`
+    '''
+    def get_chgcar(self, cache=True):
+        '''
+        :return: a
+            :py:class:`~aiida.tools.codespecific.vasp.io.chgcar.ChgcarParser`
+            for lazy access to the header and volumetric data.
+        :param bool cache: keep a binary copy of the data, keyed by the
+            file's checksum, in the aiida config folder for fast access
+            next time.
+        '''
+        from aiida.tools.codespecific.vasp.io.chgcar import ChgcarParser
+        cachefile = None
+        if cache and self.md5:
+            from aiida.common.setup import AIIDA_CONFIG_FOLDER
+            cachefile = os.path.join(
+                os.path.expanduser(AIIDA_CONFIG_FOLDER), 'vasp', 'chgcar',
+                self.md5 + '.npy')
+        return ChgcarParser(self.get_file_abs_path(), cache=cachefile)
@@ -0,0 +1,133 @@
+import numpy as np
+import tempfile
+
+
+class ChunkedArrayMixin(object):
+    '''
+    Stores arrays of ArrayData subclasses as zlib compressed chunks along
+    one axis, so that slices can be read without loading the whole array.
+
+    Each chunk is written to ``<name>.<n>.npz``, the 'chunked|<name>'
+    attribute indexes them::
+
+        {'shape': [...], 'axis': 0, 'bounds': [0, 4, 8, ...]}
+
+    where chunk n holds the elements bounds[n]:bounds[n+1] along axis.
+    The axis per array name is taken from :py:attr:`chunk_axes` (default
+    0, negative values count from the last axis), the chunk length is
+    chosen such that a chunk is about :py:attr:`chunk_bytes` bytes
+    uncompressed.
+
+    :py:meth:`get_array` returns the full array as before,
+    :py:meth:`get_array_slice` only reads the chunks needed.
+    '''
+    chunk_axes = {}
+    chunk_bytes = 4 * 2**20
+    _chunk_prefix = 'chunked|'
+
+    def set_array(self, name, array):
+        if not isinstance(array, np.ndarray):
+            raise TypeError('ArrayData can only store numpy arrays')
+        if name in self.get_arraynames():
+            self.delete_array(name)
+        axis = None
+        if array.ndim:
+            axis = self.chunk_axes.get(name, 0) % array.ndim
+        bounds = self._chunk_bounds(array, axis)
+        for n in range(len(bounds) - 1):
+            chunk = array
+            if axis is not None:
+                chunk = np.take(array, np.arange(bounds[n], bounds[n+1]),
+                                axis=axis)
+            with tempfile.NamedTemporaryFile(suffix='.npz') as tmp:
+                np.savez_compressed(tmp, array=chunk)
+                tmp.flush()
+                self.add_path(tmp.name, self._chunk_fname(name, n))
+        self._set_attr(self._chunk_prefix + name, {
+            'shape': list(array.shape),
+            'axis': axis,
+            'bounds': bounds})
+
+    def _chunk_bounds(self, array, axis):
+        if axis is None or not array.shape[axis]:
+            return [0, 1]
+        length = array.shape[axis]
+        slice_bytes = max(array.nbytes // length, 1)
+        step = max(self.chunk_bytes // slice_bytes, 1)
+        return range(0, length, step) + [length]
+
+    @classmethod
+    def _chunk_fname(cls, name, n):
+        return '{}.{}.npz'.format(name, n)
+
+    def _chunk_index(self, name):
+        return self.get_attr(self._chunk_prefix + name, None)
+
+    def get_chunk(self, name, n):
+        '''read the n-th chunk of array name'''
+        with np.load(self.get_abs_path(self._chunk_fname(name, n))) as npz:
+            return npz['array']
+
+    def get_array(self, name):
+        index = self._chunk_index(name)
+        if index is None:
+            return super(ChunkedArrayMixin, self).get_array(name)
+        nchunks = len(index['bounds']) - 1
+        chunks = [self.get_chunk(name, n) for n in range(nchunks)]
+        if index['axis'] is None:
+            return chunks[0]
+        return np.concatenate(chunks, axis=index['axis'])
+
+    def get_array_slice(self, name, key):
+        '''
+        read part of an array along its chunk axis, only the chunks
+        overlapping with key are loaded.
+
+        :param key: int or slice along the chunk axis
+        '''
+        index = self._chunk_index(name)
+        if index is None or index['axis'] is None:
+            return self.get_array(name)[key]
+        axis = index['axis']
+        bounds = index['bounds']
+        length = index['shape'][axis]
+        if isinstance(key, slice):
+            positions = np.arange(length)[key]
+        else:
+            positions = np.arange(length)[[key]]
+        chunkids = np.searchsorted(bounds, positions, side='right') - 1
+        needed = np.unique(chunkids)
+        if not len(needed):
+            return np.take(self.get_chunk(name, 0), [], axis=axis)
+        # position of each needed chunk inside the concatenated block
+        sizes = np.diff(bounds)[needed]
+        offsets = dict(zip(needed, np.cumsum(sizes) - sizes))
+        block = np.concatenate(
+            [self.get_chunk(name, n) for n in needed], axis=axis)
+        local = [offsets[n] + p - bounds[n]
+                 for n, p in zip(chunkids, positions)]
+        result = np.take(block, local, axis=axis)
+        if not isinstance(key, slice):
+            result = np.take(result, 0, axis=axis)
+        return result
+
+    def get_arraynames(self):
+        names = super(ChunkedArrayMixin, self).get_arraynames()
+        plen = len(self._chunk_prefix)
+        names += [k[plen:] for k in self.attrs()
+                  if k.startswith(self._chunk_prefix)]
+        return names
+
+    def get_shape(self, name):
+        index = self._chunk_index(name)
+        if index is None:
+            return super(ChunkedArrayMixin, self).get_shape(name)
+        return tuple(index['shape'])
+
+    def delete_array(self, name):
+        index = self._chunk_index(name)
+        if index is None:
+            return super(ChunkedArrayMixin, self).delete_array(name)
+        for n in range(len(index['bounds']) - 1):
+            self.remove_path(self._chunk_fname(name, n))
+        self._del_attr(self._chunk_prefix + name)
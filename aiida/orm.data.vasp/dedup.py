@@ -0,0 +1,106 @@
+from aiida.orm.data.singlefile import SinglefileData
+import hashlib
+import os
+
+
+def md5_files(filelist, block_size=2**20):
+    '''
+    md5 checksum of a set of files and their names, files are read in
+    chunks of block_size bytes. Each name and each content is preceded
+    by its length, so different splits into names and contents can not
+    give the same checksum.
+
+    :param filelist: list of (src_abs, name) tuples, src_abs may be a
+        directory, in which case its contents are included recursively.
+    :return: the hexdigest
+    '''
+    md5 = hashlib.md5()
+    for src, name in sorted(filelist, key=lambda i: i[1]):
+        if os.path.isdir(src):
+            content = []
+            for dirpath, dirnames, filenames in os.walk(src):
+                for fname in filenames:
+                    path = os.path.join(dirpath, fname)
+                    relpath = os.path.relpath(path, src)
+                    content.append((path, os.path.join(name, relpath)))
+            digest = md5_files(content, block_size=block_size)
+            md5.update('%d:%s/%d:%s' % (len(name), name, len(digest),
+                                         digest))
+            continue
+        md5.update('%d:%s%d:' % (len(name), name, os.path.getsize(src)))
+        with open(src, 'rb') as infile:
+            for chunk in iter(lambda: infile.read(block_size), ''):
+                md5.update(chunk)
+    return md5.hexdigest()
+
+
+class DedupMixin(object):
+    '''
+    Content addressed storage for file based data nodes.
+
+    The md5 checksum of the payload is stored as the 'md5' attribute.
+    If a stored node of the same class with the same checksum exists,
+    the payload is not stored again, instead the 'payload_uuid'
+    attribute points to the node holding it and :py:meth:`payload_path`
+    resolves file names there.
+    '''
+    @property
+    def md5(self):
+        return self.get_attr('md5', None)
+
+    @property
+    def payload_uuid(self):
+        return self.get_attr('payload_uuid', None)
+
+    @classmethod
+    def find_payload(cls, md5):
+        '''
+        :return: the uuid of a stored node of this class holding a payload
+            with the given checksum, or None
+        '''
+        node = cls.query(dbattributes__key='md5',
+                         dbattributes__tval=md5).first()
+        if not node:
+            return None
+        return node.payload_uuid or node.uuid
+
+    def _set_payload(self, md5):
+        '''
+        record the checksum, return True if the payload is already stored
+        and does not have to be added to this node's repository folder
+        '''
+        self._set_attr('md5', md5)
+        payload = self.find_payload(md5)
+        if payload:
+            self._set_attr('payload_uuid', payload)
+        return bool(payload)
+
+    def payload_path(self, fname):
+        '''absolute path to fname in the folder holding the payload'''
+        if self.payload_uuid:
+            payload = self.get_subclass_from_uuid(self.payload_uuid)
+            return payload.get_abs_path(fname)
+        return self.get_abs_path(fname)
+
+
+class DedupSinglefileMixin(DedupMixin):
+    '''
+    :py:class:`DedupMixin` for SinglefileData subclasses. The file is
+    copied into the repository as usual, on store it is removed again if
+    a stored node with the same content exists. SinglefileData's check
+    for the file in the repository folder is skipped for such nodes.
+    '''
+    def store(self, *args, **kwargs):
+        if not self._is_stored and self.md5 is None and self.filename:
+            path = self.get_abs_path(self.filename)
+            if self._set_payload(md5_files([(path, '')])):
+                self.remove_path(self.filename)
+        return super(DedupSinglefileMixin, self).store(*args, **kwargs)
+
+    def _validate(self):
+        if self.payload_uuid:
+            return super(SinglefileData, self)._validate()
+        return super(DedupSinglefileMixin, self)._validate()
+
+    def get_file_abs_path(self):
+        return self.payload_path(self.filename)
@@ -0,0 +1,11 @@
+from aiida.orm.data.array import ArrayData
+from aiida.orm.data.vasp.chunked import ChunkedArrayMixin
+
+
+class DosData(ChunkedArrayMixin, ArrayData):
+    '''
+    Holds the 'tdos' and 'pdos' arrays, stored in compressed chunks of
+    spin components and ions respectively,
+    see :py:class:`~aiida.orm.data.vasp.chunked.ChunkedArrayMixin`.
+    '''
+    chunk_axes = {'tdos': 0, 'pdos': 0}
@@ -4,6 +4,23 @@ from aiida.orm.querytool import QueryTool
 from aiida.tools.codespecific.vasp.io.potcar import PawParser as pcparser
 from aiida.common.exceptions import NotExistent, UniquenessError
 from aiida.common.utils import md5_file
+from multiprocessing import Pool
+import time
+
+
+def _scan_paw_folder(pawpath):
+    '''
+    md5 checksum and parsed attributes of the POTCAR in pawpath,
+    module level to be usable from a process pool.
+
+    :return: (md5, attr_dict, error message or None)
+    '''
+    try:
+        md5, attr_dict = pcparser.read_potcar(
+            os.path.join(pawpath, 'POTCAR'))
+        return md5, attr_dict, None
+    except Exception as e:
+        return None, None, e.__class__.__name__ + ': ' + str(e)
 
 
 class PawData(Data):
@@ -23,10 +40,14 @@ class PawData(Data):
 
     @potcar.setter
     def potcar(self, value):
+        md5, attr_dict = pcparser.read_potcar(value)
+        self._set_potcar(value, md5, attr_dict)
+
+    def _set_potcar(self, value, md5, attr_dict):
+        '''set the POTCAR file with checksum and attributes already known'''
         name = 'POTCAR'
         self.folder.insert_path(value, 'path/'+name)
-        attr_dict = pcparser.parse_potcar(value)
-        self._set_attr('md5', md5_file(value))
+        self._set_attr('md5', md5)
         for k, v in attr_dict.iteritems():
             self._set_attr(k, v)
 
@@ -118,16 +139,28 @@ class PawData(Data):
         return [i[1] for i in groups]
 
     @classmethod
-    def import_family(cls, folder, familyname=None,
-                      family_desc=None, store=True, stop_if_existing=False):
+    def import_family(cls, folder, familyname=None, family_desc=None,
+                      store=True, stop_if_existing=False, processes=1,
+                      timings=None):
         '''Import a family from a folder like the ones distributed with VASP,
-        usually named potpaw_XXX'''
+        usually named potpaw_XXX
+
+        The POTCAR files are hashed and parsed by a pool of processes
+        (if processes > 1), existing PAWs are looked up in one query
+        and new ones are stored in a single transaction.
+
+        :param processes: number of worker processes for reading the files
+        :param timings: optional dict, filled with the time spent in each
+            stage (scan, lookup, store) in seconds'''
         from aiida.common import aiidalogger
 
         ffound = []
         fupl = []
         paw_list = []
         fp = os.path.abspath(folder)
+        cls.clear_paw_cache()
+        if timings is None:
+            timings = {}
         # ~ ffname = os.path.basename(
             # ~ os.path.dirname(folder)).replace('potpaw_', '')
         # ~ famname = familyname or ffname
@@ -137,28 +170,51 @@ class PawData(Data):
         # Always update description, even if the group already existed
         group.description = family_desc
 
-        for pawf in os.listdir(fp):
+        start = time.time()
+        pawdirs = [pawf for pawf in sorted(os.listdir(fp)) if
+                   os.path.isfile(os.path.join(fp, pawf, 'POTCAR'))]
+        paths = [os.path.join(fp, pawf) for pawf in pawdirs]
+        if processes and processes > 1 and len(paths) > 1:
+            pool = Pool(min(processes, len(paths)))
             try:
-                ap = os.path.join(fp, pawf)
-                pp = os.path.join(ap, 'POTCAR')
-                if os.path.isdir(ap) and os.path.exists(pp):
-                    ffound.append(pawf)
-                    paw, paw_created = cls.get_or_create(ap)
-                    # ~ paw._set_attr('family', famname)
-                    # ~ upload = paw_created
-                    # enforce group-wise uniqueness of symbols
-                    in_group = False
-                    if not group_created:
-                        in_group = bool(cls.load_paw(group=group,
-                                        symbol=paw.symbol, silent=True))
-                    if not in_group:
-                        paw_list.append((paw, paw_created, pawf))
-            except:
-                import sys
-                e = sys.exc_info()[1]
-                print 'WARNING: skipping ' + os.path.abspath(
-                    os.path.join(fp, pawf))
-                print '  ' + e.__class__.__name__ + ': ' + e.message
+                scanned = pool.map(_scan_paw_folder, paths)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            scanned = map(_scan_paw_folder, paths)
+        timings['scan'] = time.time() - start
+        aiidalogger.info('read {} POTCAR files in {:.3f}s'.format(
+            len(paths), timings['scan']))
+
+        start = time.time()
+        md5s = list(set(i[0] for i in scanned if i[0]))
+        existing = {}
+        if md5s:
+            query = cls.query(dbattributes__key='md5',
+                              dbattributes__tval__in=md5s).distinct()
+            existing = {paw.get_attr('md5'): paw for paw in query}
+        in_group = set()
+        if not group_created:
+            in_group = set(paw.symbol for paw in cls._query_group(group))
+        timings['lookup'] = time.time() - start
+
+        for pawf, path, (md5, attrs, error) in zip(pawdirs, paths, scanned):
+            if error:
+                print 'WARNING: skipping ' + path
+                print '  ' + error
+                continue
+            ffound.append(pawf)
+            paw_created = md5 not in existing
+            if paw_created:
+                paw = cls._from_scanned(path, md5, attrs)
+                # same file in two folders: only one new node
+                existing[md5] = paw
+            else:
+                paw = existing[md5]
+            # enforce group-wise uniqueness of symbols
+            if paw.symbol not in in_group:
+                paw_list.append((paw, paw_created, pawf))
 
         if stop_if_existing:
             for pawinfo in paw_list:
@@ -167,28 +223,31 @@ class PawData(Data):
                                      '' + pawinfo[2] + " cannot be added with "
                                      "stop_if_existing")
 
-        for pawinfo in paw_list:
-            paw = pawinfo[0]
-            created = pawinfo[1]
-            path = pawinfo[2]
-            if store:
-                if created:
-                    paw.store_all()
-                    aiidalogger.debug("New node {} created for file {}".format(
-                        paw.uuid, path))
-                    fupl.append(path)
-                else:
-                    aiidalogger.debug("Reusing node {} for file {}".format(
-                        paw.uuid, path))
-
+        start = time.time()
         if store:
-            if group_created:
-                group.store()
-                aiidalogger.debug("New PAW family goup {} created".format(
-                    group.uuid))
-            group.add_nodes(i[0] for i in paw_list)
+            from django.db import transaction
+            with transaction.atomic():
+                for paw, created, path in paw_list:
+                    if created and not paw._is_stored:
+                        paw.store_all()
+                        aiidalogger.debug(
+                            "New node {} created for file {}".format(
+                                paw.uuid, path))
+                        fupl.append(path)
+                    else:
+                        aiidalogger.debug(
+                            "Reusing node {} for file {}".format(
+                                paw.uuid, path))
+                if group_created:
+                    group.store()
+                    aiidalogger.debug("New PAW family goup {} created".format(
+                        group.uuid))
+                group.add_nodes(i[0] for i in paw_list)
         else:
             print map(repr, [i[0] for i in paw_list])
+        timings['store'] = time.time() - start
+        aiidalogger.info('stored {} new PAWs in {:.3f}s'.format(
+            len(fupl), timings['store']))
 
         return ffound, fupl
 
@@ -236,6 +295,17 @@ class PawData(Data):
             res.psctr = cp
         return res
 
+    @classmethod
+    def _from_scanned(cls, pawpath, md5, attr_dict):
+        '''like from_folder, using the results of _scan_paw_folder'''
+        res = cls()
+        ap = os.path.abspath(pawpath)
+        cp = os.path.join(ap, 'PSCTR')
+        res._set_potcar(os.path.join(ap, 'POTCAR'), md5, attr_dict)
+        if os.path.isfile(cp):
+            res.psctr = cp
+        return res
+
     @classmethod
     def _node_filter(cls, **kwargs):
         def node_filter(node):
@@ -245,12 +315,53 @@ class PawData(Data):
             return True
         return node_filter
 
+    @classmethod
+    def _attr_filter(cls, key, value):
+        '''django filter kwargs for an attribute value, None if unsupported'''
+        if isinstance(value, bool):
+            col = 'bval'
+        elif isinstance(value, (int, long)):
+            col = 'ival'
+        elif isinstance(value, float):
+            col = 'fval'
+        elif isinstance(value, basestring):
+            col = 'tval'
+        else:
+            return None
+        return {'dbattributes__key': key, 'dbattributes__' + col: value}
+
+    @classmethod
+    def _query_group(cls, group, **kwargs):
+        '''
+        PawData nodes in group matching the attribute values in kwargs,
+        filtered in the database as far as possible
+        '''
+        query = cls.query(dbgroups__pk=group.pk)
+        rest = {}
+        for k, v in kwargs.iteritems():
+            attr_filter = cls._attr_filter(k, v)
+            if attr_filter:
+                query = query.filter(**attr_filter)
+            else:
+                rest[k] = v
+        return filter(cls._node_filter(**rest), query.distinct())
+
+    # (family name, symbol) -> PawData, filled by load_paw
+    _paw_cache = {}
+
+    @classmethod
+    def clear_paw_cache(cls):
+        cls._paw_cache.clear()
+
     @classmethod
     def load_paw(cls, **kwargs):
         '''
         py:method:: load_paw([family=None][, element=None][, symbol=None])
         Load PawData nodes from the databank. Use kwargs to filter.
 
+        Lookups by family (or group) and symbol alone are cached
+        for the lifetime of the process.
+
         :return: a list of PawData instances
         :rtype: list
         :key str family: Filter by family
@@ -270,20 +381,24 @@ class PawData(Data):
                 q.add_attr_filter(k, '=', v)
             res = list(q.run_query())
         else:
+            famname = family or group.name
+            cache_key = None
+            if kwargs.keys() == ['symbol']:
+                cache_key = (famname, kwargs['symbol'])
+            if cache_key in cls._paw_cache:
+                return [cls._paw_cache[cache_key]]
             if family:
                 group, created = cls.get_or_create_famgroup(family)
             elif group:
                 created = not group._is_stored
-            try:
-                paw_filter = cls._node_filter(**kwargs)
-                res = filter(paw_filter, group.nodes)
-            except ValueError as e:
-                if silent:
-                    res = []
-                elif created:
-                    raise NotExistent('No family with that name exists')
-                else:
-                    raise e
+            if not created:
+                res = cls._query_group(group, **kwargs)
+            elif silent:
+                res = []
+            else:
+                raise NotExistent('No family with that name exists')
+            if cache_key and len(res) == 1:
+                cls._paw_cache[cache_key] = res[0]
 
         if not res and not silent:
             raise ValueError(error_msg)
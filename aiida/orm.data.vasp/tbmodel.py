@@ -0,0 +1,142 @@
+from aiida.orm.data.array import ArrayData
+from aiida.orm.data.vasp.chunked import ChunkedArrayMixin
+import numpy as np
+
+
+class TbmodelData(ChunkedArrayMixin, ArrayData):
+    '''
+    Holds a wannier90 tight binding model: the R-vectors, their
+    degeneracies and the hopping matrices H_mn(R).
+
+    The hoppings are stored either dense as 'hoppings' (nrpts, num_wann,
+    num_wann) complex, in compressed chunks of R-vectors, or, if a cutoff
+    was given, sparse as 'indices' (nnz, 3) of (r, m, n) and 'values'
+    (nnz,) complex, keeping only hoppings with a magnitude above the
+    cutoff. Arrays are only read from the repository when accessed,
+    :py:meth:`iter_hoppings` reads one chunk at a time,
+    see :py:class:`~aiida.orm.data.vasp.chunked.ChunkedArrayMixin`.
+    '''
+    chunk_axes = {'hoppings': 0, 'indices': 0, 'values': 0}
+
+    def set_from_hr(self, path, cutoff=None):
+        '''
+        read the model from a wannier90_hr.dat file
+
+        :param cutoff: if given, store only hoppings with a magnitude
+            larger than cutoff (sparse)
+        '''
+        from aiida.tools.codespecific.vasp.io.hr import HrParser
+        hr = HrParser(path, cutoff=cutoff)
+        if cutoff is None:
+            self.set_hoppings(hr.rvectors, hr.degeneracies, hr.hoppings)
+        else:
+            self.set_sparse_hoppings(hr.rvectors, hr.degeneracies,
+                                     hr.indices, hr.values, hr.num_wann,
+                                     cutoff)
+
+    def _set_rvectors(self, rvectors, degeneracies, num_wann):
+        rvectors = np.asarray(rvectors, dtype=int)
+        degeneracies = np.asarray(degeneracies, dtype=int)
+        if rvectors.shape != (len(degeneracies), 3):
+            raise ValueError('rvectors must have shape (nrpts, 3)')
+        for name in ('hoppings', 'indices', 'values'):
+            if name in self.get_arraynames():
+                self.delete_array(name)
+        self.set_array('rvectors', rvectors)
+        self.set_array('degeneracies', degeneracies)
+        self._set_attr('num_wann', int(num_wann))
+
+    def set_hoppings(self, rvectors, degeneracies, hoppings):
+        '''
+        :param rvectors: (nrpts, 3) integer array
+        :param degeneracies: (nrpts,) integer array
+        :param hoppings: (nrpts, num_wann, num_wann) complex array
+        '''
+        hoppings = np.asarray(hoppings, dtype=complex)
+        if hoppings.ndim != 3 or hoppings.shape[1] != hoppings.shape[2] \
+                or len(hoppings) != len(degeneracies):
+            raise ValueError(
+                'hoppings must have shape (nrpts, num_wann, num_wann)')
+        self._set_rvectors(rvectors, degeneracies, hoppings.shape[1])
+        self.set_array('hoppings', hoppings)
+        self._set_attr('cutoff', None)
+
+    def set_sparse_hoppings(self, rvectors, degeneracies, indices, values,
+                            num_wann, cutoff):
+        '''
+        :param indices: (nnz, 3) integer array of (r, m, n)
+        :param values: (nnz,) complex array of H_mn(R_r)
+        :param cutoff: the magnitude below which hoppings were dropped
+        '''
+        indices = np.asarray(indices, dtype=np.int32).reshape(-1, 3)
+        values = np.asarray(values, dtype=complex)
+        if len(indices) != len(values):
+            raise ValueError('indices and values differ in length')
+        self._set_rvectors(rvectors, degeneracies, num_wann)
+        self.set_array('indices', indices)
+        self.set_array('values', values)
+        self._set_attr('cutoff', float(cutoff))
+
+    @property
+    def num_wann(self):
+        return self.get_attr('num_wann')
+
+    @property
+    def nrpts(self):
+        return self.get_shape('rvectors')[0]
+
+    @property
+    def cutoff(self):
+        '''magnitude cutoff of a sparse model, None if dense'''
+        return self.get_attr('cutoff', None)
+
+    @property
+    def is_sparse(self):
+        return self.cutoff is not None
+
+    def get_rvectors(self):
+        return self.get_array('rvectors')
+
+    def get_degeneracies(self):
+        return self.get_array('degeneracies')
+
+    def get_hoppings(self, key=None):
+        '''
+        the hopping matrices as a dense array, sparse models are expanded
+        with zeros.
+
+        :param key: int or slice of R-vectors, for dense models only the
+            chunks needed are read
+        :return: array of shape (nrpts, num_wann, num_wann), without the
+            first axis if key is an int
+        '''
+        if not self.is_sparse:
+            if key is None:
+                return self.get_array('hoppings')
+            return self.get_array_slice('hoppings', key)
+        nw = self.num_wann
+        hoppings = np.zeros((self.nrpts, nw, nw), dtype=complex)
+        idx = self.get_array('indices')
+        hoppings[idx[:, 0], idx[:, 1], idx[:, 2]] = self.get_array('values')
+        if key is None:
+            return hoppings
+        return hoppings[key]
+
+    def iter_hoppings(self):
+        '''
+        iterate over the stored chunks of hoppings, reading one at a time.
+
+        :return: iterator of (start, stop, hoppings) for dense models,
+            hoppings[i] belongs to R-vector start + i; of (indices,
+            values) for sparse models.
+        '''
+        if self.is_sparse:
+            bounds = self._chunk_index('values')['bounds']
+            for n in range(len(bounds) - 1):
+                key = slice(bounds[n], bounds[n + 1])
+                yield self.get_array_slice('indices', key), \
+                    self.get_chunk('values', n)
+            return
+        bounds = self._chunk_index('hoppings')['bounds']
+        for n in range(len(bounds) - 1):
+            yield bounds[n], bounds[n + 1], self.get_chunk('hoppings', n)
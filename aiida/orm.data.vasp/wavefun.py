@@ -1,5 +1,18 @@
 from aiida.orm.data.singlefile import SinglefileData
+from aiida.orm.data.vasp.dedup import DedupSinglefileMixin
 
 
-class WavefunData(SinglefileData):
-    pass
+class WavefunData(DedupSinglefileMixin, SinglefileData):
+    '''
+    file node that is only stored once per file content,
+    see :py:class:`~aiida.orm.data.vasp.dedup.DedupMixin`
+    '''
+    def get_wavecar(self):
+        '''
+        :return: a
+            :py:class:`~aiida.tools.codespecific.vasp.io.wavecar.WavecarParser`
+            for random access to the header, eigenvalues and coefficients
+        :raises ValueError: if the file is not a valid WAVECAR
+        '''
+        from aiida.tools.codespecific.vasp.io.wavecar import WavecarParser
+        return WavecarParser(self.get_file_abs_path())
@@ -1,16 +1,166 @@
 from aiida.parsers.parser import Parser
 from aiida.common.datastructures import calc_states as cstat
+from collections import OrderedDict
+import threading
+import resource
+import time
+import os
 # ~ from aiida.common.exceptions import InvalidOperation
 
 
+def _maxrss():
+    '''peak resident memory of this process in kB'''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _NoTimer(object):
+    '''context manager doing nothing, used when profiling is off'''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_no_timer = _NoTimer()
+
+
+# guards profile updates from the reader threads of parse_workers > 1
+_profile_lock = threading.Lock()
+
+
+class _Timer(object):
+    '''records time and peak memory growth of a step into a profile'''
+    def __init__(self, steps, name):
+        self.steps = steps
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        self.rss = _maxrss()
+        return self
+
+    def __exit__(self, *args):
+        dtime = time.time() - self.start
+        drss = _maxrss() - self.rss
+        with _profile_lock:
+            step = self.steps.setdefault(
+                self.name, {'time': 0., 'calls': 0, 'maxrss': 0})
+            step['time'] += dtime
+            step['calls'] += 1
+            step['maxrss'] = max(step['maxrss'], drss)
+        return False
+
+
 class BaseParser(Parser):
     '''
     Does common tasks all parsers carry out and provides
     convenience methods.
+
+    If :py:attr:`profile` is set, or the calculation's parser_settings
+    input contains a 'profile' key, the time and the growth of peak
+    memory of every read_* and get_* method of the parser, the sizes of
+    the files read and the shapes of the output arrays are recorded.
+    Times include nested steps. The report is stored as the
+    'parser_profile' extra of the calculation (attribute if it is not
+    stored), with profile = 'output' also as a 'parser_profile'
+    ParameterData output node. The setting is looked up when parsing
+    starts (in :py:meth:`get_folder`), with profiling off the methods
+    are not touched at all and :py:meth:`timer` returns a shared no-op
+    context manager.
+
+    The maxrss of a step is the growth of the peak memory of the whole
+    process, it is only attributable to the step if the files are read
+    one after the other (``parse_workers == 1`` for the vasp5 parser).
     '''
+    profile = False
+
     def __init__(self, calc):
         self._new_nodes = {}
         super(BaseParser, self).__init__(calc)
+        self._profile = None
+
+    def _profile_mode(self):
+        '''False, True or 'output', see :py:attr:`profile`'''
+        if self.profile:
+            return self.profile
+        settings = self._calc.get_inputs_dict().get('parser_settings')
+        if settings:
+            return settings.get_dict().get('profile', False)
+        return False
+
+    def _profiled_methods(self):
+        names = set()
+        for cls in type(self).__mro__:
+            if not issubclass(cls, BaseParser):
+                continue
+            names.update(n for n in vars(cls) if
+                         n.startswith(('read_', 'get_')) and
+                         n not in ('get_file', 'get_folder'))
+        return sorted(n for n in names if callable(getattr(self, n)))
+
+    def _start_profile(self, mode):
+        self._profile = {'mode': mode, 'start': time.time(),
+                         'steps': OrderedDict(), 'files': {}}
+        for name in self._profiled_methods():
+            setattr(self, name, self._timed(name, getattr(self, name)))
+
+    def _timed(self, name, method):
+        def timed(*args, **kwargs):
+            with self.timer(name):
+                return method(*args, **kwargs)
+        timed.__doc__ = method.__doc__
+        return timed
+
+    def timer(self, name):
+        '''
+        context manager recording the time spent in the with block as
+        step name in the profile, if profiling is enabled
+        '''
+        if self._profile is None:
+            return _no_timer
+        return _Timer(self._profile['steps'], name)
+
+    @property
+    def profile_report(self):
+        '''
+        the profile as a dict or None if profiling is off::
+
+            {'total': s, 'steps': [{'name': .., 'time': s, 'calls': n,
+             'maxrss': kB}, ...], 'files': [[fname, bytes], ...],
+             'arrays': [[linkname, arrayname, shape], ...]}
+
+        names are stored in lists since attribute keys can not contain
+        dots.
+        '''
+        if self._profile is None:
+            return None
+        steps = [dict(step, name=name) for name, step in
+                 self._profile['steps'].iteritems()]
+        arrays = []
+        for linkname, node in sorted(self._new_nodes.iteritems()):
+            if not hasattr(node, 'get_arraynames'):
+                continue
+            for name in sorted(node.get_arraynames()):
+                arrays.append([linkname, name, list(node.get_shape(name))])
+        return {'total': time.time() - self._profile['start'],
+                'steps': steps,
+                'files': sorted(map(list, self._profile['files'].items())),
+                'arrays': arrays}
+
+    def _store_profile(self):
+        from aiida.orm import DataFactory
+        report = self.profile_report
+        self.logger.info('parsing took {:.3f}s: {}'.format(
+            report['total'], ', '.join(
+                '{name} {time:.3f}s'.format(**step)
+                for step in report['steps'])))
+        if self._calc._is_stored:
+            self._calc.set_extra('parser_profile', report)
+        else:
+            self._calc._set_attr('parser_profile', report)
+        if self._profile['mode'] == 'output':
+            self.add_node('parser_profile',
+                          DataFactory('parameter')(dict=report))
 
     def parse_with_retrieved(self, retrieved):
         '''
@@ -29,7 +179,14 @@ class BaseParser(Parser):
             # ~ raise InvalidOperation('Calculation not in parsing state')
 
     def get_folder(self, retrieved):
-        '''convenient access to the retrieved folder'''
+        '''
+        convenient access to the retrieved folder, starts the profiling
+        if it is enabled
+        '''
+        if self._profile is None:
+            mode = self._profile_mode()
+            if mode:
+                self._start_profile(mode)
         try:
             out_folder = retrieved[self._calc._get_linkname_retrieved()]
             return out_folder
@@ -45,6 +202,8 @@ class BaseParser(Parser):
         :param bool success: wether the parsing was successful
         :return: (sucess, new_nodes), the expected return values of a parser
         '''
+        if self._profile is not None:
+            self._store_profile()
         return bool(success), self._new_nodes.items()
 
     def get_file(self, fname):
@@ -55,6 +214,9 @@ class BaseParser(Parser):
         '''
         try:
             ofname = self.out_folder.get_abs_path(fname)
+            if self._profile is not None and os.path.isfile(ofname):
+                with _profile_lock:
+                    self._profile['files'][fname] = os.path.getsize(ofname)
             return ofname
         except OSError:
             self.logger.warning(fname+' not found in retrieved')
@@ -32,9 +32,9 @@ class Vasp2w90Parser(Vasp5Parser):
         return wdatnode
 
     def set_win(self, node):
-        if node:
+        if node and self.wants('wannier_settings'):
             self.add_node('wannier_settings', node)
 
     def set_wdat(self, node):
-        if node:
+        if node and self.wants('wannier_data'):
             self.add_node('wannier_data', node)
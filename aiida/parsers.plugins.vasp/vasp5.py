@@ -1,16 +1,41 @@
 from aiida.parsers.plugins.vasp.base import BaseParser
 from aiida.tools.codespecific.vasp.io.eigenval import EigParser
-from aiida.tools.codespecific.vasp.io.vasprun import VasprunParser
+from aiida.tools.codespecific.vasp.io.vasprun import (
+    VasprunParser, VasprunStreamParser)
 from aiida.tools.codespecific.vasp.io.doscar import DosParser
 from aiida.tools.codespecific.vasp.io.kpoints import KpParser
+from aiida.tools.codespecific.vasp.atoms import get_ase
 from aiida.orm import DataFactory
+from multiprocessing.pool import ThreadPool
+from collections import OrderedDict
 import numpy as np
+import os
+import time
 
 
 class Vasp5Parser(BaseParser):
     '''
     Parses all Vasp 5 calculations.
+
+    vasprun.xml files larger than :py:attr:`vasprun_stream_size` bytes
+    are read with the streaming
+    :py:class:`~aiida.tools.codespecific.vasp.io.vasprun.VasprunStreamParser`.
+
+    The output files are independent of each other until the nodes are
+    built, with :py:attr:`parse_workers` > 1 they are read concurrently
+    by a pool of that many threads. The readers only decode files, the
+    nodes are built afterwards in the calling thread. The time spent on each file is
+    logged either way, the per step maxrss of a profile (see
+    :py:class:`~aiida.parsers.plugins.vasp.base.BaseParser`) is only
+    meaningful with a single worker.
+
+    If the calculation has a parser_settings input, only the requested
+    outputs are created and files not needed for them are not read
+    (see ``Vasp5Calculation.output_files``).
     '''
+    vasprun_stream_size = 50 * 2**20
+    parse_workers = 1
+
     def parse_with_retrieved(self, retrieved):
         self.check_state()
         self.out_folder = self.get_folder(retrieved)
@@ -23,32 +48,45 @@ class Vasp5Parser(BaseParser):
                 'look at the scheduler output for troubleshooting')
             return self.result(success=False)
 
-        self.vrp = self.read_run()
+        files = self.read_files()
+        self.vrp = files.get('vasprun.xml')
+        contcar = None
+        if files.get('CONTCAR'):
+            contcar = self.read_cont(files['CONTCAR'])
 
-        bands, kpout, structure = self.read_eigenval()
+        bands, kpout, structure = None, None, None
+        if files.get('EIGENVAL'):
+            bands, kpout, structure = self.read_eigenval(
+                eigenval=files['EIGENVAL'], contcar=contcar)
 
-        self.dcp = self.read_dos()
+        self.dcp = files.get('DOSCAR')
         dosnode = self.get_dos_node(self.vrp, self.dcp)
 
-        if bands:
+        if bands and self.wants('bands'):
             self.set_bands(bands)  # append output nodes
 
-        if not kpout:
-            kpout = self.read_ibzkpt()
+        if not kpout and files.get('IBZKPT'):
+            kpout = self.read_ibzkpt(files['IBZKPT'])
 
-        if kpout:
+        if kpout and self.wants('kpoints'):
             self.set_kpoints(kpout)
 
-        if structure:
+        if not structure and self.vrp:
+            if self.vrp.is_md or self.vrp.is_relaxation:
+                structure = contcar
+
+        if structure and self.wants('structure'):
             self.set_structure(structure)
 
         if self.vrp:
-            if self.vrp.is_sc:  # add chgcar ouput node if selfconsistent run
-                chgnode = self.get_chgcar()
-                self.set_chgcar(chgnode)
+            # add chgcar ouput node if selfconsistent run
+            if self.vrp.is_sc and self.wants('charge_density'):
+                if self.has_file('CHGCAR'):
+                    self.set_chgcar(self.get_chgcar())
 
-            if self.vrp.is_sc:
-                self.set_wavecar(self.get_wavecar())
+            if self.vrp.is_sc and self.wants('wavefunctions'):
+                if self.has_file('WAVECAR'):
+                    self.set_wavecar(self.get_wavecar())
 
         self.add_node('results', self.get_output())
 
@@ -57,12 +95,81 @@ class Vasp5Parser(BaseParser):
 
         return self.result(success=True)
 
+    def read_files(self):
+        '''
+        run the readers for all output files, which do not depend on
+        each other, and log the time spent on each. The readers return
+        parsers or arrays, no nodes. CONTCAR is only read if the
+        calculation has ionic steps.
+
+        :return: dict {filename: reader result}
+        '''
+        readers = OrderedDict([('vasprun.xml', self.read_run)])
+        bands = self.wants('bands') or self.wants('kpoints')
+        if bands:
+            readers['EIGENVAL'] = self.decode_eigenval
+        if self.wants('dos'):
+            readers['DOSCAR'] = self.read_dos
+        if (self.has_file('CONTCAR') and self.is_ionic() and
+                (bands or self.wants('structure'))):
+            readers['CONTCAR'] = self.decode_cont
+        if self.wants('kpoints') and not self.has_file('EIGENVAL'):
+            readers['IBZKPT'] = self.decode_ibzkpt
+
+        def timed(item):
+            fname, reader = item
+            start = time.time()
+            result = reader()
+            return fname, result, time.time() - start
+
+        start = time.time()
+        if self.parse_workers > 1:
+            pool = ThreadPool(min(self.parse_workers, len(readers)))
+            try:
+                timings = pool.map(timed, readers.items())
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            timings = map(timed, readers.items())
+        for fname, _, dtime in timings:
+            self.logger.info('parsed {} in {:.3f}s'.format(fname, dtime))
+        self.logger.info('parsed output files in {:.3f}s ({} workers)'.format(
+            time.time() - start, max(self.parse_workers, 1)))
+        return {fname: result for fname, result, _ in timings}
+
+    def wants(self, output):
+        '''
+        check wether an output node was requested in the calculation's
+        parser_settings input (all are requested if there is none).
+        The requested outputs are looked up once per parser.
+        '''
+        if not hasattr(self, '_outputs'):
+            self._outputs = getattr(self._calc, 'parser_outputs', None)
+        return self._outputs is None or output in self._outputs
+
+    def is_ionic(self):
+        '''
+        wether the calculation makes ionic steps according to its INCAR
+        settings, assumed for calculation classes which do not tell
+        '''
+        return getattr(self._calc, 'is_ionic', True)
+
+    def has_file(self, fname):
+        '''check wether a file was retrieved'''
+        try:
+            return os.path.isfile(self.out_folder.get_abs_path(fname))
+        except OSError:
+            return False
+
     def read_run(self):
         '''Read vasprun.xml'''
         vasprun = self.get_file('vasprun.xml')
         if not vasprun:
             self.logger.warning('no vasprun.xml found')
             return None
+        if os.path.getsize(vasprun) > self.vasprun_stream_size:
+            return VasprunStreamParser(vasprun)
         return VasprunParser(vasprun)
 
     def read_dos(self):
@@ -77,16 +184,20 @@ class Vasp5Parser(BaseParser):
         '''
         takes VasprunParser and DosParser objects
         and returns a doscar array node
+
+        DOSCAR columns are grouped by orbital, with the spin components
+        of each orbital next to each other.
         '''
         if not vrp or not dcp:
             return None
-        dosnode = DataFactory('array')()
+        dosnode = DataFactory('vasp.dos')()
         if len(vrp.pdos):
             pdos = vrp.pdos.copy()
             for i, name in enumerate(vrp.pdos.dtype.names[1:]):
+                if not len(dcp.pdos):
+                    break
                 ns = vrp.pdos.shape[1]
-                # ~ pdos[name] = dcp[:, :, i+1:i+1+ns].transpose(0,2,1)
-                cur = dcp.pdos[:, :, i+1:i+1+ns].transpose(0, 2, 1)
+                cur = dcp.pdos[:, :, 1+i*ns:1+(i+1)*ns].transpose(0, 2, 1)
                 cond = vrp.pdos[name] < 0.1
                 pdos[name] = np.where(cond, cur, vrp.pdos[name])
             dosnode.set_array('pdos', pdos)
@@ -95,27 +206,53 @@ class Vasp5Parser(BaseParser):
             ns = 2
         tdos = vrp.tdos[:ns, :].copy()
         for i, name in enumerate(vrp.tdos.dtype.names[1:]):
-            cur = dcp.tdos[:, i+1:i+1+ns].transpose()
+            cur = dcp.tdos[:, 1+i*ns:1+(i+1)*ns].transpose()
             cond = vrp.tdos[:ns, :][name] < 0.1
             tdos[name] = np.where(cond, cur, vrp.tdos[:ns, :][name])
         dosnode.set_array('tdos', tdos)
         return dosnode
 
-    def read_cont(self):
-        '''read CONTCAR for output structure'''
+    def decode_cont(self):
+        '''read CONTCAR into an ase.Atoms object'''
         from ase.io.vasp import read_vasp
-        structure = DataFactory('structure')()
         cont = self.get_file('CONTCAR')
         if not cont:
             self.logger.info('CONTCAR not found!')
             return None
-        structure.set_ase(read_vasp(cont))
+        return read_vasp(cont)
+
+    def read_cont(self, atoms=None):
+        '''
+        output structure from CONTCAR
+
+        :param atoms: already decoded CONTCAR, as returned by
+            :py:meth:`decode_cont`, read from file if not given
+        '''
+        if atoms is None:
+            atoms = self.decode_cont()
+        if atoms is None:
+            return None
+        structure = DataFactory('structure')()
+        structure.set_ase(atoms)
         return structure
 
-    def read_eigenval(self):
+    def decode_eigenval(self):
+        '''read EIGENVAL into (header, kpoints, bands) arrays'''
+        eig = self.get_file('EIGENVAL')
+        if not eig:
+            self.logger.warning('EIGENVAL not found')
+            return None
+        return EigParser.parse_eigenval(eig)
+
+    def read_eigenval(self, eigenval=None, contcar=None):
         '''
         Create a bands and a kpoints node from values in eigenvalue.
 
+        :param eigenval: already decoded EIGENVAL, as returned by
+            :py:meth:`decode_eigenval`, read from file if not given
+        :param contcar: already read output structure, read from file if
+            needed and not given
+
         returns: bsnode, kpout
         - bsnode: BandsData containing eigenvalues from EIGENVAL
                 and occupations from vasprun.xml
@@ -123,24 +260,27 @@ class Vasp5Parser(BaseParser):
 
         both bsnode as well as kpnode come with cell unset
         '''
-        eig = self.get_file('EIGENVAL')
-        if not eig:
-            self.logger.warning('EIGENVAL not found')
+        if eigenval is None:
+            eigenval = self.decode_eigenval()
+        if not eigenval:
             return None, None, None
-        header, kp, bs = EigParser.parse_eigenval(eig)
-        bsnode = DataFactory('array.bands')()
+        header, kp, bs = eigenval
+        bsnode = DataFactory('vasp.bands')()
         kpout = DataFactory('array.kpoints')()
 
         structure = None  # get output structure if not static
         if self.vrp.is_md or self.vrp.is_relaxation:
-            structure = self.read_cont()
+            structure = contcar
+            if structure is None:
+                structure = self.read_cont()
 
         if self.vrp.is_md:  # set cell from input or output structure
             cellst = structure
         else:
             cellst = self._calc.inp.structure
-        bsnode.set_cell(cellst.get_ase().get_cell())
-        kpout.set_cell(cellst.get_ase().get_cell())
+        cell = get_ase(cellst).get_cell()
+        bsnode.set_cell(cell)
+        kpout.set_cell(cell)
 
         if self._calc.inp.kpoints.get_attrs().get('array|kpoints'):
             bsnode.set_kpointsdata(self._calc.inp.kpoints)
@@ -154,12 +294,25 @@ class Vasp5Parser(BaseParser):
                           cartesian=False)
         return bsnode, kpout, structure
 
-    def read_ibzkpt(self):
+    def decode_ibzkpt(self):
+        '''read IBZKPT into a KpParser'''
         ibz = self.get_file('IBZKPT')
         if not ibz:
             self.logger.warning('IBZKPT not found')
             return None
-        kpp = KpParser(ibz)
+        return KpParser(ibz)
+
+    def read_ibzkpt(self, kpp=None):
+        '''
+        output kpoints from IBZKPT
+
+        :param kpp: already decoded IBZKPT, as returned by
+            :py:meth:`decode_ibzkpt`, read from file if not given
+        '''
+        if kpp is None:
+            kpp = self.decode_ibzkpt()
+        if kpp is None:
+            return None
         kpout = DataFactory('array.kpoints')()
         kpout.set_kpoints(kpp.kpoints, weights=kpp.weights,
                           cartesian=kpp.cartesian)
@@ -180,7 +333,8 @@ class Vasp5Parser(BaseParser):
     def get_output(self):
         output = DataFactory('parameter')()
         output.update_dict({
-            'efermi': self.vrp.efermi
+            'efermi': self.vrp.efermi,
+            'total_energy': self.vrp.total_energy
         })
         return output
 
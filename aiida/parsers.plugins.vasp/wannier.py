@@ -1,9 +1,10 @@
 from aiida.parsers.plugins.vasp.base import BaseParser
 from aiida.tools.codespecific.vasp.io.win import WinParser
+from aiida.tools.codespecific.vasp.io.wannier_bands import (
+    WannierBandsParser, find_labels)
 from aiida.tools.codespecific.vasp.io import parser
 from aiida.orm import DataFactory
-import re
-import numpy as np
+import os
 
 
 class WannierBase(BaseParser):
@@ -49,11 +50,20 @@ class WannierParser(WannierBase, parser.BaseParser):
         return self.result(success=True)
 
     def get_hr_node(self):
+        '''
+        read wannier90_hr.dat into a vasp.tbmodel node. The parser
+        settings key 'hr_cutoff' selects sparse storage of the hoppings
+        with a magnitude above it.
+        '''
         dat = self.get_file('wannier90_hr.dat')
-        if not dat:
+        if not dat or not os.path.isfile(dat):
             return None
-        hnode = DataFactory('singlefile')()
-        hnode.add_path(dat)
+        cutoff = None
+        settings = self._calc.get_inputs_dict().get('parser_settings')
+        if settings:
+            cutoff = settings.get_dict().get('hr_cutoff')
+        hnode = DataFactory('vasp.tbmodel')()
+        hnode.set_from_hr(dat, cutoff=cutoff)
         return hnode
 
     def get_bands_plot(self):
@@ -67,38 +77,12 @@ class WannierParser(WannierBase, parser.BaseParser):
         bdat, bkp, bgnu = self.get_bands_plot()
         if not (bdat and bkp):
             return None
-        with open(bkp) as bk:
-            self.line(bk)  # contains num kpoints
-            kp = re.split(self.empty_line, bk.read())
-            kp = filter(None, kp)
-            kp = map(self.splitlines, kp)
-            kp = filter(None, kp[0])
-            kp = np.array(kp)
-            bnode.set_kpoints(kp[:, :3], weights=kp[:, 3])
-        with open(bdat) as bd:
-            data = re.split(self.empty_line, bd.read())
-            data = filter(None, data)
-            data = map(self.splitlines, data)
-            data = np.array(data)
-        bnode.set_bands(data[:, :, 1].transpose())
+        bands = WannierBandsParser(bdat, bkp)
+        kp = bands.kpoints
+        bnode.set_kpoints(kp[:, :3], weights=kp[:, 3])
+        bnode.set_bands(bands.bands[:, :, 1].transpose())
         kppath = self._calc.inp.settings.get_dict().get('kpoint_path')
         kpl = [[kpp[0], kpp[1:4]] for kpp in kppath]
         kpl.append([kppath[-1][4], kppath[-1][5:8]])
-        counter = {i[0]: 0 for i in kpl}
-        kplab = []
-        for kpi in kpl:
-            ci = counter[kpi[0]]
-            idx = self._find_special_kpoint(kp[:, :3], kpi[1], num=ci)
-            kplab.append((idx, kpi[0]))
-            counter[kpi[0]] += 1
-        bnode.labels = kplab
+        bnode.labels = find_labels(kp[:, :3], kpl)
         return bnode
-
-    def _find_special_kpoint(self, kp, sp, num=0):
-        res = []
-        ix, iy = np.where(kp == sp)
-        for i in range(len(ix)-2):
-            if ix[i] == ix[i + 1] == ix[i + 2]:
-                if np.all(iy[i:i+3] == [0, 1, 2]):
-                    res.append(ix[i])
-        return res[num]
@@ -0,0 +1,46 @@
+__doc__ = '''
+Memoized ASE views of structure nodes.
+'''
+from collections import OrderedDict
+
+# uuid -> (fingerprint, ase.Atoms), least recently used first
+_ase_cache = OrderedDict()
+max_cached = 128
+
+
+def _fingerprint(node):
+    '''
+    changes whenever node is modified: the mtime of stored nodes, the
+    attributes (cell, pbc, kinds and sites of a StructureData) of
+    unstored ones
+    '''
+    if node._is_stored:
+        return node.mtime
+    return repr(sorted(node.get_attrs().iteritems()))
+
+
+def get_ase(node):
+    '''
+    node.get_ase(), built only once per node (StructureData or CifData)
+    as long as it is not modified. The cache is shared by all instances
+    of a node and holds up to :py:data:`max_cached` nodes.
+
+    The cached ase.Atoms object is shared between callers and must not
+    be changed, copy it first if necessary.
+    '''
+    fingerprint = _fingerprint(node)
+    cached = _ase_cache.pop(node.uuid, None)
+    if cached is None or cached[0] != fingerprint:
+        cached = (fingerprint, node.get_ase())
+    _ase_cache[node.uuid] = cached
+    while len(_ase_cache) > max_cached:
+        _ase_cache.popitem(last=False)
+    return cached[1]
+
+
+def clear_ase(node=None):
+    '''drop the cached ase.Atoms object of node, or all of them'''
+    if node is None:
+        _ase_cache.clear()
+    else:
+        _ase_cache.pop(node.uuid, None)
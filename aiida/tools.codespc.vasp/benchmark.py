@@ -0,0 +1,633 @@
+__doc__ = '''
+Time and memory usage of the submission preparation of vasp calculations
+and of the output file parsers, and the time of the cached ASE views of
+structures.
+
+Benchmarks run on synthetic input and output files of parametrized
+size, to run them locally::
+
+    python -m aiida.tools.codespecific.vasp.benchmark --kpoints 1000
+    python -m aiida.tools.codespecific.vasp.benchmark --prepare localhost \\
+        --atoms 512 --kpoints 10000 --paws 8
+    python -m aiida.tools.codespecific.vasp.benchmark --ase --atoms 64
+'''
+import cPickle
+import resource
+import time
+import os
+import numpy as np
+
+
+def _maxrss():
+    '''peak resident memory of this process in kB'''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _write_methods(calc):
+    return sorted(name for name in dir(type(calc))
+                  if name.startswith('write_') and
+                  callable(getattr(type(calc), name)))
+
+
+def profile_prepare(calc, inputdict=None, repeat=1):
+    '''
+    run calc._prepare_for_submission in a sandbox folder and record the
+    time and memory spent in each write_* method.
+
+    Times include nested calls (e.g. write_win called from
+    write_additional). Memory is the growth of the peak resident memory
+    of the process during a step, so only steps exceeding the previous
+    peak show up.
+
+    :param repeat: run the preparation this many times, times are the
+        best of all runs
+    :return: dict {step: {'time': seconds, 'calls': n, 'maxrss': kB}},
+        step is the name of the write_* method or 'total'
+    '''
+    from aiida.common.folders import SandboxFolder
+    if inputdict is None:
+        inputdict = calc.get_inputs_dict()
+    results = {}
+
+    def record(name, dtime, drss, calls=1):
+        step = results.setdefault(name, {'time': None, 'calls': 0,
+                                         'maxrss': 0})
+        step['calls'] = calls
+        step['maxrss'] = max(step['maxrss'], drss)
+        if step['time'] is None or dtime < step['time']:
+            step['time'] = dtime
+
+    def timed(name, method):
+        def wrapper(*args, **kwargs):
+            start, rss = time.time(), _maxrss()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                run[name][0] += time.time() - start
+                run[name][1] = max(run[name][1], _maxrss() - rss)
+                run[name][2] += 1
+        return wrapper
+
+    methods = _write_methods(calc)
+    for i in range(repeat):
+        run = {name: [0., 0, 0] for name in methods}
+        for name in methods:
+            setattr(calc, name, timed(name, getattr(calc, name)))
+        try:
+            start, rss = time.time(), _maxrss()
+            with SandboxFolder() as folder:
+                calc._prepare_for_submission(folder, inputdict)
+            record('total', time.time() - start, _maxrss() - rss)
+        finally:
+            for name in methods:
+                delattr(calc, name)
+        for name, (dtime, drss, calls) in run.iteritems():
+            if calls:
+                record(name, dtime, drss, calls)
+    return results
+
+
+def format_report(results, title=''):
+    '''tabulate the results of :py:func:`profile_prepare`'''
+    lines = []
+    if title:
+        lines.append(title)
+    lines.append('{:<20} {:>10} {:>6} {:>12}'.format(
+        'step', 'time [ms]', 'calls', 'maxrss [kB]'))
+    steps = sorted(k for k in results if k != 'total') + ['total']
+    for name in steps:
+        if name not in results:
+            continue
+        step = results[name]
+        lines.append('{:<20} {:>10.2f} {:>6} {:>12}'.format(
+            name, step['time'] * 1000, step['calls'], step['maxrss']))
+    return '\n'.join(lines)
+
+
+prepare_plugins = ['vasp.base.BasicCalculation', 'vasp.nscf', 'vasp.vasp5',
+                   'vasp.amn', 'vasp.vasp2w90', 'vasp.wannier']
+
+
+def _write_data(path, values=10000):
+    with open(path, 'w') as data:
+        data.write('  0.12345678E+01' * values)
+    return path
+
+
+def benchmark_structure(atoms=8, paws=2):
+    '''unstored structure of randomly placed atoms of paws elements'''
+    from aiida.orm import DataFactory
+    from ase.data import chemical_symbols
+    elements = chemical_symbols[1:paws + 1]
+    cell = np.eye(3) * 4 * atoms**(1. / 3)
+    structure = DataFactory('structure')(cell=cell)
+    for i, position in enumerate(np.random.random((atoms, 3)).dot(cell)):
+        structure.append_atom(position=position, symbols=elements[i % paws])
+    return structure
+
+
+def profile_ase(atoms=8, paws=2, repeat=200):
+    '''
+    time repeated lookups of the ASE view of an unstored structure, as
+    done by VaspMaker and during submission, with node.get_ase() and
+    with the cached :py:func:`~aiida.tools.codespecific.vasp.atoms.get_ase`
+
+    :return: {'plain': s, 'cached': s} for repeat lookups each
+    '''
+    from aiida.tools.codespecific.vasp.atoms import get_ase
+    structure = benchmark_structure(atoms=atoms, paws=paws)
+    results = {}
+    for name, lookup in [('plain', lambda: structure.get_ase()),
+                         ('cached', lambda: get_ase(structure))]:
+        start = time.time()
+        for i in range(repeat):
+            lookup().get_chemical_symbols()
+            lookup().get_cell()
+        results[name] = time.time() - start
+    return results
+
+
+def benchmark_calc(plugin, computer, folder, atoms=8, kpoints=10, paws=2,
+                   lines=3000):
+    '''
+    an unstored calculation of class plugin with synthetic inputs of the
+    given size, the input files are written to folder
+
+    :param paws: number of elements, each with a POTCAR of lines of data
+    '''
+    from aiida.orm import CalculationFactory, Code, DataFactory
+    from ase.data import chemical_symbols
+    code = Code()
+    code.set_computer(computer)
+    code.set_remote_computer_exec((computer, '/bin/true'))
+    calc = CalculationFactory(plugin)()
+    calc.use_code(code)
+    calc.set_computer(computer)
+    win = DataFactory('parameter')(dict={'num_wann': 8, 'bands_plot': True})
+    wdat = DataFactory('vasp.archive')()
+    for name in ('wannier90.amn', 'wannier90.mmn'):
+        wdat.add_file(_write_data(os.path.join(folder, name)), name)
+    wdat._make_archive()
+    if plugin == 'vasp.wannier':
+        calc.use_settings(win)
+        calc.use_data(wdat)
+        return calc
+    calc.set_resources({'num_machines': 1, 'num_mpiprocs_per_machine': 1})
+    calc.use_settings(DataFactory('parameter')(
+        dict={'gga': 'PE', 'lorbit': 11, 'sigma': .05}))
+    elements = chemical_symbols[1:paws + 1]
+    calc.use_structure(benchmark_structure(atoms=atoms, paws=paws))
+    kp = DataFactory('array.kpoints')()
+    kp.set_kpoints(np.random.random((kpoints, 3)), weights=np.ones(kpoints))
+    calc.use_kpoints(kp)
+    for element in elements:
+        path = os.path.join(folder, 'POTCAR_' + element)
+        write_potcar(path, lines=lines, element=element)
+        calc.use_paw(DataFactory('vasp.paw').from_potcar(path), kind=element)
+    if hasattr(calc, 'use_charge_density'):
+        calc.inp.settings.update_dict({'icharg': 11})
+        calc.use_charge_density(DataFactory('vasp.chargedensity')(
+            file=_write_data(os.path.join(folder, 'CHGCAR'))))
+        calc.use_wavefunctions(DataFactory('vasp.wavefun')(
+            file=_write_data(os.path.join(folder, 'WAVECAR'))))
+    if hasattr(calc, 'use_wannier_settings'):
+        calc.use_wannier_settings(win)
+    if hasattr(calc, 'use_wannier_data'):
+        calc.use_wannier_data(wdat)
+    return calc
+
+
+def profile_preparations(computer, folder, repeat=1, plugins=None,
+                         **sizes):
+    '''
+    profile the submission preparation of all calculation classes in
+    plugins (default :py:data:`prepare_plugins`) on synthetic inputs
+
+    :param sizes: atoms, kpoints, paws and lines, see
+        :py:func:`benchmark_calc`
+    :return: list of (plugin, :py:func:`profile_prepare` result)
+    '''
+    results = []
+    for plugin in plugins or prepare_plugins:
+        calc = benchmark_calc(plugin, computer, folder, **sizes)
+        results.append((plugin, profile_prepare(calc, repeat=repeat)))
+    return results
+
+
+def write_vasprun(path, atoms=8, kpoints=10, bands=48, spins=1, nedos=301):
+    '''
+    write a vasprun.xml with the sections read by
+    :py:class:`~aiida.tools.codespecific.vasp.io.vasprun.VasprunParser`,
+    eigenvalues, occupations, total and lm decomposed dos.
+    '''
+    orbitals = ['s', 'py', 'pz', 'px', 'dxy', 'dyz', 'dz2', 'dxz', 'dx2']
+    cell = np.eye(3) * 4 * atoms**(1. / 3)
+    positions = np.random.random((atoms, 3))
+    energies = np.linspace(-10, 10, nedos)
+    ev = np.sort(np.random.random(bands)) * 20 - 10
+
+    def varray(name, rows, indent):
+        out = ['{}<varray name="{}" >'.format(indent, name)]
+        out += ['{} <v>{} </v>'.format(indent, ''.join(
+            '{:17.8f}'.format(x) for x in row)) for row in rows]
+        out.append('{}</varray>'.format(indent))
+        return out
+
+    def structure(name, indent):
+        out = ['{}<structure{}>'.format(
+            indent, name and ' name="{}" '.format(name) or '')]
+        out.append(indent + ' <crystal>')
+        out += varray('basis', cell, indent + '  ')
+        out.append('{}  <i name="volume">{:16.8f} </i>'.format(
+            indent, np.linalg.det(cell)))
+        out.append(indent + ' </crystal>')
+        out += varray('positions', positions, indent + ' ')
+        out.append(indent + '</structure>')
+        return out
+
+    with open(path, 'w') as vrun:
+        lines = ['<?xml version="1.0" encoding="ISO-8859-1"?>',
+                 '<modeling>',
+                 ' <generator>',
+                 '  <i name="program" type="string">vasp </i>',
+                 '  <i name="version" type="string">5.3.5  </i>',
+                 '  <i name="date" type="string">2016 03 08 </i>',
+                 '  <i name="time" type="string">15:45:32 </i>',
+                 ' </generator>',
+                 ' <incar>',
+                 '  <i type="int" name="ICHARG">    11</i>',
+                 '  <i type="int" name="LORBIT">    11</i>',
+                 ' </incar>',
+                 ' <parameters>',
+                 '  <separator name="electronic" >',
+                 '   <i type="int" name="ISPIN">     {}</i>'.format(spins),
+                 '   <i type="int" name="NBANDS">    {}</i>'.format(bands),
+                 '   <i type="int" name="NEDOS">   {}</i>'.format(nedos),
+                 '   <i type="int" name="IBRION">    -1</i>',
+                 '  </separator>',
+                 ' </parameters>']
+        lines += structure('initialpos', ' ')
+        lines += [' <calculation>']
+        lines += structure('', '  ')
+        lines += ['  <eigenvalues>',
+                  '   <array>',
+                  '    <dimension dim="1">band</dimension>',
+                  '    <dimension dim="2">kpoint</dimension>',
+                  '    <dimension dim="3">spin</dimension>',
+                  '    <field>eigene</field>',
+                  '    <field>occ</field>',
+                  '    <set>']
+        vrun.write('\n'.join(lines) + '\n')
+        block = ''.join('       <r>{:10.4f}{:10.4f} </r>\n'.format(
+            e, float(e < 0)) for e in ev)
+        for s in range(spins):
+            vrun.write('     <set comment="spin {}">\n'.format(s + 1))
+            for k in range(kpoints):
+                vrun.write('      <set comment="kpoint {}">\n'.format(
+                    k + 1))
+                vrun.write(block)
+                vrun.write('      </set>\n')
+            vrun.write('     </set>\n')
+        lines = ['    </set>',
+                 '   </array>',
+                 '  </eigenvalues>',
+                 '  <dos>',
+                 '   <i name="efermi">      0.00000000 </i>',
+                 '   <total>',
+                 '    <array>',
+                 '     <dimension dim="1">gridpoints</dimension>',
+                 '     <dimension dim="2">spin</dimension>',
+                 '     <field>energy</field>',
+                 '     <field>total</field>',
+                 '     <field>integrated</field>',
+                 '     <set>']
+        vrun.write('\n'.join(lines) + '\n')
+        block = ''.join(
+            '       <r>{:10.4f}{:11.4f}{:11.4f} </r>\n'.format(e, 1., i)
+            for i, e in enumerate(energies))
+        for s in range(spins):
+            vrun.write('      <set comment="spin {}">\n'.format(s + 1))
+            vrun.write(block)
+            vrun.write('      </set>\n')
+        lines = ['     </set>',
+                 '    </array>',
+                 '   </total>',
+                 '   <partial>',
+                 '    <array>',
+                 '     <dimension dim="1">gridpoints</dimension>',
+                 '     <dimension dim="2">spin</dimension>',
+                 '     <dimension dim="3">ion</dimension>',
+                 '     <field>energy</field>']
+        lines += ['     <field>{:>3}</field>'.format(o) for o in orbitals]
+        lines += ['     <set>']
+        vrun.write('\n'.join(lines) + '\n')
+        block = ''.join('        <r>{:10.4f}{} </r>\n'.format(
+            e, '     0.0100' * len(orbitals)) for e in energies)
+        for i in range(atoms):
+            vrun.write('      <set comment="ion {}">\n'.format(i + 1))
+            for s in range(spins):
+                vrun.write('       <set comment="spin {}">\n'.format(s + 1))
+                vrun.write(block)
+                vrun.write('       </set>\n')
+            vrun.write('      </set>\n')
+        lines = ['     </set>',
+                 '    </array>',
+                 '   </partial>',
+                 '  </dos>',
+                 ' </calculation>']
+        lines += structure('finalpos', ' ')
+        lines += ['</modeling>']
+        vrun.write('\n'.join(lines) + '\n')
+
+
+def _poscar_header(atoms):
+    return ['{:5d}{:5d}    1    1'.format(atoms, atoms),
+            '  0.2779555E+02  0.6058360E-09  0.6058360E-09  0.6058360E-09'
+            '  0.5000000E-15',
+            '  1.000000000000000E-004',
+            '  CAR ',
+            ' synthetic system']
+
+
+def write_eigenval(path, atoms=8, kpoints=10, bands=48, spins=1):
+    '''write an EIGENVAL file as written by VASP 5'''
+    kpts = np.random.random((kpoints, 3))
+    ev = np.sort(np.random.random(bands)) * 20 - 10
+    with open(path, 'w') as eig:
+        lines = _poscar_header(atoms)
+        lines[0] = '{:5d}{:5d}    1{:5d}'.format(atoms, atoms, spins)
+        lines.append('{:7d}{:7d}{:7d}'.format(bands, kpoints, bands))
+        eig.write('\n'.join(lines) + '\n')
+        fmt = '{:5d}' + '{:16.6f}' * spins + '\n'
+        block = ''.join(fmt.format(b + 1, *([e] * spins))
+                        for b, e in enumerate(ev))
+        for k in kpts:
+            eig.write(' \n{:15.7E}{:15.7E}{:15.7E}{:15.7E}\n'.format(
+                k[0], k[1], k[2], 1. / kpoints))
+            eig.write(block)
+
+
+def write_doscar(path, atoms=8, spins=1, nedos=301):
+    '''write a DOSCAR file with lm decomposed per ion blocks'''
+    energies = np.linspace(-10, 10, nedos)
+    info = '{:16.8f}{:16.8f}{:5d}{:16.8f}{:16.8f}'.format(
+        10., -10., nedos, 0., 1.)
+    with open(path, 'w') as dos:
+        dos.write('\n'.join(_poscar_header(atoms) + [info]) + '\n')
+        tfmt = '{:12.3f}' + '{:12.4E}' * (2 * spins) + '\n'
+        for i, e in enumerate(energies):
+            dos.write(tfmt.format(e, *([1.] * spins + [float(i)] * spins)))
+        block = ''.join('{:12.3f}{}\n'.format(e, '  0.1000E-01' * 9 * spins)
+                        for e in energies)
+        for i in range(atoms):
+            dos.write(info + '\n')
+            dos.write(block)
+
+
+def write_ibzkpt(path, kpoints=10):
+    '''write an IBZKPT file with an explicit list of kpoints'''
+    kpts = np.random.random((kpoints, 3))
+    with open(path, 'w') as ibz:
+        ibz.write('Automatically generated mesh\n')
+        ibz.write('{:8d}\n'.format(kpoints))
+        ibz.write('Reciprocal lattice\n')
+        for k in kpts:
+            ibz.write('{:20.14f}{:20.14f}{:20.14f}{:14d}\n'.format(
+                k[0], k[1], k[2], 1))
+
+
+def write_wannier_bands(dat, kpt, kpoints=10, bands=48):
+    '''write wannier90_band.dat and wannier90_band.kpt'''
+    kpts = np.random.random((kpoints, 3))
+    dist = np.linspace(0, 5, kpoints)
+    with open(kpt, 'w') as kfile:
+        kfile.write('{:12d}\n'.format(kpoints))
+        for k in kpts:
+            kfile.write('{:12.6f}{:12.6f}{:12.6f}   1.0\n'.format(*k))
+    with open(dat, 'w') as dfile:
+        for e in np.sort(np.random.random(bands)) * 20 - 10:
+            dfile.write(''.join('{:16.8E}{:16.8E}\n'.format(d, e)
+                                for d in dist))
+            dfile.write(' \n')
+
+
+def write_win(path, atoms=8, kpoints=10, bands=48):
+    '''write a wannier90.win file with atoms and kpoints blocks'''
+    with open(path, 'w') as win:
+        win.write('num_bands = {}\nnum_wann = {}\n'.format(bands, bands))
+        win.write('! synthetic input\nbands_plot = T\n')
+        win.write('begin atoms_frac\n')
+        for pos in np.random.random((atoms, 3)):
+            win.write('H {:12.8f} {:12.8f} {:12.8f}\n'.format(*pos))
+        win.write('end atoms_frac\n')
+        win.write('begin kpoints\n')
+        for k in np.random.random((kpoints, 3)):
+            win.write('{:12.8f} {:12.8f} {:12.8f}\n'.format(*k))
+        win.write('end kpoints\n')
+
+
+def write_potcar(path, lines=3000, element='H'):
+    '''write a single element POTCAR with lines of data'''
+    header = [' PAW_PBE {} 15Jun2001'.format(element),
+              '   1.00000000000000',
+              ' parameters from PSCTR are:',
+              '   VRHFIN ={}: ultrasoft test'.format(element),
+              '   LEXCH  = PE',
+              '   TITEL  = PAW_PBE {} 15Jun2001'.format(element),
+              '   LULTRA =        F    use ultrasoft PP ?',
+              '   POMASS =    1.000; ZVAL   =    1.000    mass and valenz',
+              '   ENMAX  =  250.000; ENMIN  =  200.000 eV',
+              '   LPAW   =        T    paw PP',
+              ' Atomic configuration']
+    with open(path, 'w') as potcar:
+        potcar.write('\n'.join(header) + '\n')
+        potcar.write(('  0.12345678E+01' * 5 + '\n') * lines)
+        potcar.write(' End of Dataset\n')
+
+
+def _in_child(func, *args):
+    '''
+    run func(*args) in a forked process, so the peak memory it reports
+    is not hidden by earlier peaks of this process
+    '''
+    rfd, wfd = os.pipe()
+    pid = os.fork()
+    if not pid:
+        os.close(rfd)
+        try:
+            out = cPickle.dumps((True, func(*args)))
+        except Exception as e:
+            out = cPickle.dumps((False, repr(e)))
+        with os.fdopen(wfd, 'wb') as pipe:
+            pipe.write(out)
+        os._exit(0)
+    os.close(wfd)
+    with os.fdopen(rfd, 'rb') as pipe:
+        data = pipe.read()
+    os.waitpid(pid, 0)
+    ok, result = cPickle.loads(data)
+    if not ok:
+        raise RuntimeError(result)
+    return result
+
+
+def _measure(parse, path):
+    start, rss = time.time(), _maxrss()
+    parse(path)
+    return time.time() - start, _maxrss() - rss
+
+
+def profile_parser(parse, path, repeat=3, isolate=True):
+    '''
+    time parse(path)
+
+    :param isolate: run each repetition in a forked process to measure
+        its peak memory
+    :return: dict with the best 'time' in s, the growth of the peak
+        resident memory 'maxrss' in kB, the file 'size' in bytes and the
+        'throughput' in MB/s
+    '''
+    runs = []
+    for i in range(repeat):
+        if isolate:
+            runs.append(_in_child(_measure, parse, path))
+        else:
+            runs.append(_measure(parse, path))
+    best = min(r[0] for r in runs)
+    size = os.path.getsize(path)
+    return {'time': best, 'maxrss': max(r[1] for r in runs), 'size': size,
+            'throughput': size / 2.**20 / max(best, 1e-9)}
+
+
+def _parse_vasprun(parser_cls):
+    def parse(path):
+        vrp = parser_cls(path)
+        return vrp.bands, vrp.occupations, vrp.tdos, vrp.pdos, vrp.cell
+    return parse
+
+
+def parser_benchmarks():
+    '''
+    :return: list of (name, writer, filenames, parse), writer takes the
+        paths given by filenames and the size keywords, parse takes the
+        path of the first file
+    '''
+    from aiida.tools.codespecific.vasp.io.vasprun import VasprunParser, \
+        VasprunStreamParser
+    from aiida.tools.codespecific.vasp.io.eigenval import EigParser
+    from aiida.tools.codespecific.vasp.io.doscar import DosParser
+    from aiida.tools.codespecific.vasp.io.kpoints import KpParser
+    from aiida.tools.codespecific.vasp.io.win import WinParser
+    from aiida.tools.codespecific.vasp.io.potcar import PawParser
+    from aiida.tools.codespecific.vasp.io.wannier_bands import \
+        WannierBandsParser
+
+    def wannier_bands(path):
+        return WannierBandsParser(path, path[:-3] + 'kpt')
+
+    return [
+        ('VasprunParser', write_vasprun, ['vasprun.xml'],
+         _parse_vasprun(VasprunParser)),
+        ('VasprunStreamParser', write_vasprun, ['vasprun.xml'],
+         _parse_vasprun(VasprunStreamParser)),
+        ('EigParser', write_eigenval, ['EIGENVAL'], EigParser),
+        ('DosParser', write_doscar, ['DOSCAR'], DosParser),
+        ('KpParser', write_ibzkpt, ['IBZKPT'], KpParser),
+        ('WinParser', write_win, ['wannier90.win'], WinParser),
+        ('PawParser', write_potcar, ['POTCAR'], PawParser.parse_potcar),
+        ('wannier90 bands', write_wannier_bands,
+         ['wannier90_band.dat', 'wannier90_band.kpt'], wannier_bands)]
+
+
+def profile_parsers(folder, repeat=3, isolate=True, **sizes):
+    '''
+    write synthetic output files to folder and profile all parsers on
+    them
+
+    :param sizes: atoms, kpoints, bands, spins, nedos and lines (of
+        POTCAR data), passed on to the writers that accept them
+    :return: list of (name, :py:func:`profile_parser` result)
+    '''
+    import inspect
+    results = []
+    for name, writer, fnames, parse in parser_benchmarks():
+        paths = [os.path.join(folder, f) for f in fnames]
+        if not os.path.exists(paths[0]):
+            accepted = inspect.getargspec(writer).args
+            writer(*paths, **{k: v for k, v in sizes.iteritems()
+                              if k in accepted})
+        results.append((name, profile_parser(parse, paths[0], repeat=repeat,
+                                             isolate=isolate)))
+    return results
+
+
+def format_parser_report(results, title=''):
+    '''tabulate the results of :py:func:`profile_parsers`'''
+    lines = []
+    if title:
+        lines.append(title)
+    lines.append('{:<20} {:>10} {:>10} {:>10} {:>12}'.format(
+        'parser', 'size [MB]', 'time [ms]', 'MB/s', 'maxrss [kB]'))
+    for name, res in results:
+        lines.append('{:<20} {:>10.2f} {:>10.2f} {:>10.1f} {:>12}'.format(
+            name, res['size'] / 2.**20, res['time'] * 1000,
+            res['throughput'], res['maxrss']))
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    import argparse
+    import tempfile
+    import shutil
+    parser = argparse.ArgumentParser(
+        description='profile the vasp output parsers or the submission '
+        'preparation on synthetic files')
+    for key, default in [('atoms', 8), ('kpoints', 100), ('bands', 48),
+                         ('spins', 1), ('nedos', 301), ('lines', 3000),
+                         ('paws', 2), ('repeat', 3)]:
+        parser.add_argument('--' + key, type=int, default=default)
+    parser.add_argument('--ase', action='store_true',
+                        help='time the cached ASE views of a structure '
+                        'instead (needs a configured aiida profile)')
+    parser.add_argument('--prepare', metavar='COMPUTER',
+                        help='profile the submission preparation of all '
+                        'calculation classes for this computer instead '
+                        '(needs a configured aiida profile)')
+    params = vars(parser.parse_args(args))
+    repeat = params.pop('repeat')
+    computer = params.pop('prepare')
+    paws = params.pop('paws')
+    if params.pop('ase'):
+        from aiida import load_dbenv
+        load_dbenv()
+        times = profile_ase(atoms=params['atoms'], paws=paws,
+                            repeat=repeat * 100)
+        print 'get_ase x{}, {} atoms: plain {:.3f}s, cached {:.3f}s'.format(
+            repeat * 100, params['atoms'], times['plain'], times['cached'])
+        return
+    folder = tempfile.mkdtemp()
+    try:
+        if computer:
+            from aiida import load_dbenv
+            load_dbenv()
+            from aiida.orm import Computer
+            sizes = {'atoms': params['atoms'], 'kpoints': params['kpoints'],
+                     'paws': paws, 'lines': params['lines']}
+            results = profile_preparations(Computer.get(computer), folder,
+                                           repeat=repeat, **sizes)
+        else:
+            results = profile_parsers(folder, repeat=repeat, **params)
+    finally:
+        shutil.rmtree(folder)
+    if computer:
+        for plugin, result in results:
+            title = '{}: {}'.format(plugin, ', '.join(
+                '{} {}'.format(v, k) for k, v in sorted(sizes.iteritems())))
+            print format_report(result, title=title) + '\n'
+        return
+    title = ', '.join('{} {}'.format(v, k) for k, v in sorted(
+        params.iteritems()))
+    print format_parser_report(results, title=title)
+
+if __name__ == '__main__':
+    main()
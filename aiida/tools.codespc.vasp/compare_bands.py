@@ -81,6 +81,44 @@ def make_reference_bands_inline(wannier_bands, vasp_bands, efermi=None):
     return {'bands': ref_bands, 'info': ref_info}
 
 
+def _wannier_calc(bands_node):
+    '''
+    the wannier calculation a bands node was created by, for bands
+    evaluated with :py:func:`tb_bands_inline` the one that created the
+    model.
+    '''
+    calc = bands_node.inp.bands
+    if calc.get_attr('function_name', None) == 'tb_bands_inline':
+        return calc.inp.tb_model.inp.tb_model
+    return calc
+
+
+@optional_inline
+def tb_bands_inline(tb_model, kpoints, settings=None):
+    '''
+    evaluate a tight binding model on the kpoints of another node, without
+    running wannier90 again.
+
+    :param tb_model: vasp.tbmodel node, the tb_model output of a wannier
+        calculation
+    :param kpoints: array.kpoints or array.bands node, kpoints and labels
+        are copied
+    :param settings: optional parameter node with the keys 'chunk_size'
+        (kpoints per chunk) and 'processes' (number of worker processes),
+        see :py:class:`~aiida.tools.codespecific.vasp.hamiltonian.TbHamiltonian`
+    :return: {'bands': array.bands node with the eigenvalues of H(k)}
+    '''
+    from aiida.tools.codespecific.vasp.hamiltonian import TbHamiltonian
+    settings = settings.get_dict() if settings else {}
+    model = TbHamiltonian.from_node(tb_model)
+    bands = BandsData()
+    bands.set_kpointsdata(kpoints)
+    bands.set_bands(model.eigenvalues(
+        kpoints.get_kpoints(), chunk_size=settings.get('chunk_size'),
+        processes=settings.get('processes', 1)))
+    return {'bands': bands}
+
+
 def get_outer_window(bands_node, silent=False):
     '''
     Check if bands_node is a child of a calculation and that calculation
@@ -90,7 +128,7 @@ def get_outer_window(bands_node, silent=False):
     '''
     owindow = None
     try:
-        calc = bands_node.inp.bands
+        calc = _wannier_calc(bands_node)
         wset = calc.inp.settings.get_dict()
         owindow = (
             wset['dis_win_min'],
@@ -190,18 +228,37 @@ def bands_error(bands1, bands2):
     return err
 
 
-def compare_bands(vasp_bands, wannier_bands_list, plot_folder=None):
+def compare_bands(vasp_bands, wannier_bands_list, plot_folder=None,
+                  processes=None):
+    '''
+    compare wannier90 band structures to a vasp reference.
+
+    :param wannier_bands_list: bands outputs of wannier calculations or
+        their tb_model outputs, the latter are evaluated on the kpoints of
+        vasp_bands (see :py:func:`tb_bands_inline`, with processes)
+    :return: dict of comparison results by pk of the nodes in
+        wannier_bands_list
+    '''
     import numpy as np
     import bands as btool
+    TbmodelData = DataFactory('vasp.tbmodel')
+    nodes = wannier_bands_list
+    tb_kwargs = {'kpoints': vasp_bands, 'store': True}
+    if processes:
+        tb_kwargs['settings'] = DataFactory('parameter')(
+            dict={'processes': processes})
+    wannier_bands_list = [
+        tb_bands_inline(tb_model=b, **tb_kwargs)['bands']
+        if isinstance(b, TbmodelData) else b for b in nodes]
     owindows = {get_outer_window(b): b for b in wannier_bands_list}
     ref_bands = {k: make_reference_bands_inline(wannier_bands=b, vasp_bands=vasp_bands)
                  for k, b in owindows.iteritems()}
     info = {}
-    for wannier_bands in wannier_bands_list:
+    for node, wannier_bands in zip(nodes, wannier_bands_list):
         owindow = get_outer_window(wannier_bands)
         reference = ref_bands[owindow]['bands']
         refinfo = ref_bands[owindow]['info'].get_dict()
-        wannier_calc = wannier_bands.inp.bands
+        wannier_calc = _wannier_calc(wannier_bands)
         wannier_param = wannier_calc.inp.settings.get_dict()
         iwindow = [
             wannier_param['dis_froz_min'],
@@ -217,7 +274,7 @@ def compare_bands(vasp_bands, wannier_bands_list, plot_folder=None):
             error_k_gap = np.abs(ref_k_gap - wannier_k_gap)
         else:
             error_k_gap = []
-        info[wannier_bands.pk] = {
+        info[node.pk] = {
             'calc': wannier_calc.pk,
             'outer_window': owindow,
             'inner_window': iwindow,
@@ -238,9 +295,10 @@ def compare_bands(vasp_bands, wannier_bands_list, plot_folder=None):
             btool.plt.hlines(refinfo['efermi'], xlim[0], xlim[1], color='k', linestyles='dashed')
             btool.plt.yticks(list(btool.plt.yticks()[0]) + [refinfo['efermi']],
                     [str(l) for l in btool.plt.yticks()[0]] + [r'$E_{fermi}$'])
-            pdf = os.path.join(plot_folder, 'comparison_%s.pdf' % wannier_calc.pk)
+            pdf = os.path.join(plot_folder, 'comparison_%s_%s.pdf' % (
+                wannier_calc.pk, node.pk))
             fig.savefig(pdf)
-            info[wannier_bands.pk]['plot'] =  pdf
+            info[node.pk]['plot'] =  pdf
 
     return info
 
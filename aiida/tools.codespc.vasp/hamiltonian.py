@@ -0,0 +1,181 @@
+__doc__ = '''
+This module evaluates wannier90 tight binding models (wannier90_hr.dat,
+vasp.tbmodel nodes) on arbitrary kpoints.
+'''
+from multiprocessing import Pool
+import numpy as np
+
+
+class TbHamiltonian(object):
+    '''
+    H(k) and its eigenvalues for a tight binding model
+
+    .. math:: H_{mn}(k) = \\sum_R e^{2\\pi i k \\cdot R} H_{mn}(R) / d_R
+
+    with kpoints in reduced coordinates and d_R the degeneracy of R.
+
+    The kpoints are processed in chunks of :py:attr:`chunk_size` (by
+    default as many as fit into about :py:attr:`chunk_bytes` of
+    intermediate arrays): for each chunk the phases of all R-vectors
+    are computed at once, H(k) for the whole chunk is one matrix product
+    with the hoppings, and the stacked matrices are diagonalized in a
+    single np.linalg.eigh call. With processes > 1 the chunks are
+    distributed over a process pool.
+
+    Sparse models (indices (nnz, 3) of (r, m, n) and values (nnz,)) are
+    evaluated without expanding the hoppings.
+    '''
+    chunk_bytes = 64 * 2**20
+
+    def __init__(self, rvectors, degeneracies, hoppings=None, indices=None,
+                 values=None, num_wann=None):
+        self.rvectors = np.asarray(rvectors, dtype=float)
+        self.weights = 1. / np.asarray(degeneracies, dtype=float)
+        if hoppings is not None:
+            hoppings = np.asarray(hoppings, dtype=complex)
+            self.num_wann = hoppings.shape[1]
+            self.hoppings = hoppings.reshape(len(hoppings), -1)
+            self.indices = self.values = None
+        elif values is not None:
+            if num_wann is None:
+                raise ValueError('num_wann is needed for sparse models')
+            self.num_wann = num_wann
+            self.hoppings = None
+            indices = np.asarray(indices).reshape(-1, 3)
+            flat = indices[:, 1] * num_wann + indices[:, 2]
+            # sorted by matrix element, to sum them with one reduceat
+            order = np.argsort(flat, kind='mergesort')
+            self.indices = indices[order, 0]
+            self.flat = flat[order]
+            self.values = np.asarray(values, dtype=complex)[order]
+            self.elements, self.starts = np.unique(self.flat,
+                                                   return_index=True)
+        else:
+            raise ValueError('either hoppings or indices and values needed')
+
+    @classmethod
+    def from_node(cls, node):
+        '''from a vasp.tbmodel node'''
+        if node.is_sparse:
+            return cls(node.get_rvectors(), node.get_degeneracies(),
+                       indices=node.get_array('indices'),
+                       values=node.get_array('values'),
+                       num_wann=node.num_wann)
+        return cls(node.get_rvectors(), node.get_degeneracies(),
+                   hoppings=node.get_hoppings())
+
+    @classmethod
+    def from_hr(cls, path, cutoff=None):
+        '''from a wannier90_hr.dat file'''
+        from aiida.tools.codespecific.vasp.io.hr import HrParser
+        hr = HrParser(path, cutoff=cutoff)
+        return cls(hr.rvectors, hr.degeneracies, hoppings=hr.hoppings,
+                   indices=hr.indices, values=hr.values,
+                   num_wann=hr.num_wann)
+
+    def _args(self):
+        '''constructor arguments, for rebuilding in worker processes'''
+        if self.hoppings is not None:
+            hoppings = self.hoppings.reshape(-1, self.num_wann,
+                                             self.num_wann)
+            return (self.rvectors, 1. / self.weights, hoppings)
+        indices = np.column_stack([self.indices,
+                                   self.flat // self.num_wann,
+                                   self.flat % self.num_wann])
+        return (self.rvectors, 1. / self.weights, None, indices,
+                self.values, self.num_wann)
+
+    def default_chunk_size(self):
+        '''kpoints per chunk, keeping intermediate arrays below chunk_bytes'''
+        nmat = self.num_wann**2
+        # phases, H(k), eigh workspace and eigenvectors
+        per_k = 16 * (len(self.rvectors) + 3 * nmat)
+        if self.values is not None:
+            per_k += 16 * len(self.values)
+        return max(int(self.chunk_bytes // per_k), 1)
+
+    def phases(self, kpoints):
+        '''e^(2 pi i k.R) / d_R with shape (nk, nrpts)'''
+        kr = np.dot(np.asarray(kpoints, dtype=float), self.rvectors.T)
+        return np.exp(2j * np.pi * kr) * self.weights
+
+    def hamiltonian(self, kpoints):
+        '''
+        :param kpoints: array of shape (nk, 3) in reduced coordinates
+        :return: H(k) with shape (nk, num_wann, num_wann)
+        '''
+        kpoints = np.atleast_2d(kpoints)
+        nw = self.num_wann
+        phases = self.phases(kpoints)
+        if self.hoppings is not None:
+            hk = np.dot(phases, self.hoppings)
+        else:
+            hk = np.zeros((len(kpoints), nw * nw), dtype=complex)
+            if len(self.values):
+                contrib = phases[:, self.indices] * self.values
+                hk[:, self.elements] = np.add.reduceat(
+                    contrib, self.starts, axis=1)
+        return hk.reshape(len(kpoints), nw, nw)
+
+    def _eig_chunk(self, kpoints, vectors=False):
+        hk = self.hamiltonian(kpoints)
+        if vectors:
+            return np.linalg.eigh(hk)
+        return np.linalg.eigvalsh(hk)
+
+    def iter_chunks(self, kpoints, chunk_size=None):
+        '''split kpoints into chunks of chunk_size'''
+        chunk_size = chunk_size or self.default_chunk_size()
+        for start in range(0, len(kpoints), chunk_size):
+            yield kpoints[start:start + chunk_size]
+
+    def eigenvalues(self, kpoints, vectors=False, chunk_size=None,
+                    processes=1):
+        '''
+        diagonalize H(k) for all kpoints
+
+        :param kpoints: array of shape (nk, 3) in reduced coordinates
+        :param vectors: also return the eigenvectors
+        :param chunk_size: kpoints per chunk, see
+            :py:meth:`default_chunk_size`
+        :param processes: number of worker processes, chunks are
+            evaluated in a process pool if > 1
+        :return: eigenvalues with shape (nk, num_wann), ascending per
+            kpoint; with vectors=True (eigenvalues, eigenvectors), the
+            latter with shape (nk, num_wann, num_wann), column i
+            belonging to eigenvalue i
+        '''
+        kpoints = np.atleast_2d(np.asarray(kpoints, dtype=float))
+        chunks = list(self.iter_chunks(kpoints, chunk_size))
+        if processes and processes > 1 and len(chunks) > 1:
+            pool = Pool(min(processes, len(chunks)), _init_worker,
+                        (self._args(),))
+            try:
+                results = pool.map(_eig_chunk,
+                                   [(chunk, vectors) for chunk in chunks])
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [self._eig_chunk(chunk, vectors) for chunk in chunks]
+        if not results:
+            results = [self._eig_chunk(np.zeros((0, 3)), vectors)]
+        if vectors:
+            return (np.concatenate([r[0] for r in results]),
+                    np.concatenate([r[1] for r in results]))
+        return np.concatenate(results)
+
+
+_worker_model = None
+
+
+def _init_worker(args):
+    '''build the model once per worker process'''
+    global _worker_model
+    _worker_model = TbHamiltonian(*args)
+
+
+def _eig_chunk(task):
+    '''module level to be usable from a process pool'''
+    kpoints, vectors = task
+    return _worker_model._eig_chunk(kpoints, vectors)
@@ -0,0 +1,195 @@
+from parser import BaseParser
+import numpy as np
+import tempfile
+import mmap
+import os
+
+
+class ChgcarParser(BaseParser):
+    '''
+    parse the header of a CHGCAR (or CHG, LOCPOT, ...) file and give
+    lazy access to the volumetric data blocks.
+
+    Only the header is read on construction. The data blocks (total
+    density, then one (collinear) or three (noncollinear) magnetization
+    blocks) are decoded on first access. If a cache path is given, all
+    blocks are then written to it as a binary .npy file, which later
+    instances read as a read-only np.memmap instead of decoding the file
+    again.
+
+    Values are as written by VASP, i.e. density times cell volume, with
+    shape (ngx, ngy, ngz).
+
+    :param fname: path to the CHGCAR file
+    :param cache: path of the binary sidecar file, if not given no cache
+        is used
+    '''
+    def __init__(self, fname, cache=None):
+        self.fname = fname
+        self.cache = cache
+        self.header = self.parse_header(fname)
+        self._blocks = {}
+        self._all = None
+
+    @classmethod
+    def parse_header(cls, fname):
+        '''
+        read the structure and grid information and find the byte offsets
+        of all data blocks and augmentation sections.
+        '''
+        with open(fname) as chg:
+            header = cls._read_structure(chg)
+            grid_line = chg.readline()
+            while grid_line and not grid_line.strip():
+                grid_line = chg.readline()
+            header['grid'] = map(int, grid_line.split())
+            first = chg.tell()
+        mm = cls._map(fname)
+        try:
+            header['offsets'] = []
+            header['augmentation'] = []
+            pos = first
+            while pos >= 0:
+                header['offsets'].append(pos)
+                pos = mm.find(grid_line, pos)
+                if pos >= 0:
+                    pos += len(grid_line)
+            aug = mm.find('augmentation', first)
+            while aug >= 0:
+                header['augmentation'].append(aug)
+                aug = mm.find('augmentation', aug + 1)
+        finally:
+            mm.close()
+        return header
+
+    @classmethod
+    def _map(cls, fname):
+        with open(fname, 'rb') as chg:
+            return mmap.mmap(chg.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def _read_structure(cls, chg):
+        header = {}
+        header['name'] = chg.readline().strip()
+        scale = cls.line(chg, float)
+        cell = np.array([cls.line(chg, float) for i in range(3)])
+        if scale < 0:
+            scale = (-scale / abs(np.linalg.det(cell)))**(1. / 3)
+        header['cell'] = cell * scale
+        species = chg.readline().split()
+        try:
+            counts = map(int, species)
+            species = []
+        except ValueError:
+            counts = map(int, chg.readline().split())
+        header['species'] = species
+        header['counts'] = counts
+        coord_type = chg.readline()
+        if coord_type.strip().startswith(('s', 'S')):
+            coord_type = chg.readline()
+        header['cartesian'] = coord_type.strip().startswith(
+            ('c', 'C', 'k', 'K'))
+        header['positions'] = np.array(
+            [cls.line(chg, float)[:3] for i in range(sum(counts))])
+        return header
+
+    @property
+    def grid(self):
+        return tuple(self.header['grid'])
+
+    @property
+    def volume(self):
+        return abs(np.linalg.det(self.header['cell']))
+
+    @property
+    def n_blocks(self):
+        return len(self.header['offsets'])
+
+    def get_block(self, n):
+        '''
+        the n-th volumetric data block, decoded lazily
+
+        :return: array of shape (ngx, ngy, ngz), a read-only memmap if
+            the cache is used
+        '''
+        if self.cache:
+            return self._cached()[n]
+        if n not in self._blocks:
+            self._blocks[n] = self._decode(n)
+        return self._blocks[n]
+
+    @property
+    def density(self):
+        return self.get_block(0)
+
+    @property
+    def magnetization(self):
+        '''
+        None for spin unpolarized, the magnetization density for spin
+        polarized and an array of shape (3, ngx, ngy, ngz) for
+        noncollinear runs.
+        '''
+        if self.n_blocks == 1:
+            return None
+        if self.n_blocks == 2:
+            return self.get_block(1)
+        return np.array([self.get_block(n) for n in range(1, self.n_blocks)])
+
+    def _decode(self, n, mm=None):
+        ngx, ngy, ngz = self.grid
+        start = self.header['offsets'][n]
+        own = mm is None
+        if own:
+            mm = self._map(self.fname)
+        try:
+            # VASP writes five (ten for CHG) values per line, no more than
+            # 21 characters each
+            stop = start + ngx * ngy * ngz * 22
+            data = np.fromstring(mm[start:stop], sep=' ',
+                                 count=ngx * ngy * ngz)
+        finally:
+            if own:
+                mm.close()
+        return data.reshape((ngx, ngy, ngz), order='F')
+
+    def _cache_valid(self):
+        if not os.path.isfile(self.cache):
+            return False
+        if os.path.getmtime(self.cache) < os.path.getmtime(self.fname):
+            return False
+        cached = np.load(self.cache, mmap_mode='r')
+        return cached.shape == (self.n_blocks,) + self.grid
+
+    def _cached(self):
+        if self._all is None:
+            if not self._cache_valid():
+                self._write_cache()
+            self._all = np.load(self.cache, mmap_mode='r')
+        return self._all
+
+    def _write_cache(self):
+        '''
+        write all blocks to a unique temporary file next to the cache and
+        rename it, so concurrent writers never see partial caches
+        '''
+        cachedir = os.path.dirname(os.path.abspath(self.cache))
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        fd, tmp = tempfile.mkstemp(dir=cachedir, suffix='.npy')
+        os.close(fd)
+        try:
+            out = np.lib.format.open_memmap(
+                tmp, mode='w+', dtype=float,
+                shape=(self.n_blocks,) + self.grid)
+            mm = self._map(self.fname)
+            try:
+                for n in range(self.n_blocks):
+                    out[n] = self._decode(n, mm=mm)
+            finally:
+                mm.close()
+            out.flush()
+            del out
+            os.rename(tmp, self.cache)
+        except:
+            os.remove(tmp)
+            raise
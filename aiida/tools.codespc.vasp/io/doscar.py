@@ -6,6 +6,10 @@ class DosParser(BaseParser):
     '''
     parse a DOSCAR file from a vasp run
     '''
+    # number of orbital columns per spin component -> (lm decomposed, f)
+    orbitals = {3: (False, False), 4: (False, True),
+                9: (True, False), 16: (True, True)}
+
     def __init__(self, filename, **kwargs):
         self.ispin = kwargs.get('ispin')
         self.lorbit = kwargs.get('lorbit')
@@ -16,32 +20,15 @@ class DosParser(BaseParser):
         self.pdos = p
 
     @classmethod
-    def parse_doscar(cls, filename):
-        with open(filename) as dos:
-            ni, na, p00, p01 = cls.line(dos, int)
-            l0 = cls.line(dos, float)
-            l1 = cls.line(dos, float)
-            coord_type = cls.line(dos)
-            sys = cls.line(dos)
-            l2 = cls.line(dos, float)
-            emax, emin, ndos, efermi, weight = l2
-            ndos = int(ndos)
-            raw = cls.splitlines(dos)
-
-        # either (e tot intd) or (e tot^ tot_ intd^ intd_)
-        tdos = np.array(raw[:ndos])
-        # either (e s (p) (d)) -> 10
-        # or (e s^ s_ (p^ p_) (d^ d_)) -> 19
-        # or (e s[m] (p[m]) (d[m]) -> 37
-        # or (e s^[m] s_[m] (p^[m] p_[m]) (d^[m] d_[m]) -> 73
-        # probably format later with vasprun or PROCAR info?
-        # from vasprun: pdos[i][1+j::n_spin] <-> vrunpdos[i][j][1:]
-        pdos = []
-        if l2 in raw:
-            for i in range(ni):
-                start = raw.index(l2) + 1
-                pdos += [raw[start:start+ndos]]
-            pdos = np.array(pdos)
+    def _read_header(cls, dos):
+        ni, na, p00, p01 = cls.line(dos, int)
+        l0 = cls.line(dos, float)
+        l1 = cls.line(dos, float)
+        coord_type = cls.line(dos)
+        sys = cls.line(dos)
+        l2 = cls.line(dos, float)
+        emax, emin, ndos, efermi, weight = l2
+        ndos = int(ndos)
 
         header = {}
         header[0] = l0
@@ -58,5 +45,96 @@ class DosParser(BaseParser):
         header['n_dos'] = ndos
         header['efermi'] = efermi
         header['weight'] = weight
+        return header
+
+    @classmethod
+    def pdos_layout(cls, ncols, tdos_cols):
+        '''
+        find the column layout of the per ion blocks from the number of
+        columns, the number of tdos columns tells collinear spin
+        polarized (5) apart from unpolarized or noncollinear (3) runs:
+
+        * (e s p d [f]) -> 4, 5
+        * (e s^ s_ p^ p_ d^ d_ [f^ f_]) -> 7, 9
+        * (e s[m] p[m] d[m] [f[m]]) -> 10, 17
+        * (e s^[m] s_[m] ... ) -> 19, 33
+        * noncollinear (e s[tot mx my mz] ...) -> 13, 17, 37, 65
 
+        unpolarized is preferred over noncollinear if both fit (17).
+
+        :return: dict with keys 'components' (spin components per
+            orbital, 1, 2 or 4), 'lm' (lm decomposed), 'f' (f orbitals
+            present) or None if the column count does not fit any layout
+        '''
+        components = tdos_cols == 5 and [2] or [1, 4]
+        for ncomp in components:
+            norb, rest = divmod(ncols - 1, ncomp)
+            if not rest and norb in cls.orbitals:
+                lm, f = cls.orbitals[norb]
+                return {'components': ncomp, 'lm': lm, 'f': f}
+        return None
+
+    @classmethod
+    def parse_doscar(cls, filename):
+        '''
+        read total and per ion dos in one pass.
+
+        All values after the header are decoded with a single
+        np.fromstring call, the tdos and per ion blocks are then split
+        off using the column counts of their first lines. Falls back to
+        :py:meth:`parse_doscar_lines` if the values do not add up.
+
+        :return: (header, tdos, pdos), tdos has shape (ndos, ncols),
+            pdos has shape (n_ions, ndos, ncols) or is an empty list if
+            the DOSCAR does not contain per ion blocks.
+        '''
+        with open(filename) as dos:
+            header = cls._read_header(dos)
+            first = dos.readline()
+            data = first + dos.read()
+        ndos = header['n_dos']
+        ni = header['n_ions']
+        flat = np.fromstring(data, dtype=float, sep=' ')
+        ntcol = len(first.split())
+        nt = ndos * ntcol
+        if not ntcol or flat.size < nt:
+            return cls.parse_doscar_lines(filename)
+        tdos = flat[:nt].reshape(ndos, ntcol)
+        rest = flat[nt:]
+        pdos = []
+        if rest.size:
+            # each block: header line (5 values) + ndos lines
+            nblock, remainder = divmod(rest.size, ni)
+            npcol, extra = divmod(nblock - 5, ndos)
+            if remainder or extra or npcol < 1:
+                return cls.parse_doscar_lines(filename)
+            pdos = rest.reshape(ni, nblock)[:, 5:].reshape(ni, ndos, npcol)
+            header['pdos_layout'] = cls.pdos_layout(npcol, ntcol)
+        return header, tdos.copy(), pdos
+
+    @classmethod
+    def parse_doscar_lines(cls, filename):
+        '''
+        parse DOSCAR line by line, slower but tolerant to irregular
+        column counts.
+        '''
+        with open(filename) as dos:
+            header = cls._read_header(dos)
+            raw = cls.splitlines(dos)
+        ndos = header['n_dos']
+        l2 = header[2]
+
+        # either (e tot intd) or (e tot^ tot_ intd^ intd_)
+        tdos = np.array(raw[:ndos])
+        pdos = []
+        start = ndos
+        for i in range(header['n_ions']):
+            if raw[start:start+1] != [l2]:
+                break
+            pdos += [raw[start+1:start+1+ndos]]
+            start += ndos + 1
+        if pdos:
+            pdos = np.array(pdos)
+            header['pdos_layout'] = cls.pdos_layout(
+                pdos.shape[2], tdos.shape[1])
         return header, tdos, pdos
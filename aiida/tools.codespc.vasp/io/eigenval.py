@@ -3,6 +3,7 @@ This module contains tools to read kpoints and bands from EIGENVALUE files.
 '''
 
 import re
+import mmap
 from parser import BaseParser
 import numpy as np
 
@@ -12,6 +13,8 @@ class EigParser(BaseParser):
     contains regex and functions to find grammar elements
     in EIGENVALUE files
     '''
+    window_bytes = 16 * 2**20
+
     def __init__(self, filename):
         res = self.parse_eigenval(filename)
         self.header = res[0]
@@ -20,26 +23,29 @@ class EigParser(BaseParser):
 
     @classmethod
     def parse_eigenval(cls, filename):
-        with open(filename) as eig:
-            l0 = cls.line(eig, int)        # read header
-            l1 = cls.line(eig, float)      # "
-            l2 = cls.line(eig, float)      # "
-            coord_type = cls.line(eig)     # "
-            name = cls.line(eig)           # read name line (can be empty)
-            p1, nkp, nb = cls.line(eig, int)  # read: ? #kp #bands
-            data = eig.read()               # rest is data
+        '''
+        read header, kpoints and bands from an EIGENVAL file.
+        Uses the vectorized :py:meth:`parse_eigenval_mmap` and falls back
+        to :py:meth:`parse_eigenval_blocks` if the data can not be
+        decoded in one pass.
+
+        :return: (header, kp, bs), kp has shape (nkp, 4) (kpoint, weight),
+            bs has shape (nspin, nkp, nbands)
+        '''
+        res = cls.parse_eigenval_mmap(filename)
+        if res is None:
+            res = cls.parse_eigenval_blocks(filename)
+        return res
+
+    @classmethod
+    def _read_header(cls, eig):
+        l0 = cls.line(eig, int)        # read header
+        l1 = cls.line(eig, float)      # "
+        l2 = cls.line(eig, float)      # "
+        coord_type = cls.line(eig)     # "
+        name = cls.line(eig)           # read name line (can be empty)
+        p1, nkp, nb = cls.line(eig, int)  # read: ? #kp #bands
         ni, na, p00, ns = l0
-        data = re.split(cls.empty_line, data)       # list of data blocks
-        data = map(lambda s: s.splitlines(), data)  # list of list of lines
-        data = map(lambda s: map(lambda ss: ss.split(), s), data)  # 3d list of numbers
-        kp = np.zeros((nkp, 4))
-        bs = np.zeros((ns, nkp, nb))
-        for k, field in enumerate(data):    # iterate over data blocks
-            kpbs = filter(None, field)      # throw away empty lines
-            kpi = map(float, kpbs.pop(0))   # first line of block is kpoints -> pop
-            kp[k] = kpi
-            for p in kpbs:                  # rest are band energies
-                bs[:, k, int(p[0])-1] = p[1:ns+1]   # place energy value in bs[kp, nb] (BandstrucureData format)
         header = {}                         # build header dict
         header[0] = l0
         header[1] = l1
@@ -53,5 +59,114 @@ class EigParser(BaseParser):
         header['some_num'] = p1
         header['n_bands'] = nb
         header['n_kp'] = nkp
+        return header
 
+    @classmethod
+    def parse_eigenval_mmap(cls, filename):
+        '''
+        memory map the EIGENVAL file and decode the kpoint blocks with
+        np.fromstring in windows of about :py:attr:`window_bytes`, straight
+        into an array whose shape is computed from nkp, nbands and the
+        number of columns of the first band line. Only one window of text
+        is held in memory at a time.
+
+        :return: same as :py:meth:`parse_eigenval` or None if the blocks
+            do not have the regular layout (missing or garbled values,
+            unordered band indices)
+        '''
+        with open(filename, 'rb') as eig:
+            header = cls._read_header(eig)
+            offset = eig.tell()
+            eig.seek(0, 2)
+            if eig.tell() <= offset:
+                return None
+            mm = mmap.mmap(eig.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                data = cls._read_blocks(mm, offset, header)
+            finally:
+                mm.close()
+        if data is None:
+            return None
+        nkp = header['n_kp']
+        nb = header['n_bands']
+        ns = header['nspin']
+        ncol = (data.shape[1] - 4) // nb    # index, energies (, occupations)
+        if ncol < ns + 1:
+            return None
+        kp = data[:, :4].copy()
+        blocks = data[:, 4:].reshape(nkp, nb, ncol)
+        if not (blocks[:, :, 0] == np.arange(1, nb + 1)).all():
+            return None
+        bs = blocks[:, :, 1:ns+1].transpose(2, 0, 1).copy()
+        return header, kp, bs
+
+    @classmethod
+    def _read_blocks(cls, mm, offset, header):
+        '''
+        :return: array of shape (nkp, 4 + nbands * ncol) or None if the
+            number of values does not match
+        '''
+        nkp = header['n_kp']
+        nb = header['n_bands']
+        if not (nkp and nb):
+            return None
+        # kpoint line and first band line give the number of columns
+        mm.seek(offset)
+        first = []
+        while len(first) < 2:
+            line = mm.readline()
+            if not line:
+                return None
+            if line.strip():
+                first.append(line.split())
+        per_kp = 4 + nb * len(first[1])
+        data = np.empty(nkp * per_kp)
+        filled = 0
+        for text in cls._iter_windows(mm, offset, cls.window_bytes):
+            values = np.fromstring(text, dtype=float, sep=' ')
+            if filled + values.size > data.size:
+                return None
+            data[filled:filled + values.size] = values
+            filled += values.size
+        if filled != data.size:
+            return None
+        return data.reshape(nkp, per_kp)
+
+    @classmethod
+    def _iter_windows(cls, mm, offset, size):
+        '''yield pieces of about size bytes of mm, ending at line breaks'''
+        end = len(mm)
+        while offset < end:
+            stop = min(offset + size, end)
+            if stop < end:
+                newline = mm.rfind('\n', offset, stop)
+                if newline < 0:
+                    newline = mm.find('\n', stop)
+                stop = end if newline < 0 else newline + 1
+            yield mm[offset:stop]
+            offset = stop
+
+    @classmethod
+    def parse_eigenval_blocks(cls, filename):
+        '''
+        parse an EIGENVAL file block by block and place every band energy
+        according to it's band index.
+        '''
+        with open(filename) as eig:
+            header = cls._read_header(eig)
+            data = eig.read()               # rest is data
+        nkp = header['n_kp']
+        nb = header['n_bands']
+        ns = header['nspin']
+        data = re.split(cls.empty_line, data)       # list of data blocks
+        data = map(lambda s: s.splitlines(), data)  # list of list of lines
+        data = map(lambda s: map(lambda ss: ss.split(), s), data)  # 3d list of numbers
+        kp = np.zeros((nkp, 4))
+        bs = np.zeros((ns, nkp, nb))
+        for k, field in enumerate(data):    # iterate over data blocks
+            kpbs = filter(None, field)      # throw away empty lines
+            kpi = map(float, kpbs.pop(0))   # first line of block is kpoints -> pop
+            kp[k] = kpi
+            for p in kpbs:                  # rest are band energies
+                bs[:, k, int(p[0])-1] = p[1:ns+1]   # place energy value in bs[kp, nb] (BandstrucureData format)
         return header, kp, bs
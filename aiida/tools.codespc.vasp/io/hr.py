@@ -0,0 +1,119 @@
+__doc__ = '''
+This module contains tools to read the tight binding hamiltonian
+written by wannier90 (wannier90_hr.dat).
+'''
+from parser import BaseParser
+from itertools import islice
+import numpy as np
+
+
+class HrParser(BaseParser):
+    '''
+    reads wannier90_hr.dat into arrays.
+
+    The file holds a date line, num_wann, nrpts, the degeneracies of the
+    R-vectors (15 per line) and then one line per R-vector and pair of
+    wannier functions::
+
+        R1 R2 R3 m n Re(H_mn(R)) Im(H_mn(R))
+
+    with m running fastest. The hopping lines are read in blocks of
+    :py:attr:`block_rpts` R-vectors, each converted with a single
+    np.fromstring call, so the text is never held in memory as a whole.
+    The dense :py:attr:`hoppings` array does hold all of the hoppings,
+    only with a cutoff the memory is bounded by the kept ones.
+
+    :py:attr:`hoppings` has shape (nrpts, num_wann, num_wann) with
+    hoppings[r, m, n] = H_mn(R_r). If a cutoff is given, only hoppings
+    with a magnitude larger than cutoff are kept, as :py:attr:`indices`
+    (nnz, 3) of (r, m, n) and :py:attr:`values` (nnz,) and hoppings is
+    None.
+    '''
+    block_rpts = 64
+
+    def __init__(self, filename, cutoff=None):
+        self.cutoff = cutoff
+        self.hoppings = None
+        self.indices = None
+        self.values = None
+        with open(filename) as hr:
+            self.num_wann, self.nrpts, self.degeneracies = \
+                self.parse_header(hr)
+            blocks = self.iter_blocks(hr, self.num_wann, self.nrpts,
+                                      self.block_rpts)
+            if cutoff is None:
+                self._read_dense(blocks)
+            else:
+                self._read_sparse(blocks, cutoff)
+
+    @classmethod
+    def parse_header(cls, fobj):
+        '''
+        read the header from an open hr.dat file, leaves the file
+        positioned at the first hopping line.
+
+        :return: (num_wann, nrpts, degeneracies)
+        '''
+        fobj.readline()
+        num_wann = cls.line(fobj, int)
+        nrpts = cls.line(fobj, int)
+        ndeglines = -(-nrpts // 15)
+        text = ''.join(islice(fobj, ndeglines))
+        degeneracies = np.fromstring(text, dtype=int, sep=' ')
+        if degeneracies.size != nrpts:
+            raise ValueError('expected {} degeneracies, found {}'.format(
+                nrpts, degeneracies.size))
+        return num_wann, nrpts, degeneracies
+
+    @classmethod
+    def iter_blocks(cls, fobj, num_wann, nrpts, block_rpts):
+        '''
+        yield the hopping lines in blocks of R-vectors
+
+        :return: iterator of (rvectors, hoppings), rvectors with shape
+            (n, 3), hoppings with shape (n, num_wann, num_wann)
+        '''
+        nlines = num_wann**2
+        done = 0
+        while done < nrpts:
+            n = min(block_rpts, nrpts - done)
+            text = ''.join(islice(fobj, n * nlines))
+            data = np.fromstring(text, dtype=float, sep=' ')
+            if data.size != n * nlines * 7:
+                raise ValueError(
+                    'hr.dat ended after {} of {} R-vectors'.format(
+                        done + data.size // (nlines * 7), nrpts))
+            data = data.reshape(n, num_wann, num_wann, 7)
+            rvectors = data[:, 0, 0, :3].astype(int)
+            # lines are ordered (n, m), transpose to hoppings[r, m, n]
+            hop = data[..., 5] + 1j * data[..., 6]
+            yield rvectors, hop.transpose(0, 2, 1)
+            done += n
+
+    def _read_dense(self, blocks):
+        nw = self.num_wann
+        self.rvectors = np.empty((self.nrpts, 3), dtype=int)
+        self.hoppings = np.empty((self.nrpts, nw, nw), dtype=complex)
+        start = 0
+        for rvectors, hoppings in blocks:
+            stop = start + len(rvectors)
+            self.rvectors[start:stop] = rvectors
+            self.hoppings[start:stop] = hoppings
+            start = stop
+
+    def _read_sparse(self, blocks, cutoff):
+        rvectors = []
+        indices = []
+        values = []
+        start = 0
+        for rvec, hoppings in blocks:
+            keep = np.abs(hoppings) > cutoff
+            idx = np.argwhere(keep)
+            idx[:, 0] += start
+            rvectors.append(rvec)
+            indices.append(idx)
+            values.append(hoppings[keep])
+            start += len(rvec)
+        self.rvectors = np.concatenate(rvectors)
+        self.indices = np.concatenate(indices).astype(np.int32)
+        self.values = np.concatenate(values)
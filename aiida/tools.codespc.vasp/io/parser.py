@@ -93,7 +93,13 @@ class KeyValueParser(BaseParser):
         return cls.retval(value, comment=comment)
 
     @classmethod
-    def kv_list(cls, filename):
+    def kv_list(cls, filename, lines=None):
+        '''
+        list of key value pairs per line of filename, or of lines
+        if given
+        '''
+        if lines is not None:
+            return filter(None, map(cls.find_kv, lines))
         with open(filename) as potcar:
             kv_list = filter(None, map(cls.find_kv, potcar))
         return kv_list
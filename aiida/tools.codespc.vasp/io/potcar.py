@@ -3,17 +3,47 @@ This module contains tools to read PotpawData attributes from POTCAR files.
 '''
 import re
 import datetime as dt
+import hashlib
 from parser import KeyValueParser
+import shutil
 import os
 
 
-class PotParser(KeyValueParser):
+def concatenate(sources, dst, block_size=2**20):
     '''
-    contains regex and functions to find grammar elements
-    for POTCAR files
+    write the contents of the files in sources, in order, to dst.
+    The files are copied in blocks of block_size bytes.
+    '''
+    with open(dst, 'wb') as out:
+        for src in sources:
+            with open(src, 'rb') as inp:
+                shutil.copyfileobj(inp, out, block_size)
+
+
+def _hashed_lines(lines, md5):
+    '''yield the lines, updating the hash object md5 with each'''
+    for line in lines:
+        md5.update(line)
+        yield line
+
+
+class PotcarParser(KeyValueParser):
+    '''
+    common base for POTCAR parsers, finds the key value pairs in the
+    header of each element's dataset without running the assignment
+    regex over the (much longer) data sections.
+
+    A dataset consists of the header (the PSCTR parameters), which ends
+    at :py:attr:`header_end`, followed by the data sections up to
+    :py:attr:`dataset_end`. Concatenated POTCAR files are several
+    datasets in a row.
     '''
     assignment = re.compile(r'(\w*)\s*=\s*([^;]*);?')
     comments = True
+    header_end = re.compile(r'\s*(Atomic configuration|Description|'
+                            r'Error from kinetic|END of PSCTR|local part|'
+                            r'End of Dataset)')
+    dataset_end = 'End of Dataset'
 
     @classmethod
     def single(cls, kv_list):
@@ -23,6 +53,114 @@ class PotParser(KeyValueParser):
         else:
             return False
 
+    @classmethod
+    def read_header(cls, lines):
+        '''
+        consume lines up to the end of the next header.
+
+        :param lines: an iterator over lines, e.g. an open file
+        :return: (kv_list, line that ended the header or None at the end
+            of the file)
+        '''
+        kv_list = []
+        for line in lines:
+            if cls.header_end.match(line):
+                return kv_list, line
+            kv = cls.find_kv(line)
+            if kv:
+                kv_list.append(kv)
+        return kv_list, None
+
+    @classmethod
+    def iter_headers(cls, lines):
+        '''
+        yield the kv_list of each element's header, skipping the data
+        sections in between without parsing them.
+        '''
+        lines = iter(lines)
+        while True:
+            kv_list, stop = cls.read_header(lines)
+            if kv_list:
+                yield kv_list
+            if stop is None:
+                return
+            if cls.dataset_end not in stop:
+                for line in lines:
+                    if cls.dataset_end in line:
+                        break
+
+    @classmethod
+    def header_kv_list(cls, filename, lines=None):
+        '''
+        kv_list of the header of a single element POTCAR. The data
+        section is skipped line by line up to :py:attr:`dataset_end`
+        without parsing, after that only the next non empty line is read
+        to check for further datasets.
+
+        :raises ValueError: for concatenated POTCAR files
+        '''
+        if lines is None:
+            with open(filename) as potcar:
+                return cls.header_kv_list(filename, lines=potcar)
+        lines = iter(lines)
+        kv_list, stop = cls.read_header(lines)
+        if not cls.single(kv_list) or cls._more_datasets(lines, stop):
+            raise ValueError('not parsing concatenated POTCAR files')
+        return kv_list
+
+    @classmethod
+    def _more_datasets(cls, lines, stop):
+        '''
+        True if anything but whitespace follows the end of the current
+        dataset, stop is the line that ended its header
+        '''
+        if stop is None:
+            return False
+        if cls.dataset_end not in stop:
+            for line in lines:
+                if cls.dataset_end in line:
+                    break
+            else:
+                return False
+        for line in lines:
+            if line.strip():
+                return True
+        return False
+
+    @classmethod
+    def attr_dict(cls, kv_list, filename):
+        '''
+        node attributes from the kv_list of one header, here the raw
+        header values by keyword, subclasses convert the ones they need
+        '''
+        return cls.kv_dict(kv_list)
+
+    @classmethod
+    def parse_potcar(cls, filename, lines=None):
+        return cls.attr_dict(cls.header_kv_list(filename, lines=lines),
+                             filename)
+
+    @classmethod
+    def parse_headers(cls, filename, lines=None):
+        '''
+        parse a (possibly concatenated) POTCAR file
+
+        :return: list of attribute dicts, one per element, in the order
+            they appear in the file
+        '''
+        if lines is None:
+            with open(filename) as potcar:
+                return cls.parse_headers(filename, lines=potcar)
+        return [cls.attr_dict(kv_list, filename)
+                for kv_list in cls.iter_headers(lines)]
+
+
+class PotParser(PotcarParser):
+    '''
+    contains regex and functions to find grammar elements
+    for POTCAR files
+    '''
+
     @classmethod
     def title(cls, title):
         tl = title.split()
@@ -39,10 +177,7 @@ class PotParser(KeyValueParser):
         return element, spconf
 
     @classmethod
-    def parse_potcar(cls, filename):
-        kv_list = cls.kv_list(filename)
-        if not cls.single(kv_list):
-            raise ValueError('not parsing concatenated POTCAR files')
+    def attr_dict(cls, kv_list, filename):
         kv_dict = cls.kv_dict(kv_list)
         is_paw, cmt = cls.bool(kv_dict.get('LPAW', 1))
         is_ultrasoft, cmt = cls.bool(kv_dict['LULTRA'])
@@ -75,21 +210,11 @@ class PotParser(KeyValueParser):
         return attr_dict
 
 
-class PawParser(KeyValueParser):
+class PawParser(PotcarParser):
     '''
     contains regex and functions to find grammar elements
     in POTCAR files in PAW libraries
     '''
-    assignment = re.compile(r'(\w*)\s*=\s*([^;]*);?')
-    comments = True
-
-    @classmethod
-    def single(cls, kv_list):
-        k_list = [ssl[0] for subl in kv_list for ssl in subl]
-        if len(filter(lambda x: x == 'TITEL', k_list)) == 1:
-            return True
-        else:
-            return False
 
     @classmethod
     def title(cls, title):
@@ -108,10 +233,24 @@ class PawParser(KeyValueParser):
         return element, spconf
 
     @classmethod
-    def parse_potcar(cls, filename):
-        kv_list = cls.kv_list(filename)
-        if not cls.single(kv_list):
-            raise ValueError('not parsing concatenated POTCAR files')
+    def read_potcar(cls, filename):
+        '''
+        parse filename and compute its md5 checksum, reading the file
+        only once, line by line. The lines are hashed as the header
+        parser consumes them, whatever it leaves is only hashed.
+
+        :return: (md5, attr_dict)
+        '''
+        md5 = hashlib.md5()
+        with open(filename) as potcar:
+            lines = _hashed_lines(potcar, md5)
+            attr_dict = cls.parse_potcar(filename, lines=lines)
+            for line in lines:
+                pass
+        return md5.hexdigest(), attr_dict
+
+    @classmethod
+    def attr_dict(cls, kv_list, filename):
         kv_dict = cls.kv_dict(kv_list)
         is_paw, cmt = cls.bool(kv_dict.get('LPAW', 'T'))
         is_ultrasoft, cmt = cls.bool(kv_dict.get('LULTRA', 'F'))
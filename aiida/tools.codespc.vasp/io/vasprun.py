@@ -6,19 +6,104 @@ try:
     from lxml.objectify import parse
 except:
     from xml.etree.ElementTree import parse
+try:
+    from lxml.etree import iterparse
+except:
+    from xml.etree.cElementTree import iterparse
 
+from xml.etree.ElementTree import Element, SubElement
 import datetime as dt
 import numpy as np
 
 
+def _i_value(text, typ=None):
+    '''convert the text of an <i> tag according to it's type attribute'''
+    if typ == 'logical':
+        res = 'T' in text
+    elif typ == 'int':
+        res = int(text)
+    elif typ == 'string':
+        res = text.strip()
+    else:
+        try:
+            res = int(text)
+        except ValueError:
+            try:
+                res = float(text)
+            except ValueError:
+                res = text.strip()
+    return res
+
+
+def _field_dtype(text, typ=None):
+    '''numpy dtype entry for a <field> tag of an <array>'''
+    if typ == 'string':
+        typ = 'S128'
+    return (text.strip(), typ or float)
+
+
+def _decode_rows(rows, dtyp):
+    '''
+    decode a list of whitespace separated <r> row strings into a 1D array
+    of the structured dtype dtyp.
+
+    Rows without string fields are joined and decoded in one
+    np.fromstring call, purely float64 dtypes are then just a view on
+    that buffer, other numeric dtypes are filled field by field into a
+    preallocated array. Anything the bulk decoder can not read (string
+    fields, missing or garbled values) falls back to per row tuples.
+    '''
+    nrows = len(rows)
+    names = dtyp.names
+    if nrows and all(dtyp[n].kind in 'biuf' for n in names):
+        flat = np.fromstring(' '.join(rows), dtype=float, sep=' ')
+        if flat.size == nrows * len(names):
+            if all(dtyp[n] == np.float64 for n in names):
+                return flat.view(dtyp)
+            flat = flat.reshape(nrows, len(names))
+            data = np.empty(nrows, dtype=dtyp)
+            for i, name in enumerate(names):
+                data[name] = flat[:, i]
+            return data
+    return np.array([tuple(r.split()) for r in rows], dtype=dtyp)
+
+
+def _decode_varray(rows):
+    '''
+    decode a list of <v> row strings of a <varray> into a 2D float array,
+    in bulk if all rows have the same length
+    '''
+    if rows:
+        ncols = len(rows[0].split())
+        flat = np.fromstring(' '.join(rows), dtype=float, sep=' ')
+        if flat.size == len(rows) * ncols:
+            return flat.reshape(len(rows), ncols)
+    return np.array([r.split() for r in rows], dtype=float)
+
+
+def _v_value(text, typ=float):
+    '''convert the text of a <v> tag according to it's type attribute'''
+    return np.array(text.split(), dtype=typ)
+
+
 class VasprunParser(object):
     '''
     parse xml into objecttree, provide convenience methods
     for parsing
+
+    Named <i>, <v> and <varray> tags in the sections outside of the
+    ionic steps (incar, parameters, atominfo, structures, ...) are
+    indexed in one pass on first lookup, so :py:meth:`tag` does not
+    have to search the whole tree for every key. Typed values of <i> and
+    <v> tags are memoized.
     '''
+    indexed_tags = ('i', 'v', 'varray')
+
     def __init__(self, fname):
         super(VasprunParser, self).__init__()
         self.tree = parse(fname)
+        self._index = None
+        self._values = {}
 
     @property
     def program(self):
@@ -55,6 +140,14 @@ class VasprunParser(object):
     def efermi(self):
         return self._i('efermi')
 
+    @property
+    def total_energy(self):
+        '''free energy (TOTEN) of the last ionic step'''
+        tags = self.tree.findall('calculation/energy/i[@name="e_fr_energy"]')
+        if not tags:
+            return None
+        return _i_value(tags[-1].text)
+
     @property
     def is_static(self):
         ibrion = self.param('IBRION', default=-1)
@@ -115,23 +208,14 @@ class VasprunParser(object):
         tag = self.tag('varray', key, path)
         if tag is None:
             return None
-
-        def split(s):
-            return s.text.split()
-        return np.array(map(split, tag.v), dtype=float)
+        return _decode_varray([v.text for v in tag.findall('v')])
 
     def _array(self, parent, key=None, path='//'):
         pred = key and '[@name="%s"]' % key or ''
         tag = self.tree.find(path+parent+'/array%s' % pred)
         dims = [i.text for i in tag.findall('dimension')]
-
-        def getdtf(field):
-            dt = field.attrib.get('type', float)
-            if dt == 'string':
-                dt = 'S128'
-            return (field.text.strip(), dt)
-
-        dtyp = np.dtype([getdtf(f) for f in tag.findall('field')])
+        dtyp = np.dtype([_field_dtype(f.text, f.attrib.get('type'))
+                         for f in tag.findall('field')])
         ndim = len(dims)
         shape = []
         subset = tag.find('set')
@@ -146,46 +230,333 @@ class VasprunParser(object):
             mode = 'rc'
         shape.append(len(ldim))
 
-        def split(s):
-            if mode == 'r':
-                return tuple(s.text.split())
-            elif mode == 'rc':
-                return tuple(map(lambda x: x.text.strip(), s.c))
-
-        data = np.array(map(split, tag.iterfind('*//%s' % mode)), dtype=dtyp)
+        rows = tag.iterfind('*//%s' % mode)
+        if mode == 'r':
+            data = _decode_rows([r.text for r in rows], dtyp)
+        else:
+            data = np.array(
+                [tuple(c.text.strip() for c in rc.findall('c'))
+                 for rc in rows], dtype=dtyp)
         return data.reshape(shape)
 
     def _i(self, key, path='//'):
-        tag = self.tag('i', key, path)
-        res = None
-        if tag is not None:
-            if tag.attrib.get('type') == 'logical':
-                res = 'T' in tag.text
-            elif tag.attrib.get('type') == 'int':
-                res = int(tag.text)
-            elif tag.attrib.get('type') == 'string':
-                res = tag.text.strip()
-            else:
-                try:
-                    res = int(tag.text)
-                except ValueError:
-                    try:
-                        res = float(tag.text)
-                    except ValueError:
-                        res = tag.text.strip()
-        return res
+        if ('i', key, path) not in self._values:
+            tag = self.tag('i', key, path)
+            res = None
+            if tag is not None:
+                res = _i_value(tag.text, tag.attrib.get('type'))
+            self._values[('i', key, path)] = res
+        return self._values[('i', key, path)]
 
     def _v(self, key, path='//'):
-        tag = self.tag('v', key, path)
-        if tag is not None:
-            dtype = tag.attrib.get('type', float)
-            return np.array(tag.text.split(), dtype=dtype)
-        else:
-            return None
+        if ('v', key, path) not in self._values:
+            tag = self.tag('v', key, path)
+            res = None
+            if tag is not None:
+                res = _v_value(tag.text, tag.attrib.get('type', float))
+            self._values[('v', key, path)] = res
+        return self._values[('v', key, path)]
 
     def _fppath(self):
         return '//structure[@name="finalpos"]//'
 
+    def _section(self, path):
+        '''
+        the name of the indexed section a lookup path refers to,
+        None if the path is not covered by the index
+        '''
+        if path == '//':
+            return path
+        elif path == self._fppath():
+            return 'finalpos'
+        elif path in ['/parameters//', '/incar//', '/atominfo//']:
+            return path.strip('/')
+        return None
+
+    def _build_index(self):
+        '''
+        map (section, tag, name) -> element for all top level sections
+        except the ionic steps. The '//' section holds the first
+        occurence in document order before the first <calculation>.
+        '''
+        index = {}
+        before_calc = True
+        for section in self.root.findall('*'):
+            stag = section.tag
+            if stag == 'calculation':
+                before_calc = False
+                continue
+            name = section.attrib.get('name')
+            if stag == 'structure' and name:
+                stag = name
+            for elem in section.iter():
+                if elem.tag not in self.indexed_tags:
+                    continue
+                if 'name' not in elem.attrib:
+                    continue
+                key = (elem.tag, elem.attrib['name'])
+                index.setdefault((stag,) + key, elem)
+                if before_calc:
+                    index.setdefault(('//',) + key, elem)
+        self._index = index
+
     def tag(self, tag, key, path='//'):
+        section = self._section(path)
+        if section:
+            if self._index is None:
+                self._build_index()
+            elem = self._index.get((section, tag, key))
+            if elem is not None or section != '//':
+                return elem
         path = '{p}{t}[@name="{n}"]'.format(p=path, t=tag, n=key)
         return self.tree.find(path)
+
+
+def _free(elem):
+    '''
+    release an element read by iterparse, including the (already cleared)
+    preceding siblings lxml would otherwise keep in the tree
+    '''
+    elem.clear()
+    if hasattr(elem, 'getprevious'):
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+class _ArrayReader(object):
+    '''
+    collects a single <array> tag from iterparse events and decodes it
+    into a structured numpy array with the same shape
+    :py:meth:`VasprunParser._array` would produce.
+
+    Rows are decoded whenever an innermost <set> is complete, so only
+    one set worth of row strings is held in memory at any time.
+    '''
+    def __init__(self, parent):
+        self.parent = parent
+        self.fields = []
+        self.ndim = 0
+        self.depth = 0
+        self.counts = []
+        self.rows = []
+        self.cells = []
+        self.chunks = []
+        self.nrows = 0
+
+    def start_set(self):
+        if len(self.counts) <= self.depth:
+            self.counts.append(0)
+        self.counts[self.depth] += 1
+        self.depth += 1
+
+    def end(self, tag, elem):
+        '''
+        consume an 'end' event, returns True once the array is complete
+        '''
+        if tag == 'r':
+            self.rows.append(elem.text)
+        elif tag == 'c':
+            self.cells.append(elem.text.strip())
+        elif tag == 'rc':
+            self.rows.append(tuple(self.cells))
+            self.cells = []
+        elif tag == 'set':
+            self.depth -= 1
+            if self.rows:
+                self.nrows += len(self.rows)
+                if isinstance(self.rows[0], tuple):
+                    chunk = np.array(self.rows, dtype=self.dtype)
+                else:
+                    chunk = _decode_rows(self.rows, self.dtype)
+                self.chunks.append(chunk)
+                self.rows = []
+        elif tag == 'field':
+            self.fields.append(
+                _field_dtype(elem.text, elem.attrib.get('type')))
+        elif tag == 'dimension':
+            self.ndim += 1
+        return tag == 'array'
+
+    @property
+    def dtype(self):
+        return np.dtype(self.fields)
+
+    @property
+    def shape(self):
+        levels = min(len(self.counts), self.ndim)
+        shape = [self.counts[d] // self.counts[d - 1]
+                 for d in range(1, levels)]
+        shape.append(self.nrows // self.counts[levels - 1])
+        return shape
+
+    def result(self):
+        if self.chunks:
+            data = np.concatenate(self.chunks)
+        else:
+            data = np.array([], dtype=self.dtype)
+        return data.reshape(self.shape)
+
+
+class VasprunStreamParser(VasprunParser):
+    '''
+    iterparse based drop in replacement for :py:class:`VasprunParser`.
+
+    Reads vasprun.xml in a single pass and only keeps the first
+    occurence of each named <i> and <v> tag per top level section, the
+    <calculation> sections sharing one (so values like efermi, which
+    only appear inside the ionic steps, are found), the <varray> tags
+    outside of the ionic steps, the energies of the last ionic step and
+    the first occurence of each of the requested arrays (eigenvalues,
+    dos). Everything else is discarded while reading, so the peak
+    memory is bounded by the largest extracted array instead of the
+    file size.
+
+    Provides the same properties as :py:class:`VasprunParser`. Instead
+    of the full tree, :py:attr:`root` is a small element holding one
+    element per top level section with copies of the kept <i>, <v> and
+    <varray> tags (nesting inside a section is flattened), which
+    :py:meth:`tag` searches.
+
+    :param fname: path to the vasprun.xml file
+    :param arrays: list of parent paths of the <array> tags to extract,
+        as passed to :py:meth:`_array`, defaults to
+        :py:attr:`default_arrays`.
+    '''
+    default_arrays = ['calculation/eigenvalues',
+                      'calculation/projected/eigenvalues',
+                      'dos/total',
+                      'dos/partial']
+
+    def __init__(self, fname, arrays=None):
+        self.tree = None
+        self._wanted = [tuple(a.split('/'))
+                        for a in arrays or self.default_arrays]
+        self._scopes = []
+        self._items = {}
+        self._sections = {}
+        self._root = Element('modeling')
+        self._arrays = {}
+        self._energies = {}
+        self._parse(fname)
+
+    @property
+    def root(self):
+        return self._root
+
+    @property
+    def total_energy(self):
+        return self._energies.get('e_fr_energy')
+
+    def _parse(self, fname):
+        stack = []
+        scope = None
+        reader = None
+        vrows = None
+        for event, elem in iterparse(fname, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                if tag == 'array' and reader is None:
+                    reader = self._new_reader(stack)
+                elif tag == 'set' and reader is not None:
+                    reader.start_set()
+                elif tag == 'varray' and scope != 'calculation':
+                    vrows = []
+                stack.append(tag)
+                if len(stack) == 2:
+                    scope = self._enter_scope(tag, elem.attrib)
+                continue
+
+            stack.pop()
+            if reader is not None:
+                if reader.end(tag, elem):
+                    self._arrays[reader.parent] = reader.result()
+                    reader = None
+            elif tag == 'v' and stack[-1] == 'varray':
+                if vrows is not None:
+                    vrows.append(elem.text)
+            elif tag == 'varray':
+                if vrows is not None:
+                    self._add_item(scope, elem,
+                                   lambda: _decode_varray(vrows), vrows)
+                vrows = None
+            elif tag == 'i':
+                if stack[-2:] == ['calculation', 'energy']:
+                    self._energies[elem.attrib.get('name')] = _i_value(
+                        elem.text or '')
+                self._add_item(scope, elem,
+                               lambda: _i_value(
+                                   elem.text or '', elem.attrib.get('type')))
+            elif tag == 'v':
+                self._add_item(scope, elem,
+                               lambda: _v_value(
+                                   elem.text or '',
+                                   elem.attrib.get('type', float)))
+            _free(elem)
+
+    def _new_reader(self, stack):
+        for parent in self._wanted:
+            path = '/'.join(parent)
+            if path in self._arrays:
+                continue
+            if tuple(stack[-len(parent):]) == parent:
+                return _ArrayReader(path)
+        return None
+
+    def _enter_scope(self, tag, attrib):
+        scope = tag
+        if tag == 'structure' and attrib.get('name'):
+            scope = attrib['name']
+        if scope not in self._items:
+            self._scopes.append(scope)
+            self._items[scope] = {}
+            self._sections[scope] = SubElement(self._root, tag,
+                                               dict(attrib))
+        return scope
+
+    def _add_item(self, scope, elem, value, vrows=None):
+        '''
+        store the value of a named tag and a copy of the tag (with its
+        <v> rows for varrays) in the section's element
+        '''
+        items = self._items.get(scope)
+        key = (elem.tag, elem.attrib.get('name'))
+        if items is None or key in items:
+            return
+        items[key] = value()
+        copy = SubElement(self._sections[scope], elem.tag, dict(elem.attrib))
+        copy.text = elem.text
+        for row in vrows or []:
+            SubElement(copy, 'v').text = row
+
+    def _lookup(self, tag, key, path):
+        if path == self._fppath():
+            scopes = ['finalpos']
+        elif path.startswith('/parameters'):
+            scopes = ['parameters']
+        else:
+            scopes = self._scopes
+        for scope in scopes:
+            items = self._items.get(scope, {})
+            if (tag, key) in items:
+                return items[(tag, key)]
+        return None
+
+    def _i(self, key, path='//'):
+        return self._lookup('i', key, path)
+
+    def _v(self, key, path='//'):
+        return self._lookup('v', key, path)
+
+    def _varray(self, key, path='//'):
+        return self._lookup('varray', key, path)
+
+    def _array(self, parent, key=None, path='//'):
+        if parent not in self._arrays:
+            raise KeyError(parent + ' was not extracted from vasprun.xml')
+        return self._arrays[parent]
+
+    def tag(self, tag, key, path='//'):
+        path = '{p}{t}[@name="{n}"]'.format(p=path, t=tag, n=key)
+        if path.startswith('/'):
+            path = '.' + path
+        return self._root.find(path)
@@ -0,0 +1,87 @@
+__doc__ = '''
+This module contains tools to read the band structure written by
+wannier90 (wannier90_band.dat, wannier90_band.kpt).
+'''
+from parser import BaseParser
+import numpy as np
+
+
+class WannierBandsParser(BaseParser):
+    '''
+    reads wannier90_band.kpt and wannier90_band.dat, each with a single
+    np.fromstring call.
+
+    band.kpt holds the number of kpoints followed by one line per kpoint
+    (kx ky kz weight), band.dat one block per band of (path length,
+    energy) lines, separated by empty lines.
+    '''
+    def __init__(self, dat, kpt):
+        self.kpoints = self.parse_kpt(kpt)
+        self.bands = self.parse_dat(dat, len(self.kpoints))
+
+    @classmethod
+    def parse_kpt(cls, filename):
+        '''
+        :return: array of shape (nkp, 4) (kpoint, weight)
+        '''
+        with open(filename) as kpt:
+            nkp = cls.line(kpt, int)
+            data = np.fromstring(kpt.read(), dtype=float, sep=' ')
+        if data.size < nkp * 4:
+            raise ValueError('{} does not contain {} kpoints'.format(
+                filename, nkp))
+        return data[:nkp * 4].reshape(nkp, 4)
+
+    @classmethod
+    def parse_dat(cls, filename, nkp):
+        '''
+        :param nkp: number of kpoints on the path
+        :return: array of shape (nbands, nkp, 2) (path length, energy)
+        '''
+        with open(filename) as dat:
+            data = np.fromstring(dat.read(), dtype=float, sep=' ')
+        nbands, rest = divmod(data.size, nkp * 2)
+        if rest or not nbands:
+            raise ValueError('{} does not contain {} kpoints per band'.format(
+                filename, nkp))
+        return data.reshape(nbands, nkp, 2)
+
+
+def find_labels(kpoints, labels, tol=1e-4):
+    '''
+    find the positions of labeled points on a kpoint path.
+
+    All kpoints are compared to all labeled points at once. On dense
+    paths several consecutive kpoints may lie within tol of a label, the
+    closest one of each such run is taken. If a label appears several
+    times, the n-th occurence of the label is placed in the n-th run of
+    kpoints matching its coordinates.
+
+    :param kpoints: array of shape (nkp, 3)
+    :param labels: list of (label, coordinates) in the order they appear
+        on the path
+    :param tol: largest difference per coordinate for a match
+    :return: list of (index, label)
+    :raises ValueError: if a label is not found (often enough)
+    '''
+    if not labels:
+        return []
+    names = [label[0] for label in labels]
+    points = np.array([label[1] for label in labels], dtype=float)
+    kpoints = np.asarray(kpoints, dtype=float)[:, :3]
+    dist = np.abs(kpoints[:, np.newaxis, :] -
+                  points[np.newaxis, :, :]).max(axis=2)
+    matches = dist <= tol
+    counter = dict.fromkeys(names, 0)
+    result = []
+    for i, name in enumerate(names):
+        found = np.flatnonzero(matches[:, i])
+        runs = np.split(found, np.flatnonzero(np.diff(found) > 1) + 1)
+        num = counter[name]
+        if not len(found) or num >= len(runs):
+            raise ValueError('kpoint {} {} not found on the path'.format(
+                name, list(points[i])))
+        run = runs[num]
+        result.append((int(run[np.argmin(dist[run, i])]), name))
+        counter[name] += 1
+    return result
@@ -0,0 +1,144 @@
+from parser import BaseParser
+import numpy as np
+
+
+class WavecarParser(BaseParser):
+    '''
+    random access to the records of a WAVECAR file.
+
+    WAVECAR consists of records of fixed length (recl bytes)::
+
+        0: recl, nspin, rtag
+        1: nkpts, nbands, encut, cell (3x3)[, efermi]
+        for each spin and kpoint:
+            nplw, k (3), (eigenvalue (complex), occupation) per band
+            one record of nplw plane wave coefficients per band
+
+    Only the first two records are read on construction, everything
+    else is read through np.memmap on demand.
+    '''
+    # rtag -> precision of the plane wave coefficients
+    precisions = {45200: np.complex64, 45210: np.complex128,
+                  53300: np.complex64, 53310: np.complex128}
+
+    def __init__(self, fname):
+        self.fname = fname
+        self.header = self.parse_header(fname)
+
+    @classmethod
+    def parse_header(cls, fname):
+        '''
+        :raises ValueError: if fname does not start with a valid
+            WAVECAR header
+        '''
+        with open(fname, 'rb') as wav:
+            first = np.fromfile(wav, dtype=np.float64, count=3)
+            if len(first) < 3:
+                raise ValueError('%s is not a WAVECAR file' % fname)
+            recl, nspin, rtag = map(int, first)
+            if rtag not in cls.precisions or recl < 13 * 8 or nspin < 1:
+                raise ValueError('%s is not a WAVECAR file' % fname)
+            wav.seek(recl)
+            second = np.fromfile(wav, dtype=np.float64, count=13)
+        if len(second) < 12:
+            raise ValueError('%s is truncated' % fname)
+        header = {}
+        header['recl'] = recl
+        header['nspin'] = nspin
+        header['rtag'] = rtag
+        header['nkpts'] = int(second[0])
+        header['nbands'] = int(second[1])
+        header['encut'] = second[2]
+        header['cell'] = second[3:12].reshape(3, 3)
+        header['efermi'] = None
+        if len(second) > 12:
+            header['efermi'] = second[12]
+        return header
+
+    @property
+    def nspin(self):
+        return self.header['nspin']
+
+    @property
+    def nkpts(self):
+        return self.header['nkpts']
+
+    @property
+    def nbands(self):
+        return self.header['nbands']
+
+    @property
+    def encut(self):
+        return self.header['encut']
+
+    @property
+    def dtype(self):
+        return self.precisions[self.header['rtag']]
+
+    def record(self, spin, kpoint, band=None):
+        '''
+        index of the record holding the header (band=None) or the
+        coefficients of band at kpoint and spin (all counted from 0)
+        '''
+        rec = 2 + (spin * self.nkpts + kpoint) * (self.nbands + 1)
+        if band is not None:
+            rec += 1 + band
+        return rec
+
+    def offset(self, spin, kpoint, band=None):
+        '''byte offset of a record, see :py:meth:`record`'''
+        return self.record(spin, kpoint, band) * self.header['recl']
+
+    def get_kpoint_header(self, spin, kpoint):
+        '''
+        :return: (nplw, kvec, eigenvalues, occupations)
+        '''
+        nb = self.nbands
+        rec = np.memmap(self.fname, dtype=np.float64, mode='r',
+                        offset=self.offset(spin, kpoint), shape=(4 + 3*nb,))
+        bands = rec[4:].reshape(nb, 3)
+        return int(rec[0]), np.array(rec[1:4]), bands[:, 0].copy(), \
+            bands[:, 2].copy()
+
+    @property
+    def eigenvalues(self):
+        '''array of shape (nspin, nkpts, nbands)'''
+        return self._band_values(2)
+
+    @property
+    def occupations(self):
+        '''array of shape (nspin, nkpts, nbands)'''
+        return self._band_values(3)
+
+    @property
+    def kpoints(self):
+        '''array of shape (nkpts, 3)'''
+        return np.array([self.get_kpoint_header(0, k)[1]
+                         for k in range(self.nkpts)])
+
+    def _band_values(self, item):
+        return np.array([[self.get_kpoint_header(s, k)[item]
+                          for k in range(self.nkpts)]
+                         for s in range(self.nspin)])
+
+    def get_coefficients(self, spin, kpoint, band=None):
+        '''
+        plane wave coefficients, memory mapped read-only.
+
+        :return: array of shape (nplw,) for a single band or
+            (nbands, nplw) if band is None
+        '''
+        nplw = self.get_kpoint_header(spin, kpoint)[0]
+        if band is not None:
+            return np.memmap(self.fname, dtype=self.dtype, mode='r',
+                             offset=self.offset(spin, kpoint, band),
+                             shape=(nplw,))
+        recl = self.header['recl']
+        itemsize = np.dtype(self.dtype).itemsize
+        if recl % itemsize:
+            return np.array([self.get_coefficients(spin, kpoint, b)
+                             for b in range(self.nbands)])
+        records = np.memmap(self.fname, dtype=self.dtype, mode='r',
+                            offset=self.offset(spin, kpoint, 0),
+                            shape=(self.nbands, recl // itemsize))
+        return records[:, :nplw]
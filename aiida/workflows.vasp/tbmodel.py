@@ -19,6 +19,10 @@ class TbmodelWorkflow(Workflow):
         * nonselfconsistent run with lwannier90
         * lwannier90 run with projections block
         * wannier.x run with hr_plot = True
+
+    The tight binding model is the wannier run's tb_model output, a
+    vasp.tbmodel node; an optional 'hr_cutoff' parameter stores only
+    hoppings of larger magnitude.
     '''
     def __init__(self, **kwargs):
         super(TbmodelWorkflow, self).__init__(**kwargs)
@@ -151,6 +155,9 @@ class TbmodelWorkflow(Workflow):
         calc.set_computer(code.get_computer())
         calc.use_settings(amncalc.inp.wannier_settings)
         calc.use_data(amncalc.out.wannier_data)
+        if params.get('hr_cutoff') is not None:
+            calc.use_parser_settings(ParameterData(
+                dict={'hr_cutoff': params['hr_cutoff']}))
         calc.label = params.get('name') + ': wannier run'
         calc.set_resources({'num_machines': 1})
         calc.set_queue_name(amncalc.get_queue_name())
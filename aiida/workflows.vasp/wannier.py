@@ -1,6 +1,8 @@
-from aiida.orm import Workflow
+from aiida.orm import Workflow, DataFactory
 from helper import WorkflowHelper
 
+ParameterData = DataFactory('parameter')
+
 
 class WannierWorkflow(Workflow):
 
@@ -24,6 +26,9 @@ class WannierWorkflow(Workflow):
         calc.set_queue_name(queue)
         calc.use_settings(win)
         calc.use_data(wdat)
+        if params.get('hr_cutoff') is not None:
+            calc.use_parser_settings(ParameterData(
+                dict={'hr_cutoff': params['hr_cutoff']}))
         calc.label = params.get('label')
         calc.description = params.get('description')
         return calc
@@ -88,6 +93,8 @@ class WannierWorkflow(Workflow):
                                  'in the output and a wannier_settings link in input\n'
                                  'or a dict with keys [settings, data], and uuids for values')
         tmpl['wannier_code'] = 'code in the database for running the wannier.x program'
+        tmpl['#hr_cutoff'] = ('optional float, store only hoppings of larger '
+                              'magnitude in the tb_model output')
         tmpl['settings'] = {'#comment': ('dict with wannier90.win keys, used to update '
                                          'the original wannier_settings keys, see examples'),
                             '#bands_plot': 'True | False',